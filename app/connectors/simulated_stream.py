@@ -1,9 +1,140 @@
+import logging
+import os
+import random
+import threading
 import time
-import pathway as pw
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import pathway as pw
+# Private, hence the pinned Pathway version in requirements.txt
+from pathway.internals.api import SessionType
+
+from app.processing.feature_engineering import with_event_time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadConfig:
+    """Synthetic load for capacity testing the pipeline and index.
+
+    Bursts multiply the rate by burst_factor for burst_seconds out of every
+    burst_every seconds. Event contents and event times depend only on the
+    seed, so two runs with the same config produce the same stream.
+    """
+
+    patients: int = 1000
+    events_per_second: float = 1000.0
+    batch_size: int = 500
+    abnormal_ratio: float = 0.1
+    burst_every: float = 0.0
+    burst_seconds: float = 0.0
+    burst_factor: float = 1.0
+    max_events: Optional[int] = None
+    seed: int = 0
+    report_every: float = 5.0
+    start: datetime = datetime(2025, 11, 17, tzinfo=timezone.utc)
+
+    @classmethod
+    def from_env(cls) -> Optional['LoadConfig']:
+        # SIM_EVENTS_PER_SECOND switches the connector into generator mode
+        rate = os.environ.get('SIM_EVENTS_PER_SECOND')
+        if not rate:
+            return None
+        max_events = os.environ.get('SIM_MAX_EVENTS')
+        return cls(
+            patients=int(os.environ.get('SIM_PATIENTS', cls.patients)),
+            events_per_second=float(rate),
+            batch_size=int(os.environ.get('SIM_BATCH_SIZE', cls.batch_size)),
+            abnormal_ratio=float(os.environ.get('SIM_ABNORMAL_RATIO', cls.abnormal_ratio)),
+            burst_every=float(os.environ.get('SIM_BURST_EVERY', cls.burst_every)),
+            burst_seconds=float(os.environ.get('SIM_BURST_SECONDS', cls.burst_seconds)),
+            burst_factor=float(os.environ.get('SIM_BURST_FACTOR', cls.burst_factor)),
+            max_events=int(max_events) if max_events else None,
+            seed=int(os.environ.get('SIM_SEED', cls.seed)),
+        )
+
+    def rate_at(self, elapsed: float) -> float:
+        if self.burst_every > 0 and elapsed % self.burst_every < self.burst_seconds:
+            return self.events_per_second * self.burst_factor
+        return self.events_per_second
+
+
+class ThroughputCounters:
+    """Events and commits pushed into Pathway, read by a reporter or tests."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.events = 0
+        self.batches = 0
+        self.abnormal = 0
+        self.started = time.perf_counter()
+        # Seconds the generator is behind its schedule; growing lag means
+        # Pathway cannot take events as fast as they are offered
+        self.lag = 0.0
+
+    def record(self, events: int, abnormal: int, lag: float) -> None:
+        with self._lock:
+            self.events += events
+            self.abnormal += abnormal
+            self.batches += 1
+            self.lag = lag
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            return {
+                'events': self.events,
+                'batches': self.batches,
+                'abnormal': self.abnormal,
+                'elapsed_s': round(elapsed, 3),
+                'events_per_second': round(self.events / elapsed, 1) if elapsed > 0 else 0.0,
+                'lag_s': round(self.lag, 3),
+            }
+
+
+def generate_event(rng: random.Random, config: LoadConfig, offset: float) -> dict:
+    """One vital reading, offset seconds after config.start."""
+    patient = rng.randrange(config.patients)
+    event_time = config.start + timedelta(seconds=offset)
+    if rng.random() < config.abnormal_ratio:
+        heart_rate = rng.randint(105, 135)
+        systolic = rng.randint(140, 175)
+        diastolic = rng.randint(90, 115)
+        note = 'elevated'
+    else:
+        heart_rate = int(rng.gauss(82, 8))
+        systolic = int(rng.gauss(115, 8))
+        diastolic = int(rng.gauss(74, 6))
+        note = 'normal'
+    return {
+        'patient_id': f'p{patient}',
+        'timestamp': event_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        'heart_rate': heart_rate,
+        'bp_systolic': systolic,
+        'bp_diastolic': diastolic,
+        'note': note,
+    }
+
+
 class SimulatedSubject(pw.io.python.ConnectorSubject):
+    def __init__(self, load: Optional[LoadConfig] = None) -> None:
+        super().__init__()
+        self.load = load
+        self.counters = ThroughputCounters()
+
+    @property
+    def _session_type(self) -> SessionType:
+        # A replayed event lands on its existing (patient_id, timestamp) key
+        # and replaces itself instead of appearing twice in the history
+        return SessionType.UPSERT
+
     def run(self) -> None:
+        if self.load is not None:
+            self._generate(self.load)
+            return
         events = [
             {'patient_id': 'p1', 'timestamp': '2025-11-17T00:00:00Z', 'heart_rate': 88, 'bp_systolic': 120, 'bp_diastolic': 78, 'note': 'normal'},
             {'patient_id': 'p2', 'timestamp': '2025-11-17T00:00:10Z', 'heart_rate': 110, 'bp_systolic': 140, 'bp_diastolic': 90, 'note': 'elevated'},
@@ -28,24 +159,89 @@ class SimulatedSubject(pw.io.python.ConnectorSubject):
             # on error let Pathway know by closing
             self.close()
 
+    def _generate(self, config: LoadConfig) -> None:
+        rng = random.Random(config.seed)
+        seq = 0
+        started = self.counters.started = time.perf_counter()
+        # Seconds after start at which the next batch is due
+        due = 0.0
+        last_report = started
+        while config.max_events is None or seq < config.max_events:
+            size = config.batch_size
+            if config.max_events is not None:
+                size = min(size, config.max_events - seq)
+            rate = config.rate_at(due)
+            abnormal = 0
+            # Event times follow the schedule, so bursts are dense in event time too
+            for k in range(size):
+                event = generate_event(rng, config, due + k / rate)
+                abnormal += event['note'] == 'elevated'
+                self.next(**event)
+            seq += size
+            # One commit per batch, so Pathway processes the batch as one update
+            self.commit()
+            due += size / rate
+            now = time.perf_counter() - started
+            self.counters.record(size, abnormal, max(0.0, now - due))
+            if due > now:
+                time.sleep(due - now)
+            if config.report_every and time.perf_counter() - last_report >= config.report_every:
+                last_report = time.perf_counter()
+                logger.info('simulated stream %s', self.counters.snapshot())
+        logger.info('simulated stream finished %s', self.counters.snapshot())
+
     def on_stop(self) -> None:
         # Cleanup if necessary
         pass
 
-# Helper function to expose a pw.io.python.read table using this subject
-def read_simulated_stream(autocommit_duration_ms: Optional[int] = 1000):
+
+# Helper function to expose a pw.io.python.read table using this subject.
+# Pass a subject to keep a handle on its throughput counters
+def read_simulated_stream(
+    autocommit_duration_ms: Optional[int] = 1000,
+    load: Optional[LoadConfig] = None,
+    subject: Optional[SimulatedSubject] = None,
+):
+    """Append-only history of readings, one row per (patient_id, timestamp)."""
     class InputSchema(pw.Schema):
         patient_id: str = pw.column_definition(primary_key=True)
-        timestamp: str
+        timestamp: str = pw.column_definition(primary_key=True)
         heart_rate: int
         bp_systolic: int
         bp_diastolic: int
         note: str
 
-    subject = SimulatedSubject()
+    if subject is None:
+        subject = SimulatedSubject(load)
     table = pw.io.python.read(
         subject,
         schema=InputSchema,
-        autocommit_duration_ms=autocommit_duration_ms
+        # Generator mode commits once per batch itself
+        autocommit_duration_ms=None if subject.load is not None else autocommit_duration_ms
     )
     return table
+
+
+def latest_vitals(history: pw.Table) -> pw.Table:
+    """The newest reading per patient, keyed by patient_id.
+
+    Rows are replaced only by readings with a later event time, so late
+    arrivals do not overwrite current vitals. Look a patient up with
+    latest.ix_ref(patient_id) without touching the history.
+    """
+    latest = with_event_time(history).deduplicate(
+        value=pw.this.event_time,
+        instance=pw.this.patient_id,
+        acceptor=lambda new, old: new > old,
+    )
+    return latest.with_id_from(pw.this.patient_id)
+
+
+def read_simulated_tables(
+    autocommit_duration_ms: Optional[int] = 1000,
+    load: Optional[LoadConfig] = None,
+    subject: Optional[SimulatedSubject] = None,
+) -> tuple[pw.Table, pw.Table]:
+    """History and latest-vitals tables fed by one simulated stream."""
+    history = read_simulated_stream(autocommit_duration_ms, load, subject)
+    return history, latest_vitals(history)
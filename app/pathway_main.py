@@ -1,29 +1,30 @@
 import pathway as pw
-from app.connectors.simulated_stream import read_simulated_stream
+from app.connectors.simulated_stream import LoadConfig, read_simulated_tables
 from app.processing.feature_engineering import compute_trends
 from app.rag.live_index import make_index
-from app.rag.llm_pipeline import build_pipeline
+from app.rag.llm_pipeline import build_pipeline, build_streaming_pipeline
+
+TRENDS_OUTPUT = 'app/data/trends_output.jsonl'
 
 def run_pathway():
-    # Read from simulated subject into a Pathway table
-    stream_table = read_simulated_stream(autocommit_duration_ms=1000)
+    # Read from simulated subject into a Pathway table. Setting
+    # SIM_EVENTS_PER_SECOND replaces the demo events with generated load
+    history, latest = read_simulated_tables(autocommit_duration_ms=1000, load=LoadConfig.from_env())
 
-    # Example transformation - compute rolling averages (placeholder)
-    try:
-        trends_table = compute_trends(stream_table)
-        # Optionally write to csv for inspection
-        pw.io.csv.write(trends_table, 'app/data/trends_output.csv')
-    except Exception:
-        # If compute_trends is a placeholder, ignore failure here
-        pass
+    # Rolling heart rate and blood pressure trends per patient. Each closed
+    # window is appended to the file once instead of the file being rewritten
+    trends_table = compute_trends(history)
+    pw.io.jsonlines.write(trends_table, TRENDS_OUTPUT)
 
     # Build live RAG index from app/data/maternal_knowledge_base
     index = make_index()
     rag_answer = build_pipeline(index)
 
-    # expose rag_answer for the API server to call
-    global RAG_ANSWER
+    # expose rag_answer, its streaming variant and current vitals per patient for the API server
+    global RAG_ANSWER, RAG_STREAM, LATEST_VITALS
     RAG_ANSWER = rag_answer
+    RAG_STREAM = build_streaming_pipeline(index)
+    LATEST_VITALS = latest
 
 if __name__ == '__main__':
     run_pathway()
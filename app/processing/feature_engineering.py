@@ -1,5 +1,134 @@
+"""Rolling per-patient vital trends over sliding event-time windows.
+
+For every window the stage keeps running sums, counts and min/max of each
+signal. Mean and least-squares slope are derived from those sums. An event
+therefore updates a few accumulators per window it falls in, and old
+windows are dropped once they are past their cutoff, so the per-event cost
+and the state stay flat however long the stream runs.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
 import pathway as pw
 
-def compute_trends(table):
-    # Example streaming aggregation. Replace with your own logic.
-    return table.groupby('patient_id').rolling(window=3, on='timestamp').aggregate({'heart_rate': 'avg'})
+SIGNALS = ('heart_rate', 'bp_systolic', 'bp_diastolic')
+
+# Slopes are fitted on hours since this instant. A nearby origin keeps the
+# running sums of t and t*t small enough that float64 does not cancel them away
+TREND_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class TrendWindow:
+    name: str
+    duration: timedelta
+    hop: timedelta
+
+
+DEFAULT_WINDOWS = (
+    TrendWindow('15m', duration=timedelta(minutes=15), hop=timedelta(minutes=5)),
+    TrendWindow('1h', duration=timedelta(hours=1), hop=timedelta(minutes=15)),
+    TrendWindow('6h', duration=timedelta(hours=6), hop=timedelta(hours=1)),
+)
+
+
+def parse_timestamp(value: str) -> datetime:
+    # ISO 8601 as sent by the connectors; naive values are taken as UTC
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+@pw.udf(deterministic=True)
+def _event_time(value: str) -> pw.DateTimeUtc:
+    return parse_timestamp(value)
+
+
+@pw.udf(deterministic=True)
+def _hours_since_epoch(value: str) -> float:
+    return (parse_timestamp(value) - TREND_EPOCH).total_seconds() / 3600
+
+
+@pw.udf(deterministic=True)
+def _slope(n: int, sum_t: float, sum_tt: float, sum_y: float, sum_ty: float) -> Optional[float]:
+    # Least-squares slope per hour; undefined for one reading or a single instant
+    denominator = n * sum_tt - sum_t * sum_t
+    if n < 2 or denominator <= 1e-12:
+        return None
+    return (n * sum_ty - sum_t * sum_y) / denominator
+
+
+def with_event_time(table: pw.Table) -> pw.Table:
+    """Add a parsed event_time column to a table with ISO string timestamps."""
+    return table.with_columns(event_time=_event_time(pw.this.timestamp))
+
+
+def _window_trends(events: pw.Table, window: TrendWindow, live: bool) -> pw.Table:
+    # Live results update a window on every event; otherwise each window is
+    # emitted once, when it closes, which keeps sink writes to one row per window
+    if live:
+        behavior = pw.temporal.common_behavior(cutoff=window.duration)
+    else:
+        behavior = pw.temporal.exactly_once_behavior()
+    windowed = events.windowby(
+        pw.this.event_time,
+        window=pw.temporal.sliding(hop=window.hop, duration=window.duration),
+        instance=pw.this.patient_id,
+        behavior=behavior,
+    )
+    sums = {}
+    for signal in SIGNALS:
+        sums[f'sum_{signal}'] = pw.reducers.sum(pw.this[signal])
+        sums[f'sum_t_{signal}'] = pw.reducers.sum(pw.this[f't_{signal}'])
+        sums[f'min_{signal}'] = pw.reducers.min(pw.this[signal])
+        sums[f'max_{signal}'] = pw.reducers.max(pw.this[signal])
+    reduced = windowed.reduce(
+        patient_id=pw.this._pw_instance,
+        window_start=pw.this._pw_window_start,
+        window_end=pw.this._pw_window_end,
+        count=pw.reducers.count(),
+        sum_t=pw.reducers.sum(pw.this.t),
+        sum_tt=pw.reducers.sum(pw.this.tt),
+        **sums,
+    )
+    stats = {}
+    for signal in SIGNALS:
+        stats[f'{signal}_mean'] = pw.this[f'sum_{signal}'] / pw.this.count
+        stats[f'{signal}_min'] = pw.this[f'min_{signal}']
+        stats[f'{signal}_max'] = pw.this[f'max_{signal}']
+        stats[f'{signal}_slope'] = _slope(
+            pw.this.count, pw.this.sum_t, pw.this.sum_tt, pw.this[f'sum_{signal}'], pw.this[f'sum_t_{signal}']
+        )
+    return reduced.select(
+        pw.this.patient_id,
+        window=window.name,
+        window_start=pw.this.window_start,
+        window_end=pw.this.window_end,
+        readings=pw.this.count,
+        **stats,
+    )
+
+
+def compute_trends(
+    table: pw.Table,
+    windows: Iterable[TrendWindow] = DEFAULT_WINDOWS,
+    live: bool = False,
+) -> pw.Table:
+    """Mean, min, max and slope per hour of each vital, per patient and window.
+
+    table needs patient_id, an ISO timestamp string and the SIGNALS columns.
+    The result has one row per patient and window instance, tagged with the
+    window name.
+    """
+    events = with_event_time(table).with_columns(t=_hours_since_epoch(pw.this.timestamp))
+    # Products are formed once per event rather than once per window it falls in
+    events = events.with_columns(
+        tt=pw.this.t * pw.this.t,
+        **{f't_{signal}': pw.this.t * pw.this[signal] for signal in SIGNALS},
+    )
+    per_window = [_window_trends(events, window, live) for window in windows]
+    if not per_window:
+        raise ValueError('compute_trends needs at least one window')
+    return pw.Table.concat_reindex(*per_window)
@@ -0,0 +1,30 @@
+import re
+from typing import List
+
+# MiniLM reads at most 256 word pieces, roughly 190 English words, so the
+# default chunk stays comfortably inside what the encoder sees
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+
+_WORD = re.compile(r'\S+')
+
+
+def chunk_text(text: str, size: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into windows of size words, each sharing overlap words with the last.
+
+    Chunks are cut from the original string, so line breaks and spacing
+    inside a chunk are kept.
+    """
+    if size <= 0 or not 0 <= overlap < size:
+        raise ValueError('chunk size must be positive and larger than the overlap')
+    words = list(_WORD.finditer(text))
+    if not words:
+        return []
+    chunks = []
+    step = size - overlap
+    for start in range(0, len(words), step):
+        end = min(start + size, len(words))
+        chunks.append(text[words[start].start():words[end - 1].end()])
+        if end == len(words):
+            break
+    return chunks
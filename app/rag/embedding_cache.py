@@ -0,0 +1,100 @@
+"""On-disk embedding cache keyed by model name and text content.
+
+Vectors live in one flat float32 file that is memory-mapped on open, next
+to a text file listing the key of each row. Loading the cache reads only
+the key list; vectors are paged in by the OS when the index touches them.
+New entries are appended to both files, so existing rows never move.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = 'app/data/embedding_cache'
+
+
+def content_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f'{model_name}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str, model_name: str) -> None:
+        # One subdirectory per model keeps dimensions from mixing
+        slug = hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:16]
+        self.directory = Path(directory) / slug
+        self.model_name = model_name
+        self.vectors_path = self.directory / 'vectors.f32'
+        self.keys_path = self.directory / 'keys.txt'
+        self.meta_path = self.directory / 'meta.json'
+        self.dim = None
+        self.rows: Dict[str, int] = {}
+        self._vectors = None
+        self._load()
+
+    def _load(self) -> None:
+        if not self.meta_path.exists():
+            return
+        self.dim = json.loads(self.meta_path.read_text())['dim']
+        text = self.keys_path.read_text() if self.keys_path.exists() else ''
+        keys = [key for key in text.split('\n') if len(key) == 64]
+        if text and not text.endswith('\n'):
+            # Drop a key line cut short by an interrupted append
+            self.keys_path.write_text(''.join(key + '\n' for key in keys))
+        # Vectors are written before their keys, so a crash mid-append leaves
+        # at most an unreferenced tail in the vector file
+        row_bytes = self.dim * 4
+        stored = os.path.getsize(self.vectors_path) // row_bytes if self.vectors_path.exists() else 0
+        self.rows = {key: row for row, key in enumerate(keys[:stored])}
+        self._map()
+
+    def _map(self) -> None:
+        count = len(self.rows)
+        self._vectors = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(count, self.dim)) if count else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self.meta_path.write_text(json.dumps({'model': self.model_name, 'dim': self.dim}))
+        # Truncate any tail left by an interrupted append before adding rows
+        with open(self.vectors_path, 'ab') as fh:
+            fh.truncate(len(self.rows) * self.dim * 4)
+            fh.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        with open(self.keys_path, 'a') as fh:
+            for key in keys:
+                fh.write(key + '\n')
+        for key in keys:
+            self.rows[key] = len(self.rows)
+        self._map()
+
+    def embed(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+              batch_size: int = 256) -> np.ndarray:
+        """Vectors for texts, calling encode only for texts not cached yet.
+
+        Missing texts are encoded batch_size at a time and each batch is
+        stored before the next, so an interrupted build keeps its progress.
+        """
+        keys = [content_key(self.model_name, text) for text in texts]
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in self.rows and key not in missing:
+                missing[key] = text
+        pending = list(missing.items())
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            vectors = encode([text for _, text in batch])
+            self._append([key for key, _ in batch], np.asarray(vectors, dtype=np.float32))
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        # Fancy indexing copies the rows into one contiguous matrix
+        return self._vectors[[self.rows[key] for key in keys]]
@@ -1,9 +1,75 @@
-import pathway as pw
-from pathway.xpacks.llm.embeddings import SentenceTransformerEmbedder
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from app.rag.chunking import CHUNK_OVERLAP, CHUNK_WORDS, chunk_text
+from app.rag.embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+from app.rag.vector_index import ExactIndex, build_backend
+
+KNOWLEDGE_BASE_DIR = 'app/data/maternal_knowledge_base'
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBED_BATCH_SIZE = 64
+
+
+class KnowledgeIndex:
+    """Top-k search over overlapping chunks of the knowledge base text files.
+
+    Chunk vectors come from the embedding cache, so only chunks whose text
+    is new or has changed are sent to the model. They are kept as one
+    contiguous float32 matrix that the search backend scans. refresh()
+    rescans the folder and is cheap when nothing changed.
+    """
+
+    def __init__(self, folder: str = KNOWLEDGE_BASE_DIR, model_name: str = MODEL_NAME,
+                 cache_dir: Optional[str] = None, chunk_words: int = CHUNK_WORDS,
+                 chunk_overlap: int = CHUNK_OVERLAP, backend: Optional[str] = None) -> None:
+        self.folder = Path(folder)
+        self.model_name = model_name
+        self.cache = EmbeddingCache(cache_dir or os.environ.get('EMBEDDING_CACHE_DIR', DEFAULT_CACHE_DIR), model_name)
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.backend_name = backend
+        self._model = None
+        self.sources: List[str] = []
+        self.texts: List[str] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.backend = ExactIndex(self.vectors)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # The model is loaded only when something actually needs embedding
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True,
+                                  normalize_embeddings=True)
+
+    def refresh(self) -> 'KnowledgeIndex':
+        sources, texts = [], []
+        for path in sorted(self.folder.glob('*.txt')):
+            for chunk in chunk_text(path.read_text(encoding='utf-8'), self.chunk_words, self.chunk_overlap):
+                sources.append(path.name)
+                texts.append(chunk)
+        vectors = self.cache.embed(texts, self.encode, batch_size=EMBED_BATCH_SIZE * 4)
+        backend = build_backend(vectors, self.backend_name)
+        self.vectors, self.backend = vectors, backend
+        self.sources, self.texts = sources, texts
+        return self
+
+    def search_vector(self, vector: np.ndarray, k: int = 3) -> List[str]:
+        if not self.texts:
+            return []
+        ids, _ = self.backend.search(np.asarray(vector, dtype=np.float32), k)
+        return [self.texts[i] for i in ids]
+
+    def search(self, query: str, k: int = 3) -> List[str]:
+        if not self.texts:
+            return []
+        return self.search_vector(self.encode([query])[0], k)
+
 
 def make_index():
     # Reads text files from the maternal knowledge base and indexes them
-    docs = pw.io.fs.read('app/data/maternal_knowledge_base', format='txt')
-    embedder = SentenceTransformerEmbedder('sentence-transformers/all-MiniLM-L6-v2')
-    index = embedder.index(docs, name='maternal_index')
-    return index
+    return KnowledgeIndex().refresh()
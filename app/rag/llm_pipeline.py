@@ -1,10 +1,12 @@
-import pathway as pw
+from typing import Iterator
+
 from pathway.xpacks.llm.llms import BDH
 
 model = BDH()
 
-@pw.udf
 def make_prompt(question, context):
+    if isinstance(context, (list, tuple)):
+        context = '\n\n'.join(context)
     return f"""You are an assistant specialized in maternal health. Use the provided context and live data to answer accurately.
 
 Context:
@@ -20,3 +22,16 @@ def build_pipeline(index):
         resp = model.generate(prompt)
         return resp
     return answer
+
+def build_streaming_pipeline(index):
+    # Yields the reply piece by piece when the model can stream, otherwise
+    # yields it whole once generated
+    def answer_stream(q) -> Iterator[str]:
+        ctx = index.search(q, k=5)
+        prompt = make_prompt(q, ctx)
+        if hasattr(model, 'stream'):
+            for token in model.stream(prompt):
+                yield str(token)
+        else:
+            yield str(model.generate(prompt))
+    return answer_stream
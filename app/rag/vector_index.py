@@ -0,0 +1,120 @@
+"""In-process top-k search over one contiguous float32 matrix of unit vectors.
+
+ExactIndex scores every row with a single matrix-vector product. IVFIndex
+clusters the rows and scores only the rows of the clusters nearest the
+query. With the default settings it scans about 3% of a 100k-chunk matrix,
+which keeps a search well under a millisecond. When faiss is installed,
+the "faiss" backend runs the same inverted-file search in its own kernels.
+"""
+import os
+from typing import Dict, Optional, Tuple, Type
+
+import numpy as np
+
+# Below this many rows an exact scan is already as fast as probing clusters
+AUTO_EXACT_ROWS = 20_000
+DEFAULT_NPROBE = 8
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class ExactIndex:
+    def __init__(self, matrix: np.ndarray) -> None:
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.matrix @ query
+        top = _top_k(scores, k)
+        return top, scores[top]
+
+
+class IVFIndex:
+    """Inverted-file index from spherical k-means on a sample of the rows.
+
+    Rows are stored sorted by cluster, so each cluster is a contiguous slice
+    of the matrix and probing it is one matrix-vector product.
+    """
+
+    def __init__(self, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE,
+                 iterations: int = 10, seed: int = 0) -> None:
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        n = len(matrix)
+        nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(n, min(n, 64 * nlist), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # An empty cluster keeps its old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        assign = np.concatenate([
+            np.argmax(matrix[start:start + 8192] @ centroids.T, axis=1) for start in range(0, n, 8192)
+        ]) if n else np.zeros(0, dtype=np.int64)
+        order = np.argsort(assign, kind='stable')
+        self.centroids = np.ascontiguousarray(centroids)
+        self.matrix = np.ascontiguousarray(matrix[order])
+        self.ids = order
+        self.offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.nprobe = min(nprobe, nlist)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probes = _top_k(self.centroids @ query, self.nprobe)
+        rows = []
+        scores = []
+        for cluster in probes:
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if end > start:
+                rows.append(np.arange(start, end))
+                scores.append(self.matrix[start:end] @ query)
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        top = _top_k(scores, k)
+        return self.ids[rows[top]], scores[top]
+
+
+class FaissIndex:
+    def __init__(self, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE) -> None:
+        import faiss
+
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        n, dim = matrix.shape
+        nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        self.index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        self.index.train(matrix)
+        self.index.add(matrix)
+        self.index.nprobe = nprobe
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, ids = self.index.search(query.reshape(1, -1).astype(np.float32), k)
+        found = ids[0] >= 0
+        return ids[0][found], scores[0][found]
+
+
+BACKENDS: Dict[str, Type] = {'exact': ExactIndex, 'ivf': IVFIndex, 'faiss': FaissIndex}
+
+
+def build_backend(matrix: np.ndarray, backend: Optional[str] = None):
+    """Search backend for matrix, chosen by name or by RAG_INDEX_BACKEND.
+
+    "auto" uses an exact scan for small matrices and IVF above
+    AUTO_EXACT_ROWS rows. An empty matrix always gets an exact scan, since
+    there is nothing to cluster.
+    """
+    backend = backend or os.environ.get('RAG_INDEX_BACKEND', 'auto')
+    if backend != 'auto' and backend not in BACKENDS:
+        raise ValueError(f'Unknown vector index backend {backend!r}, expected one of {sorted(BACKENDS)}')
+    if not len(matrix):
+        return ExactIndex(matrix)
+    if backend == 'auto':
+        backend = 'exact' if len(matrix) <= AUTO_EXACT_ROWS else 'ivf'
+    return BACKENDS[backend](matrix)
@@ -1,8 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import importlib
-import threading
-import time
+import anyio
+import asyncio
+import json
+import os
 
 app = FastAPI()
 
@@ -16,18 +19,145 @@ except Exception as e:
     pm = None
 
 # If pathway was run separately, pm.RAG_ANSWER should be available. If not, responses will be simulated.
+FALLBACK_REPLY = 'Pathway not initialized. This is a placeholder response. Run pathway_main to initialize the model and index.'
+
 def get_answer_fn():
     if pm and hasattr(pm, 'RAG_ANSWER') and pm.RAG_ANSWER:
         return pm.RAG_ANSWER
     else:
         # fallback function
         def fallback(q):
-            return 'Pathway not initialized. This is a placeholder response. Run pathway_main to initialize the model and index.'
+            return FALLBACK_REPLY
         return fallback
 
+def get_stream_fn():
+    if pm and hasattr(pm, 'RAG_STREAM') and pm.RAG_STREAM:
+        return pm.RAG_STREAM
+    answer = ANSWER_FN
+    # Without a streaming pipeline the whole reply arrives as one piece
+    def whole(q):
+        yield str(answer(q))
+    return whole
+
 ANSWER_FN = get_answer_fn()
+STREAM_FN = get_stream_fn()
+
+
+class ChatLimiter:
+    """Bounds concurrent answers and how many requests may wait for a slot.
+
+    Retrieval and generation run in worker threads, so the event loop stays
+    free while they work. Requests beyond max_waiting are turned away with
+    503 at once instead of piling up behind the model.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self) -> None:
+        if self.waiting >= self.max_waiting and self._slots.locked():
+            raise HTTPException(status_code=503, detail='Chat is busy, try again shortly',
+                                headers={'Retry-After': '2'})
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    def status(self) -> dict:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+        }
+
+
+limiter = ChatLimiter(
+    max_concurrent=int(os.environ.get('CHAT_MAX_CONCURRENT', '4')),
+    max_waiting=int(os.environ.get('CHAT_MAX_WAITING', '32')),
+)
+
+
+def _queue_headers(response: Response) -> None:
+    response.headers['X-Chat-Active'] = str(limiter.active)
+    response.headers['X-Chat-Waiting'] = str(limiter.waiting)
+
 
 @app.post('/chat')
-def chat(body: ChatInput):
-    reply = ANSWER_FN(body.message)
+async def chat(body: ChatInput, response: Response):
+    await limiter.acquire()
+    try:
+        _queue_headers(response)
+        reply = await run_in_threadpool(ANSWER_FN, body.message)
+    finally:
+        limiter.release()
     return {'reply': str(reply)}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _answer_events(answer):
+    try:
+        async for token in iterate_in_threadpool(answer):
+            yield _sse('token', {'text': token})
+        yield _sse('done', {})
+    except Exception:
+        yield _sse('error', {'detail': 'The answer could not be generated'})
+
+
+class ChatStreamResponse(StreamingResponse):
+    """Server-Sent Events response that holds a limiter slot until it ends.
+
+    The slot is released here rather than in the event generator, whose
+    cleanup never runs if the client leaves before the first piece. The
+    answer generator is closed first, so a cancelled stream has stopped
+    generating by the time its slot goes to the next request.
+    """
+
+    def __init__(self, answer, headers: dict) -> None:
+        self.answer = answer
+        super().__init__(_answer_events(answer), media_type='text/event-stream', headers=headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+                close = getattr(self.answer, 'close', None)
+                if close is not None:
+                    await run_in_threadpool(close)
+                limiter.release()
+
+
+@app.post('/chat/stream')
+async def chat_stream(body: ChatInput):
+    """Server-Sent Events: token events with pieces of the reply, then done.
+
+    The concurrency slot is held until the stream ends or the client leaves.
+    """
+    await limiter.acquire()
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'X-Chat-Active': str(limiter.active),
+        'X-Chat-Waiting': str(limiter.waiting),
+    }
+    return ChatStreamResponse(STREAM_FN(body.message), headers)
+
+
+@app.get('/chat/status')
+async def chat_status():
+    return limiter.status()
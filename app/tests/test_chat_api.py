@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import app.server.api as api
+from app.server.api import ChatLimiter
+
+
+def test_limiter_turns_requests_away_once_the_queue_is_full():
+    async def scenario():
+        limiter = ChatLimiter(max_concurrent=1, max_waiting=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.status()['waiting'] == 1
+        with pytest.raises(HTTPException) as busy:
+            await limiter.acquire()
+        assert busy.value.status_code == 503
+
+        limiter.release()
+        await waiter
+        assert (limiter.active, limiter.waiting) == (1, 0)
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+def stream_request(receive_disconnect_after):
+    body = json.dumps({'message': 'hello'}).encode()
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.sleep(receive_disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.0'}, 'http_version': '1.1',
+        'method': 'POST', 'path': '/chat/stream', 'raw_path': b'/chat/stream', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')], 'scheme': 'http', 'root_path': '',
+        'server': ('test', 80), 'client': ('test', 1),
+    }
+    return scope, receive
+
+
+def test_stream_slot_is_released_after_the_answer_stops(monkeypatch):
+    limiter = ChatLimiter(max_concurrent=1, max_waiting=0)
+    monkeypatch.setattr(api, 'limiter', limiter)
+    closed = []
+
+    def endless(question):
+        try:
+            while True:
+                time.sleep(0.01)
+                yield 'more '
+        finally:
+            closed.append(limiter.active)
+
+    monkeypatch.setattr(api, 'STREAM_FN', endless)
+    scope, receive = stream_request(receive_disconnect_after=0.1)
+    sent = []
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(api.app(scope, receive, send))
+    assert 'http.response.body' in sent
+    # The answer was closed while the slot was still held, then released
+    assert closed == [1]
+    assert limiter.active == 0
+
+
+def test_stream_slot_is_released_when_the_client_leaves_before_the_first_piece(monkeypatch):
+    limiter = ChatLimiter(max_concurrent=1, max_waiting=0)
+    monkeypatch.setattr(api, 'limiter', limiter)
+    monkeypatch.setattr(api, 'STREAM_FN', lambda question: iter(['never sent']))
+    scope, receive = stream_request(receive_disconnect_after=10)
+    scope['asgi']['spec_version'] = '2.4'
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            raise OSError('client went away')
+
+    with pytest.raises(Exception):
+        asyncio.run(api.app(scope, receive, send))
+    assert limiter.active == 0
@@ -0,0 +1,49 @@
+import numpy as np
+
+from app.rag.embedding_cache import EmbeddingCache
+
+MODEL = 'test-model'
+
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), text.count('a'), 1.0] for text in texts], dtype=np.float32)
+    return encode
+
+
+def test_only_new_texts_are_encoded_and_rows_survive_reload(tmp_path):
+    calls = []
+    cache = EmbeddingCache(str(tmp_path), MODEL)
+    first = cache.embed(['alpha', 'beta', 'alpha'], fake_encode(calls), batch_size=1)
+    assert calls == [['alpha'], ['beta']]
+    assert first.shape == (3, 3)
+    assert np.array_equal(first[0], first[2])
+
+    reloaded = EmbeddingCache(str(tmp_path), MODEL)
+    assert len(reloaded) == 2
+    again = reloaded.embed(['beta', 'gamma'], fake_encode(calls))
+    assert calls[-1] == ['gamma']
+    assert np.array_equal(again[0], first[1])
+    # Another model name gets its own rows
+    assert len(EmbeddingCache(str(tmp_path), 'other-model')) == 0
+
+
+def test_torn_append_is_truncated_on_reload(tmp_path):
+    calls = []
+    cache = EmbeddingCache(str(tmp_path), MODEL)
+    expected = cache.embed(['one', 'two'], fake_encode(calls))
+    # A crash after the vectors were written but mid-way through the key line
+    with open(cache.vectors_path, 'ab') as fh:
+        fh.write(np.ones(3, dtype=np.float32).tobytes())
+    with open(cache.keys_path, 'a') as fh:
+        fh.write('abc123')
+
+    reloaded = EmbeddingCache(str(tmp_path), MODEL)
+    assert len(reloaded) == 2
+    assert reloaded.keys_path.read_text().endswith('\n')
+    vectors = reloaded.embed(['one', 'two', 'three'], fake_encode(calls))
+    assert calls[-1] == ['three']
+    assert np.array_equal(vectors[:2], expected)
+    assert vectors[2].tolist() == [5.0, 0.0, 1.0]
+    assert reloaded.vectors_path.stat().st_size == 3 * 3 * 4
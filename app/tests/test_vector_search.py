@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.rag.chunking import chunk_text
+from app.rag.vector_index import ExactIndex, IVFIndex, build_backend
+
+
+def unit_rows(n, dim=16, seed=1):
+    rows = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_chunks_overlap_and_keep_original_spacing():
+    text = ' '.join(f'w{i}' for i in range(10)).replace('w4 ', 'w4\n')
+    chunks = chunk_text(text, size=4, overlap=1)
+    assert chunks == ['w0 w1 w2 w3', 'w3 w4\nw5 w6', 'w6 w7 w8 w9']
+    assert chunk_text('a b c', size=4, overlap=1) == ['a b c']
+    assert chunk_text('  \n ', size=4, overlap=1) == []
+    with pytest.raises(ValueError):
+        chunk_text(text, size=4, overlap=4)
+
+
+def test_exact_index_returns_best_rows_in_score_order():
+    matrix = unit_rows(50)
+    ids, scores = ExactIndex(matrix).search(matrix[7], k=3)
+    assert ids[0] == 7
+    assert scores[0] == pytest.approx(1.0)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert len(ExactIndex(matrix).search(matrix[0], k=80)[0]) == 50
+
+
+def test_ivf_probing_every_cluster_matches_exact_search():
+    matrix = unit_rows(400)
+    exact = ExactIndex(matrix)
+    ivf = IVFIndex(matrix, nlist=10, nprobe=10)
+    for row in (0, 123, 399):
+        assert list(ivf.search(matrix[row], k=5)[0]) == list(exact.search(matrix[row], k=5)[0])
+    # With few probes the query row still sits in its own nearest cluster
+    narrow = IVFIndex(matrix, nlist=10, nprobe=1)
+    assert narrow.search(matrix[123], k=1)[0][0] == 123
+
+
+def test_empty_matrix_falls_back_to_exact_search():
+    empty = np.zeros((0, 16), dtype=np.float32)
+    for backend in ('auto', 'ivf', 'exact'):
+        index = build_backend(empty, backend)
+        assert isinstance(index, ExactIndex)
+        assert len(index.search(np.ones(16, dtype=np.float32), k=3)[0]) == 0
+    with pytest.raises(ValueError):
+        build_backend(empty, 'annoy')
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Set
+
+from .schemas import RiskChange
+
+
+class ChangeSubscription:
+    """One dashboard's filtered, coalesced view of risk changes.
+
+    Changes for the same patient arriving within the coalescing window are
+    merged, keeping the first previous score and band and the latest new
+    ones, so a burst of logs becomes a single update.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        bands: Optional[FrozenSet[str]] = None,
+        patient_ids: Optional[FrozenSet[str]] = None,
+        min_delta: float = 0.0,
+        coalesce_seconds: float = 0.25,
+    ) -> None:
+        self.bands = bands
+        self.patient_ids = patient_ids
+        self.min_delta = min_delta
+        self.coalesce_seconds = coalesce_seconds
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._pending: Dict[str, RiskChange] = {}
+        self._lock = threading.Lock()
+
+    def _wanted(self, change: RiskChange) -> bool:
+        if self.patient_ids is not None and change.patient_id not in self.patient_ids:
+            return False
+        if self.bands is not None and change.risk_band not in self.bands and change.previous_band not in self.bands:
+            return False
+        if change.previous_band != change.risk_band:
+            return True
+        # Same band means there was a previous score; bursts can net to zero
+        delta = abs(change.risk_score - change.previous_score)
+        return delta > 0 and delta >= self.min_delta
+
+    def offer(self, change: RiskChange) -> None:
+        # Called from whichever thread ran the ingest
+        if self.patient_ids is not None and change.patient_id not in self.patient_ids:
+            return
+        with self._lock:
+            earlier = self._pending.get(change.patient_id)
+            if earlier is not None:
+                change = change.model_copy(
+                    update={"previous_band": earlier.previous_band, "previous_score": earlier.previous_score}
+                )
+            self._pending[change.patient_id] = change
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def batches(self, idle_timeout: Optional[float] = None) -> AsyncIterator[List[RiskChange]]:
+        """Yield coalesced change batches; an empty batch means idle_timeout passed."""
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                yield []
+                continue
+            await asyncio.sleep(self.coalesce_seconds)
+            self._ready.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            batch = [change for change in pending.values() if self._wanted(change)]
+            if batch:
+                yield batch
+
+
+class ChangeBroker:
+    """Fans risk changes from the ingest path out to live subscribers."""
+
+    def __init__(self) -> None:
+        self._subscribers: Set[ChangeSubscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, subscription: ChangeSubscription) -> ChangeSubscription:
+        with self._lock:
+            self._subscribers = self._subscribers | {subscription}
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        with self._lock:
+            self._subscribers = self._subscribers - {subscription}
+
+    def publish(self, change: RiskChange) -> None:
+        # Subscribers are swapped as a whole set, so iterating needs no lock
+        for subscription in self._subscribers:
+            subscription.offer(change)
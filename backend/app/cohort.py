@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+
+class CohortTails:
+    """Rule inputs for every patient's latest in-window readings, one row each.
+
+    Rows are refreshed on ingest so batch scoring can evaluate the whole
+    cohort with array operations instead of walking patient state. Tails are
+    right aligned and padded with values that match no rule: 0 mmHg for
+    blood pressure, False for symptom flags and mood 5.
+    """
+
+    def __init__(self, vital_tail: int, symptom_tail: int, capacity: int = 1024) -> None:
+        self.vital_tail = vital_tail
+        self.symptom_tail = symptom_tail
+        self.rows: Dict[str, int] = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self.systolic = np.zeros((capacity, self.vital_tail), dtype=np.int16)
+        self.diastolic = np.zeros((capacity, self.vital_tail), dtype=np.int16)
+        self.concerning = np.zeros((capacity, self.symptom_tail), dtype=bool)
+        self.moderate = np.zeros((capacity, self.symptom_tail), dtype=bool)
+        self.moods = np.full((capacity, self.symptom_tail), 5, dtype=np.int8)
+        self.has_events = np.zeros(capacity, dtype=bool)
+
+    def _grow(self) -> None:
+        old = (self.systolic, self.diastolic, self.concerning, self.moderate, self.moods, self.has_events)
+        used = len(self.rows)
+        self._allocate(max(1024, 2 * len(self.has_events)))
+        new = (self.systolic, self.diastolic, self.concerning, self.moderate, self.moods, self.has_events)
+        for dst, src in zip(new, old):
+            dst[:used] = src[:used]
+
+    def _row(self, patient_id: str) -> int:
+        row = self.rows.get(patient_id)
+        if row is None:
+            if len(self.rows) == len(self.has_events):
+                self._grow()
+            row = self.rows[patient_id] = len(self.rows)
+        return row
+
+    def store(
+        self,
+        patient_id: str,
+        systolic: Sequence[int],
+        diastolic: Sequence[int],
+        concerning: Sequence[bool],
+        moderate: Sequence[bool],
+        moods: Sequence[int],
+        has_events: bool,
+    ) -> None:
+        row = self._row(patient_id)
+        for matrix, values, pad in (
+            (self.systolic, systolic, 0),
+            (self.diastolic, diastolic, 0),
+            (self.concerning, concerning, False),
+            (self.moderate, moderate, False),
+            (self.moods, moods, 5),
+        ):
+            width = matrix.shape[1]
+            matrix[row, : width - len(values)] = pad
+            if values:
+                matrix[row, width - len(values):] = values
+        self.has_events[row] = has_events
+
+    def row_indices(self, patient_ids: Iterable[str]) -> np.ndarray:
+        """Row per patient, -1 for patients without a stored tail."""
+        rows = self.rows
+        return np.fromiter((rows.get(pid, -1) for pid in patient_ids), dtype=np.int64)
+
+    def nbytes(self) -> int:
+        return sum(
+            matrix.nbytes
+            for matrix in (self.systolic, self.diastolic, self.concerning, self.moderate, self.moods, self.has_events)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
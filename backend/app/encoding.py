@@ -0,0 +1,71 @@
+"""JSON encoding for large responses, bypassing response model validation.
+
+orjson is used when installed; the standard library encoder is the
+fallback. Datetimes are written the way pydantic writes them, so clients
+see the same JSON from either path.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+from datetime import datetime
+from typing import Any, Iterator, List, Union
+
+from .ranking import DASHBOARD_ROW_FIELDS, DashboardPage, DashboardRow, DashboardStream
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# Rows per chunk when a dashboard page is streamed
+STREAM_CHUNK_ROWS = 1000
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def _rows(rows: List[DashboardRow]) -> bytes:
+    # The array brackets are added by the caller, so strip them here
+    return dumps([dict(zip(DASHBOARD_ROW_FIELDS, row)) for row in rows])[1:-1]
+
+
+def encode_dashboard(page: DashboardPage) -> bytes:
+    return dumps(
+        {
+            "generated_at": page.generated_at,
+            "patients": [dict(zip(DASHBOARD_ROW_FIELDS, row)) for row in page.rows],
+            "next_cursor": page.next_cursor,
+        }
+    )
+
+
+def stream_dashboard(
+    page: Union[DashboardPage, DashboardStream], chunk_rows: int = STREAM_CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Encode a page incrementally so only one chunk of JSON is alive at a time.
+
+    With a DashboardStream the rows are produced as they are encoded, and
+    its next_cursor is only known afterwards, so it is written last.
+    """
+    head = dumps({"generated_at": page.generated_at})
+    yield head[:-1] + b',"patients":['
+    rows = iter(page.rows)
+    separator = b""
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            break
+        yield separator + _rows(chunk)
+        separator = b","
+    yield b'],"next_cursor":' + dumps(page.next_cursor) + b"}"
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from .schemas import SymptomLog, VitalLog
+from .vocabulary import vocabulary
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(ts: datetime) -> int:
+    """Microseconds since the epoch. Naive timestamps are treated as UTC."""
+    delta = ts - (_EPOCH if ts.tzinfo is None else _EPOCH_UTC)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def delta_micros(delta: timedelta) -> int:
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(us: int, aware: bool) -> datetime:
+    return (_EPOCH_UTC if aware else _EPOCH) + timedelta(microseconds=us)
+
+
+class _TimeColumns:
+    """Shared timestamp column kept sorted so windows can be bisected.
+
+    Late arriving uploads are inserted at their position in time, so window
+    queries are O(log n + k) instead of a scan over the whole history.
+    """
+
+    __slots__ = ("times", "aware")
+    _columns: Tuple[str, ...] = ("times",)
+
+    def __init__(self) -> None:
+        self.times = array("q")
+        self.aware = False
+
+    def _position(self, ts: datetime) -> Tuple[int, int]:
+        us = to_micros(ts)
+        if not self.times:
+            self.aware = ts.tzinfo is not None
+        if not self.times or us >= self.times[-1]:
+            return len(self.times), us
+        # bisect_right keeps arrival order for events sharing a timestamp
+        return bisect_right(self.times, us), us
+
+    def index_since(self, cutoff_us: int) -> int:
+        return bisect_left(self.times, cutoff_us)
+
+    def evict_before(self, cutoff_us: int) -> int:
+        """Drop events older than cutoff_us from every column."""
+        idx = bisect_left(self.times, cutoff_us)
+        if idx:
+            for name in self._columns:
+                del getattr(self, name)[:idx]
+        return idx
+
+    def timestamp(self, idx: int) -> datetime:
+        return from_micros(self.times[idx], self.aware)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class VitalSeries(_TimeColumns):
+    __slots__ = ("weeks", "systolic", "diastolic", "heart_rate", "weight")
+    _columns = ("times", "weeks", "systolic", "diastolic", "heart_rate", "weight")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.weeks = array("h")
+        self.systolic = array("h")
+        self.diastolic = array("h")
+        self.heart_rate = array("h")
+        # float32 keeps ~7 significant digits, plenty for a scale reading
+        self.weight = array("f")
+
+    def add(self, log: VitalLog) -> int:
+        """Insert a log in time order and return its timestamp in micros."""
+        idx, us = self._position(log.timestamp)
+        self.times.insert(idx, us)
+        self.weeks.insert(idx, log.gestational_week)
+        self.systolic.insert(idx, log.systolic_bp)
+        self.diastolic.insert(idx, log.diastolic_bp)
+        self.heart_rate.insert(idx, log.heart_rate)
+        self.weight.insert(idx, log.weight_kg)
+        return us
+
+    def to_model(self, patient_id: str, idx: int) -> VitalLog:
+        return VitalLog(
+            patient_id=patient_id,
+            timestamp=self.timestamp(idx),
+            gestational_week=self.weeks[idx],
+            systolic_bp=self.systolic[idx],
+            diastolic_bp=self.diastolic[idx],
+            heart_rate=self.heart_rate[idx],
+            weight_kg=float(f"{self.weight[idx]:.7g}"),
+        )
+
+    def to_models(self, patient_id: str, start: int = 0) -> List[VitalLog]:
+        return [self.to_model(patient_id, i) for i in range(start, len(self.times))]
+
+
+class SymptomSeries(_TimeColumns):
+    __slots__ = ("weeks", "moods", "set_ids", "notes")
+    _columns = ("times", "weeks", "moods", "set_ids", "notes")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.weeks = array("h")
+        self.moods = array("b")
+        # Ids of symptom lists interned in the shared vocabulary
+        self.set_ids = array("I")
+        self.notes: List[Optional[str]] = []
+
+    def add(self, log: SymptomLog, set_id: Optional[int] = None) -> int:
+        """Insert a log in time order and return its timestamp in micros."""
+        if set_id is None:
+            set_id = vocabulary.intern(log.symptoms)
+        idx, us = self._position(log.timestamp)
+        self.times.insert(idx, us)
+        self.weeks.insert(idx, log.gestational_week)
+        self.moods.insert(idx, log.mood)
+        self.set_ids.insert(idx, set_id)
+        self.notes.insert(idx, log.notes)
+        return us
+
+    def names(self, idx: int) -> Tuple[str, ...]:
+        return vocabulary.sets[self.set_ids[idx]]
+
+    def mask(self, idx: int) -> int:
+        return vocabulary.masks[self.set_ids[idx]]
+
+    def to_model(self, patient_id: str, idx: int) -> SymptomLog:
+        return SymptomLog(
+            patient_id=patient_id,
+            timestamp=self.timestamp(idx),
+            gestational_week=self.weeks[idx],
+            symptoms=list(self.names(idx)),
+            mood=self.moods[idx],
+            notes=self.notes[idx],
+        )
+
+    def to_models(self, patient_id: str, start: int = 0) -> List[SymptomLog]:
+        return [self.to_model(patient_id, i) for i in range(start, len(self.times))]
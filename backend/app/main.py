@@ -1,5 +1,14 @@
-from fastapi import FastAPI
-from .routers import logs, risk, guidance, dashboard
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from .metrics import http_request_seconds, registry
+from .profiling import RequestProfiler
+from .risk_engine import get_engine
+from .routers import logs, risk, guidance, dashboard, trends
+from .stream_bridge import sink, start_embedded_pipeline
 
 app = FastAPI(
     title="BloomGuard API",
@@ -15,8 +24,56 @@ app.include_router(logs.router)
 app.include_router(risk.router)
 app.include_router(guidance.router)
 app.include_router(dashboard.router)
+app.include_router(trends.router)
+
+profiler = RequestProfiler.from_env()
+engine = get_engine()
+
+# With a stream directory configured, bulk uploads are scored by the Pathway
+# pipeline running alongside the API and its results served from the engine
+bridge = (
+    start_embedded_pipeline(engine, sink.stream_dir, os.environ.get("BLOOMGUARD_PATHWAY_STATE_DIR"))
+    if sink is not None
+    else None
+)
+
+# Engine gauges are read on scrape; a sharded engine keeps its state in the
+# shard processes, so only HTTP metrics are reported there
+if hasattr(engine, "approx_memory_bytes"):
+    registry.gauge("bloomguard_patients", "Patients known to the engine", lambda: len(engine.patients))
+    registry.gauge(
+        "bloomguard_engine_memory_bytes",
+        "Approximate bytes held by event columns, rollups and indexes",
+        engine.approx_memory_bytes,
+    )
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    sampled = profiler.maybe_start() if profiler is not None else None
+    started = time.perf_counter()
+    # A handler that raises still counts, as the 500 the client receives
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        # Label by route template so patient ids do not explode the series count
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        http_request_seconds.labels(request.method, path, str(status)).observe(elapsed)
+        if sampled is not None:
+            await run_in_threadpool(profiler.finish, sampled, path)
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    text = await run_in_threadpool(registry.render)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
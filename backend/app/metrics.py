@@ -0,0 +1,198 @@
+"""Prometheus text format metrics without a client library dependency.
+
+Instruments are module level so the engine and the HTTP middleware can
+record into them directly; /metrics renders the registry on scrape. Every
+update is a bisect and a few integer adds under a per-series lock, which
+the benchmark suite measures as histogram_observe.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bound plus the +Inf overflow, cumulated on render
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {running}"
+            labels = _format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {running}"
+
+
+class Gauge(_Metric):
+    """Gauge read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]) -> None:
+        super().__init__(name, help)
+        self.read = read
+
+    def _samples(self) -> Iterable[str]:
+        yield f"{self.name} {_format_value(self.read())}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        existing = self.get(name)
+        if existing is not None:
+            self._metrics.remove(existing)
+        return self.register(Gauge(name, help, read))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return next((metric for metric in self._metrics if metric.name == name), None)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(
+    Histogram(
+        "bloomguard_http_request_duration_seconds",
+        "HTTP request latency by route template",
+        labels=("method", "route", "status"),
+    )
+)
+ingested_events = registry.register(
+    Counter("bloomguard_ingested_events_total", "Logs applied to the engine by event type", labels=("type",))
+)
+window_events = registry.register(
+    Histogram(
+        "bloomguard_window_events",
+        "Events inside the 48h window each time a patient is rescored",
+        labels=("type",),
+        buckets=SIZE_BUCKETS,
+    )
+)
+dashboard_build_seconds = registry.register(
+    Histogram("bloomguard_dashboard_build_seconds", "Time to walk the ranking index for a dashboard page")
+)
@@ -1,47 +1,283 @@
 from __future__ import annotations
 
+import time
+from datetime import datetime
+from typing import Optional
+
 import pathway as pw
 
+# Private, hence the pinned Pathway version in requirements.txt
+from pathway.internals.api import SessionType
+
+from .backfill import DEFAULT_READ_WORKERS, SeenFiles, read_parallel
+from .event_store import to_micros
+from .rules import CONCERNING_SYMPTOMS, MODERATE_SYMPTOMS, WindowTails, band_for_score
+from .vocabulary import vocabulary
+
 
 class SymptomSchema(pw.Schema):
-    patient_id: pw.Column[str]
-    timestamp: pw.Column[pw.DateTime]
-    gestational_week: pw.Column[int]
-    symptoms: pw.Column[str]
-    mood: pw.Column[int]
-    notes: pw.Column[str]
+    patient_id: str
+    timestamp: str
+    gestational_week: int
+    symptoms: list[str]
+    mood: int
+    notes: str | None = pw.column_definition(default_value=None)
 
 
 class VitalSchema(pw.Schema):
-    patient_id: pw.Column[str]
-    timestamp: pw.Column[pw.DateTime]
-    gestational_week: pw.Column[int]
-    systolic_bp: pw.Column[int]
-    diastolic_bp: pw.Column[int]
-    heart_rate: pw.Column[int]
-    weight_kg: pw.Column[float]
-
-
-def build_demo_pipeline() -> tuple[pw.Table, pw.Table]:
-    # Demo streaming pipeline that reads JSONL files from folders.
-    symptoms = pw.io.jsonlines.read(
-        "data/stream/symptoms/",
-        schema=SymptomSchema,
-        mode="streaming",
+    patient_id: str
+    timestamp: str
+    gestational_week: int
+    systolic_bp: int
+    diastolic_bp: int
+    heart_rate: int
+    weight_kg: float
+
+
+STREAM_DIR = "data/stream"
+# Seconds between scans for new compressed or columnar files
+PACKED_POLL_INTERVAL = 5.0
+
+
+class _PackedSymptomSchema(SymptomSchema):
+    source_file: str = pw.column_definition(primary_key=True)
+    source_row: int = pw.column_definition(primary_key=True)
+
+
+class _PackedVitalSchema(VitalSchema):
+    source_file: str = pw.column_definition(primary_key=True)
+    source_row: int = pw.column_definition(primary_key=True)
+
+
+class _PackedFileSubject(pw.io.python.ConnectorSubject):
+    """Feeds .jsonl.gz and .parquet files of a folder, decoded in parallel.
+
+    Each file is committed as one batch. Rows are keyed by file name and row
+    number in an upsert session, so sending a file again replaces its rows
+    rather than adding them twice. No separate record of finished files is
+    kept across restarts, because Pathway does not report when a commit has
+    reached its checkpoint. A record marked before that point would skip
+    rows the restored state never saw. A restarted pipeline therefore
+    decodes every packed file again, and the re-sent rows match the ones
+    already in its state.
+    """
+
+    def __init__(self, folder: str, schema: type[pw.Schema], workers: int, poll_interval: Optional[float]) -> None:
+        super().__init__()
+        self.folder = folder
+        self.columns = [name for name in schema.column_names() if name not in ("source_file", "source_row")]
+        self.workers = workers
+        self.poll_interval = poll_interval
+        # Only keeps a polling run from sending a file twice
+        self.seen = SeenFiles()
+
+    @property
+    def _session_type(self) -> SessionType:
+        return SessionType.UPSERT
+
+    def run(self) -> None:
+        while True:
+            for path, records in read_parallel(self.seen.pending(self.folder), self.workers):
+                for row, record in enumerate(records):
+                    values = {name: record.get(name) for name in self.columns}
+                    self.next(source_file=path.name, source_row=row, **values)
+                self.commit()
+                self.seen.mark(path)
+            if self.poll_interval is None:
+                return
+            time.sleep(self.poll_interval)
+
+
+def _read_folder(
+    folder: str,
+    schema: type[pw.Schema],
+    packed_schema: type[pw.Schema],
+    name: str,
+    workers: int,
+    mode: str,
+) -> pw.Table:
+    # Plain JSONL goes through Pathway's own reader, whose file offsets are
+    # persisted with the rest of the state when persistence is on
+    plain = pw.io.jsonlines.read(folder, schema=schema, mode=mode, object_pattern="*.jsonl", name=name)
+    subject = _PackedFileSubject(folder, packed_schema, workers, PACKED_POLL_INTERVAL if mode == "streaming" else None)
+    packed = pw.io.python.read(subject, schema=packed_schema, autocommit_duration_ms=None, name=f"{name}-packed")
+    return pw.Table.concat_reindex(plain, packed.without(pw.this.source_file, pw.this.source_row))
+
+
+def build_demo_pipeline(
+    stream_dir: str = STREAM_DIR,
+    workers: int = DEFAULT_READ_WORKERS,
+    mode: str = "streaming",
+) -> tuple[pw.Table, pw.Table]:
+    """Symptom and vital tables read from the folders under stream_dir.
+
+    Each folder may hold plain, gzip compressed (.jsonl.gz) or Parquet
+    files. Pass mode="static" for a one-off backfill that ends when the
+    files are read. Resuming after a restart needs only the checkpoint
+    configured by persistence_config.
+    """
+    symptoms = _read_folder(f"{stream_dir}/symptoms/", SymptomSchema, _PackedSymptomSchema, "symptoms", workers, mode)
+    vitals = _read_folder(f"{stream_dir}/vitals/", VitalSchema, _PackedVitalSchema, "vitals", workers, mode)
+    return symptoms, vitals
+
+
+def persistence_config(state_dir: Optional[str]) -> Optional[pw.persistence.Config]:
+    """Checkpoint input offsets and operator state under state_dir.
+
+    A restarted pipeline resumes from the last checkpoint instead of
+    reprocessing every input file.
+    """
+    if state_dir is None:
+        return None
+    return pw.persistence.Config(pw.persistence.Backend.filesystem(f"{state_dir}/pathway"))
+
+
+@pw.udf
+def _flagged(symptoms: list[str]) -> int:
+    # Concerning symptoms have fixed vocabulary bits, the same in every process
+    return vocabulary.mask(sym for sym in symptoms if sym in CONCERNING_SYMPTOMS)
+
+
+@pw.udf
+def _moderate(symptoms: list[str]) -> bool:
+    return any(sym in MODERATE_SYMPTOMS for sym in symptoms)
+
+
+class _RiskAccumulator(pw.BaseCustomAccumulator):
+    """Per-patient WindowTails folded over the event stream.
+
+    State is the latest few readings of each kind and the latest timestamp.
+    Because retract is defined, Pathway keeps only this state per patient.
+    Without it, udf_reducer also stores every input row so it can rebuild
+    the group after a retraction. See WindowTails.retract for how a
+    retracted reading is handled.
+    """
+
+    def __init__(self, tails: WindowTails, last_seen: str) -> None:
+        self.tails = tails
+        self.last_seen = last_seen
+
+    @classmethod
+    def from_row(cls, row):
+        timestamp, week, is_vital, systolic, diastolic, flagged, moderate, mood = row
+        micros = to_micros(datetime.fromisoformat(timestamp))
+        tails = WindowTails()
+        if is_vital:
+            tails.add_vital(micros, week, systolic, diastolic)
+        else:
+            tails.add_symptom(micros, week, flagged, moderate, mood)
+        return cls(tails, timestamp)
+
+    def update(self, other: "_RiskAccumulator") -> None:
+        if self.tails.last_us is None or (
+            other.tails.last_us is not None and other.tails.last_us >= self.tails.last_us
+        ):
+            self.last_seen = other.last_seen
+        self.tails.merge(other.tails)
+
+    def retract(self, other: "_RiskAccumulator") -> None:
+        self.tails.retract(other.tails)
+
+    def compute_result(self) -> tuple:
+        score, features = self.tails.score()
+        has_events, bp_tier, flagged, low_mood = self.tails.latest()
+        return (
+            score,
+            band_for_score(score),
+            self.last_seen,
+            self.tails.week,
+            features.severe_bp_readings,
+            features.elevated_bp_readings,
+            features.concerning_symptom_logs,
+            features.moderate_symptom_logs,
+            features.low_mood_logs,
+            has_events,
+            bp_tier,
+            flagged,
+            low_mood,
+        )
+
+
+_patient_risk = pw.reducers.udf_reducer(_RiskAccumulator)
+
+
+def _events(symptoms: pw.Table, vitals: pw.Table) -> pw.Table:
+    """Both streams with one shape, carrying only what the rules read."""
+    symptom_events = symptoms.select(
+        patient_id=pw.this.patient_id,
+        timestamp=pw.this.timestamp,
+        gestational_week=pw.this.gestational_week,
+        is_vital=False,
+        systolic_bp=0,
+        diastolic_bp=0,
+        flagged=_flagged(pw.this.symptoms),
+        moderate=_moderate(pw.this.symptoms),
+        mood=pw.this.mood,
     )
-    vitals = pw.io.jsonlines.read(
-        "data/stream/vitals/",
-        schema=VitalSchema,
-        mode="streaming",
+    vital_events = vitals.select(
+        patient_id=pw.this.patient_id,
+        timestamp=pw.this.timestamp,
+        gestational_week=pw.this.gestational_week,
+        is_vital=True,
+        systolic_bp=pw.this.systolic_bp,
+        diastolic_bp=pw.this.diastolic_bp,
+        flagged=0,
+        moderate=False,
+        mood=5,
     )
-    return symptoms, vitals
+    return pw.Table.concat_reindex(symptom_events, vital_events)
+
 
+def build_risk_table(symptoms: pw.Table, vitals: pw.Table) -> pw.Table:
+    """Per-patient risk with the engine's 48h window rules, keyed by patient.
 
-def run():
-    symptoms, vitals = build_demo_pipeline()
-    combined = symptoms.join_left(
-        vitals,
-        pw.left.patient_id == pw.right.patient_id,
+    Each arriving event updates only its patient's row. The reducer keeps
+    a bounded accumulator per patient rather than the event history. Its
+    state grows with the number of patients, not with how long they log.
+    Rows that a source changes or retracts are removed from the
+    accumulator, not recomputed from history.
+    """
+    events = _events(symptoms, vitals)
+    reduced = events.groupby(pw.this.patient_id).reduce(
+        patient_id=pw.this.patient_id,
+        result=_patient_risk(
+            pw.this.timestamp,
+            pw.this.gestational_week,
+            pw.this.is_vital,
+            pw.this.systolic_bp,
+            pw.this.diastolic_bp,
+            pw.this.flagged,
+            pw.this.moderate,
+            pw.this.mood,
+        ),
+    )
+    return reduced.select(
+        patient_id=pw.this.patient_id,
+        risk_score=pw.this.result[0],
+        risk_band=pw.this.result[1],
+        last_seen=pw.this.result[2],
+        gestational_week=pw.this.result[3],
+        severe_bp_readings=pw.this.result[4],
+        elevated_bp_readings=pw.this.result[5],
+        concerning_symptom_logs=pw.this.result[6],
+        moderate_symptom_logs=pw.this.result[7],
+        low_mood_logs=pw.this.result[8],
+        has_events=pw.this.result[9],
+        bp_tier=pw.this.result[10],
+        flagged_symptoms=pw.this.result[11],
+        low_mood=pw.this.result[12],
     )
-    _ = combined
-    pw.run()
+
+
+def run(
+    output_path: str = "data/stream/risk.jsonl",
+    stream_dir: str = STREAM_DIR,
+    state_dir: Optional[str] = None,
+    workers: int = DEFAULT_READ_WORKERS,
+    mode: str = "streaming",
+):
+    symptoms, vitals = build_demo_pipeline(stream_dir, workers, mode)
+    risk = build_risk_table(symptoms, vitals)
+    # Every update to a patient's row is appended as it happens
+    pw.io.jsonlines.write(risk, output_path)
+    pw.run(persistence_config=persistence_config(state_dir))
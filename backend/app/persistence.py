@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .event_store import SymptomSeries, VitalSeries, from_micros, to_micros
+from .rollups import PatientRollups, Rollup
+from .rules import RiskFeatures, RiskUpdate
+from .schemas import SymptomLog, VitalLog
+from .vocabulary import vocabulary
+
+logger = logging.getLogger(__name__)
+
+# Write-ahead log frames are <payload length><crc32><payload>. A torn or
+# corrupt frame at the end of a segment ends replay of that segment.
+_FRAME = struct.Struct("<II")
+_SYMPTOM = 1
+_VITAL = 2
+# Risk applied from outside the engine, such as by the Pathway pipeline
+_RISK = 3
+# kind, micros, aware, gestational week
+_EVENT_HEAD = struct.Struct("<BqBh")
+# systolic, diastolic, heart rate, weight
+_VITAL_BODY = struct.Struct("<hhhd")
+# mood, symptom count, has notes
+_SYMPTOM_BODY = struct.Struct("<bHB")
+# score, the five feature counts, has events, bp tier (-1 for None),
+# flagged symptom mask, low mood
+_RISK_BODY = struct.Struct("<d5IBbQB")
+_STR_LEN = struct.Struct("<H")
+_NOTE_LEN = struct.Struct("<I")
+
+_SNAPSHOT_MAGIC = b"BGSNAP03"
+_U32 = struct.Struct("<I")
+_SNAP_HEAD = struct.Struct("<8sqI")
+# has last_seen, last_seen micros, aware, last week (-1 for None)
+_PATIENT_HEAD = struct.Struct("<BqBh")
+# event count, aware
+_SERIES_HEAD = struct.Struct("<IB")
+# bucket start, vitals, systolic/diastolic/heart rate min, max, sum,
+# weight min, max, sum, symptom logs, mood sum, distinct symptom count
+_ROLLUP = struct.Struct("<qIhhqhhqhhqdddIqH")
+_ROLLUP_FIELDS = (
+    "vitals",
+    "sys_min", "sys_max", "sys_sum",
+    "dia_min", "dia_max", "dia_sum",
+    "hr_min", "hr_max", "hr_sum",
+    "weight_min", "weight_max", "weight_sum",
+    "symptom_logs", "mood_sum",
+)
+
+_WAL_NAME = re.compile(r"^wal-(\d{8})\.log$")
+_SNAPSHOT_NAME = re.compile(r"^snapshot-(\d{8})\.bin$")
+
+
+class SnapshotPatient(NamedTuple):
+    patient_id: str
+    last_seen: Optional[datetime]
+    last_gestational_week: Optional[int]
+    symptoms: SymptomSeries
+    vitals: VitalSeries
+    rollups: PatientRollups
+    # Set while the patient's cached risk came from apply_risk_updates
+    risk: Optional[RiskUpdate] = None
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return _STR_LEN.pack(len(raw)) + raw
+
+
+def _unpack_str(buf, offset: int) -> Tuple[str, int]:
+    (size,) = _STR_LEN.unpack_from(buf, offset)
+    offset += _STR_LEN.size
+    return bytes(buf[offset:offset + size]).decode("utf-8"), offset + size
+
+
+def _encode_risk(update: RiskUpdate) -> bytes:
+    head = _EVENT_HEAD.pack(_RISK, to_micros(update.as_of), update.as_of.tzinfo is not None, update.gestational_week)
+    features = update.features
+    body = _RISK_BODY.pack(
+        update.score,
+        features.severe_bp_readings,
+        features.elevated_bp_readings,
+        features.concerning_symptom_logs,
+        features.moderate_symptom_logs,
+        features.low_mood_logs,
+        update.has_events,
+        -1 if update.bp_tier is None else update.bp_tier,
+        update.flagged_symptoms,
+        update.low_mood,
+    )
+    return head + _pack_str(update.patient_id) + body
+
+
+def encode_log(log: SymptomLog | VitalLog | RiskUpdate) -> bytes:
+    if isinstance(log, RiskUpdate):
+        return _encode_risk(log)
+    aware = log.timestamp.tzinfo is not None
+    if isinstance(log, VitalLog):
+        head = _EVENT_HEAD.pack(_VITAL, to_micros(log.timestamp), aware, log.gestational_week)
+        body = _VITAL_BODY.pack(log.systolic_bp, log.diastolic_bp, log.heart_rate, log.weight_kg)
+        return head + _pack_str(log.patient_id) + body
+    head = _EVENT_HEAD.pack(_SYMPTOM, to_micros(log.timestamp), aware, log.gestational_week)
+    parts = [head, _pack_str(log.patient_id), _SYMPTOM_BODY.pack(log.mood, len(log.symptoms), log.notes is not None)]
+    parts.extend(_pack_str(name) for name in log.symptoms)
+    if log.notes is not None:
+        raw = log.notes.encode("utf-8")
+        parts.append(_NOTE_LEN.pack(len(raw)) + raw)
+    return b"".join(parts)
+
+
+def decode_log(payload: bytes) -> SymptomLog | VitalLog | RiskUpdate:
+    kind, micros, aware, week = _EVENT_HEAD.unpack_from(payload, 0)
+    patient_id, offset = _unpack_str(payload, _EVENT_HEAD.size)
+    timestamp = from_micros(micros, bool(aware))
+    if kind == _RISK:
+        score, *counts, has_events, bp_tier, flagged, low_mood = _RISK_BODY.unpack_from(payload, offset)
+        return RiskUpdate(
+            patient_id=patient_id,
+            as_of=timestamp,
+            gestational_week=week,
+            score=score,
+            features=RiskFeatures(*counts),
+            has_events=bool(has_events),
+            bp_tier=None if bp_tier < 0 else bp_tier,
+            flagged_symptoms=flagged,
+            low_mood=bool(low_mood),
+        )
+    if kind == _VITAL:
+        systolic, diastolic, heart_rate, weight = _VITAL_BODY.unpack_from(payload, offset)
+        # Logs were validated before they were written, so skip validation
+        return VitalLog.model_construct(
+            patient_id=patient_id,
+            timestamp=timestamp,
+            gestational_week=week,
+            systolic_bp=systolic,
+            diastolic_bp=diastolic,
+            heart_rate=heart_rate,
+            weight_kg=weight,
+        )
+    mood, count, has_notes = _SYMPTOM_BODY.unpack_from(payload, offset)
+    offset += _SYMPTOM_BODY.size
+    symptoms: List[str] = []
+    for _ in range(count):
+        name, offset = _unpack_str(payload, offset)
+        symptoms.append(name)
+    notes = None
+    if has_notes:
+        (size,) = _NOTE_LEN.unpack_from(payload, offset)
+        offset += _NOTE_LEN.size
+        notes = payload[offset:offset + size].decode("utf-8")
+    return SymptomLog.model_construct(
+        patient_id=patient_id,
+        timestamp=timestamp,
+        gestational_week=week,
+        symptoms=symptoms,
+        mood=mood,
+        notes=notes,
+    )
+
+
+def read_wal(path: Path) -> Iterator[SymptomLog | VitalLog | RiskUpdate]:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        size, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = data[start:start + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            logger.warning("Stopping replay of %s at torn record, offset %d", path, offset)
+            return
+        yield decode_log(payload)
+        offset = start + size
+
+
+def _write_series(fh: BinaryIO, series, columns: Tuple[str, ...]) -> None:
+    fh.write(_SERIES_HEAD.pack(len(series), series.aware))
+    for name in columns:
+        fh.write(getattr(series, name).tobytes())
+
+
+def _read_series(series, buf, offset: int, columns: Tuple[str, ...]) -> int:
+    count, aware = _SERIES_HEAD.unpack_from(buf, offset)
+    offset += _SERIES_HEAD.size
+    series.aware = bool(aware)
+    for name in columns:
+        column: array = getattr(series, name)
+        size = count * column.itemsize
+        column.frombytes(buf[offset:offset + size])
+        offset += size
+    return offset
+
+
+def _write_rollups(fh: BinaryIO, buckets: Dict[int, Rollup]) -> None:
+    fh.write(_U32.pack(len(buckets)))
+    for start, rollup in buckets.items():
+        values = [getattr(rollup, name) for name in _ROLLUP_FIELDS]
+        fh.write(_ROLLUP.pack(start, *values, len(rollup.symptom_counts)))
+        for name, count in rollup.symptom_counts.items():
+            fh.write(_pack_str(name) + _U32.pack(count))
+
+
+def _read_rollups(buf, offset: int) -> Tuple[Dict[int, Rollup], int]:
+    (count,) = _U32.unpack_from(buf, offset)
+    offset += _U32.size
+    buckets: Dict[int, Rollup] = {}
+    for _ in range(count):
+        start, *values, distinct = _ROLLUP.unpack_from(buf, offset)
+        offset += _ROLLUP.size
+        rollup = Rollup()
+        for name, value in zip(_ROLLUP_FIELDS, values):
+            setattr(rollup, name, value)
+        for _ in range(distinct):
+            name, offset = _unpack_str(buf, offset)
+            (seen,) = _U32.unpack_from(buf, offset)
+            offset += _U32.size
+            rollup.symptom_counts[name] = seen
+        buckets[start] = rollup
+    return buckets, offset
+
+
+_VITAL_COLUMNS = ("times", "weeks", "systolic", "diastolic", "heart_rate", "weight")
+_SYMPTOM_COLUMNS = ("times", "weeks", "moods", "set_ids")
+
+
+def write_snapshot(path: Path, wal_seq: int, patients: Iterable[SnapshotPatient]) -> None:
+    """Write engine state in a compact binary layout, atomically."""
+    patients = list(patients)
+    # Event columns hold vocabulary ids, so the table is written in id order
+    symptom_sets = list(vocabulary.sets)
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_SNAP_HEAD.pack(_SNAPSHOT_MAGIC, wal_seq, len(patients)))
+        fh.write(_U32.pack(len(symptom_sets)))
+        for names in symptom_sets:
+            fh.write(_STR_LEN.pack(len(names)))
+            for name in names:
+                fh.write(_pack_str(name))
+
+        for patient in patients:
+            last_seen = patient.last_seen
+            fh.write(_pack_str(patient.patient_id))
+            fh.write(
+                _PATIENT_HEAD.pack(
+                    last_seen is not None,
+                    to_micros(last_seen) if last_seen is not None else 0,
+                    last_seen is not None and last_seen.tzinfo is not None,
+                    -1 if patient.last_gestational_week is None else patient.last_gestational_week,
+                )
+            )
+            risk = b"" if patient.risk is None else _encode_risk(patient.risk)
+            fh.write(_U32.pack(len(risk)) + risk)
+            _write_series(fh, patient.vitals, _VITAL_COLUMNS)
+            symptoms = patient.symptoms
+            _write_series(fh, symptoms, _SYMPTOM_COLUMNS)
+            notes = [(i, note) for i, note in enumerate(symptoms.notes) if note is not None]
+            fh.write(_U32.pack(len(notes)))
+            for idx, note in notes:
+                raw = note.encode("utf-8")
+                fh.write(_U32.pack(idx) + _NOTE_LEN.pack(len(raw)) + raw)
+            _write_rollups(fh, patient.rollups.hourly)
+            _write_rollups(fh, patient.rollups.daily)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: Path) -> Tuple[int, List[SnapshotPatient]]:
+    """Load a snapshot through a read-only memory map."""
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = memoryview(mm)
+        try:
+            magic, wal_seq, patient_count = _SNAP_HEAD.unpack_from(buf, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a BloomGuard snapshot")
+            offset = _SNAP_HEAD.size
+            (set_count,) = _U32.unpack_from(buf, offset)
+            offset += _U32.size
+            # Snapshot set ids are mapped onto this process's vocabulary ids
+            set_ids: List[int] = []
+            for _ in range(set_count):
+                (size,) = _STR_LEN.unpack_from(buf, offset)
+                offset += _STR_LEN.size
+                names = []
+                for _ in range(size):
+                    name, offset = _unpack_str(buf, offset)
+                    names.append(name)
+                set_ids.append(vocabulary.intern(names, count=False))
+            identity = set_ids == list(range(set_count))
+
+            patients: List[SnapshotPatient] = []
+            for _ in range(patient_count):
+                patient_id, offset = _unpack_str(buf, offset)
+                has_seen, seen_us, seen_aware, week = _PATIENT_HEAD.unpack_from(buf, offset)
+                offset += _PATIENT_HEAD.size
+                (risk_size,) = _U32.unpack_from(buf, offset)
+                offset += _U32.size
+                risk = decode_log(bytes(buf[offset:offset + risk_size])) if risk_size else None
+                offset += risk_size
+                vitals = VitalSeries()
+                offset = _read_series(vitals, buf, offset, _VITAL_COLUMNS)
+                symptoms = SymptomSeries()
+                offset = _read_series(symptoms, buf, offset, _SYMPTOM_COLUMNS)
+                if not identity:
+                    symptoms.set_ids = array("I", (set_ids[i] for i in symptoms.set_ids))
+                symptoms.notes = [None] * len(symptoms.set_ids)
+                (note_count,) = _U32.unpack_from(buf, offset)
+                offset += _U32.size
+                for _ in range(note_count):
+                    (idx,) = _U32.unpack_from(buf, offset)
+                    (size,) = _NOTE_LEN.unpack_from(buf, offset + _U32.size)
+                    offset += _U32.size + _NOTE_LEN.size
+                    symptoms.notes[idx] = bytes(buf[offset:offset + size]).decode("utf-8")
+                    offset += size
+                hourly, offset = _read_rollups(buf, offset)
+                daily, offset = _read_rollups(buf, offset)
+                rollups = PatientRollups()
+                rollups.restore(hourly, daily)
+                patients.append(
+                    SnapshotPatient(
+                        patient_id=patient_id,
+                        last_seen=from_micros(seen_us, bool(seen_aware)) if has_seen else None,
+                        last_gestational_week=None if week < 0 else week,
+                        symptoms=symptoms,
+                        vitals=vitals,
+                        rollups=rollups,
+                        risk=risk,
+                    )
+                )
+        finally:
+            buf.release()
+    return wal_seq, patients
+
+
+class EngineStorage:
+    """Write-ahead log segments plus periodic snapshots in one directory.
+
+    Snapshot N holds every event from WAL segments numbered below N. Startup
+    loads the newest snapshot and replays only the segments after it, then
+    opens a fresh segment so a torn tail is never appended to.
+    """
+
+    def __init__(self, data_dir: str | os.PathLike, fsync: bool = False) -> None:
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.wal_seq = 0
+        self.events_since_snapshot = 0
+        self._wal: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+
+    def _numbered(self, pattern: re.Pattern) -> List[Tuple[int, Path]]:
+        found = []
+        for path in self.data_dir.iterdir():
+            match = pattern.match(path.name)
+            if match:
+                found.append((int(match.group(1)), path))
+        return sorted(found)
+
+    def _wal_path(self, seq: int) -> Path:
+        return self.data_dir / f"wal-{seq:08d}.log"
+
+    def _open_segment(self, seq: int) -> None:
+        if self._wal is not None:
+            self._wal.close()
+        self.wal_seq = seq
+        self._wal = open(self._wal_path(seq), "ab")
+
+    def recover(self) -> Tuple[List[SnapshotPatient], Iterator[SymptomLog | VitalLog | RiskUpdate]]:
+        """Return the latest snapshot contents and an iterator over the WAL tail."""
+        snapshots = self._numbered(_SNAPSHOT_NAME)
+        patients: List[SnapshotPatient] = []
+        base = 0
+        if snapshots:
+            base, patients = read_snapshot(snapshots[-1][1])
+        segments = [(seq, path) for seq, path in self._numbered(_WAL_NAME) if seq >= base]
+        next_seq = max([base] + [seq + 1 for seq, _ in segments])
+        self._open_segment(next_seq)
+
+        def tail() -> Iterator[SymptomLog | VitalLog | RiskUpdate]:
+            for _, path in segments:
+                for log in read_wal(path):
+                    self.events_since_snapshot += 1
+                    yield log
+
+        return patients, tail()
+
+    def append(self, logs: Iterable[SymptomLog | VitalLog | RiskUpdate]) -> None:
+        assert self._wal is not None, "recover() must run before append()"
+        frames = []
+        for log in logs:
+            payload = encode_log(log)
+            frames.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        with self._lock:
+            self._wal.write(b"".join(frames))
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self.events_since_snapshot += len(frames)
+
+    def rotate(self) -> int:
+        """Move appends to a new segment and return its sequence number.
+
+        A snapshot of the state at this point holds every event from the
+        segments below that number.
+        """
+        with self._lock:
+            self._open_segment(self.wal_seq + 1)
+            self.events_since_snapshot = 0
+            return self.wal_seq
+
+    def snapshot(self, seq: int, patients: Iterable[SnapshotPatient]) -> None:
+        """Write snapshot seq and drop the segments and snapshots it replaces."""
+        write_snapshot(self.data_dir / f"snapshot-{seq:08d}.bin", seq, patients)
+        for old, path in self._numbered(_WAL_NAME):
+            if old < seq:
+                path.unlink()
+        for old, path in self._numbered(_SNAPSHOT_NAME):
+            if old < seq:
+                path.unlink()
+
+    def close(self) -> None:
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
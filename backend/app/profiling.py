@@ -0,0 +1,89 @@
+"""Opt-in sampling profiler for a fraction of HTTP requests.
+
+Set BLOOMGUARD_PROFILE_RATE to a fraction such as 0.01 and optionally
+BLOOMGUARD_PROFILE_DIR. While a sampled request runs, a background thread
+records the stacks of every thread, including the threadpool workers that
+run engine calls, and the result is written in the collapsed stack format
+read by flamegraph.pl, speedscope and inferno.
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_INTERVAL = 0.001
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Threads parked in the pool or the event loop selector are noise
+                if names and names[0].startswith(("wait ", "select ", "_worker ")):
+                    continue
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._sample, name="bloomguard-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def write_collapsed(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Decides which requests to profile and where their profiles go."""
+
+    def __init__(self, rate: float, directory: str | os.PathLike, interval: float = DEFAULT_INTERVAL) -> None:
+        self.rate = rate
+        self.directory = Path(directory)
+        self.interval = interval
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestProfiler"]:
+        rate = float(os.environ.get("BLOOMGUARD_PROFILE_RATE", "0") or 0)
+        if rate <= 0:
+            return None
+        return cls(rate, os.environ.get("BLOOMGUARD_PROFILE_DIR", "profiles"))
+
+    def maybe_start(self) -> Optional[SamplingProfiler]:
+        if random.random() >= self.rate:
+            return None
+        return SamplingProfiler(self.interval).start()
+
+    def finish(self, profiler: SamplingProfiler, route: str) -> Path:
+        profiler.stop()
+        slug = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{os.getpid()}-{id(profiler):x}.folded"
+        profiler.write_collapsed(path)
+        return path
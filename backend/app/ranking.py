@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .schemas import DashboardOverview, PatientSummary
+
+# Entries are (-score, patient_id) so ascending order is highest risk first
+# and ties are broken by patient id, which keeps cursors stable.
+RankKey = Tuple[float, str]
+
+_neg_score = itemgetter(0)
+
+# Dashboard rows carry the PatientSummary fields in this order
+DASHBOARD_ROW_FIELDS = ("patient_id", "last_seen", "gestational_week", "risk_band", "risk_score")
+DashboardRow = Tuple[str, datetime, Optional[int], str, float]
+
+
+class DashboardPage(NamedTuple):
+    """A dashboard page as plain rows, before any response model is built."""
+
+    generated_at: datetime
+    rows: List[DashboardRow]
+    next_cursor: Optional[str]
+
+
+def overview_from_page(page: DashboardPage) -> DashboardOverview:
+    # Validating keyword construction is cheaper than model_construct in
+    # pydantic 2, which runs its per-field loop in Python
+    return DashboardOverview(
+        generated_at=page.generated_at,
+        patients=[PatientSummary(**dict(zip(DASHBOARD_ROW_FIELDS, row))) for row in page.rows],
+        next_cursor=page.next_cursor,
+    )
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class DashboardStream:
+    """A dashboard page whose rows are produced while they are consumed.
+
+    rows can be iterated once, and next_cursor is only set after that, so
+    encoders write it after the rows.
+    """
+
+    def __init__(
+        self,
+        generated_at: datetime,
+        scan: Iterable[Tuple[RankKey, DashboardRow]],
+        limit: Optional[int],
+    ) -> None:
+        self.generated_at = generated_at
+        self.next_cursor: Optional[str] = None
+        self.rows: Iterator[DashboardRow] = self._take(scan, limit)
+
+    def _take(self, scan: Iterable[Tuple[RankKey, DashboardRow]], limit: Optional[int]) -> Iterator[DashboardRow]:
+        last_key = None
+        for count, (key, row) in enumerate(scan):
+            if limit is not None and count == limit:
+                # Another row matches, so the page continues after the last one
+                self.next_cursor = encode_cursor(last_key)
+                return
+            yield row
+            last_key = key
+
+
+def encode_cursor(key: RankKey) -> str:
+    raw = f"{-key[0]!r}:{key[1]}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> RankKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        score, patient_id = raw.split(":", 1)
+        return -float(score), patient_id
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise InvalidCursor(f"Invalid dashboard cursor: {cursor!r}") from exc
+
+
+class RiskRanking:
+    """Patients kept ordered by descending risk score.
+
+    Updates are a bisect plus a list insert, so the dashboard can read a page
+    without rescoring or resorting the whole cohort.
+    """
+
+    __slots__ = ("_keys", "_by_patient")
+
+    def __init__(self) -> None:
+        self._keys: List[RankKey] = []
+        self._by_patient: Dict[str, RankKey] = {}
+
+    def update(self, patient_id: str, score: float) -> None:
+        key = (-score, patient_id)
+        previous = self._by_patient.get(patient_id)
+        if previous == key:
+            return
+        if previous is not None:
+            del self._keys[bisect_left(self._keys, previous)]
+        insort(self._keys, key)
+        self._by_patient[patient_id] = key
+
+    def remove(self, patient_id: str) -> None:
+        previous = self._by_patient.pop(patient_id, None)
+        if previous is not None:
+            del self._keys[bisect_left(self._keys, previous)]
+
+    def iter_from(
+        self,
+        after: RankKey | None = None,
+        max_score: float | None = None,
+    ) -> Iterator[RankKey]:
+        """Yield entries after a cursor key, starting at or below max_score."""
+        start = 0
+        if after is not None:
+            start = bisect_right(self._keys, after)
+        if max_score is not None:
+            start = max(start, bisect_left(self._keys, -max_score, key=_neg_score))
+        keys = self._keys
+        for idx in range(start, len(keys)):
+            yield keys[idx]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, patient_id: object) -> bool:
+        return patient_id in self._by_patient
@@ -1,229 +1,876 @@
 from __future__ import annotations
 
+import copy
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
+import numpy as np
+
+from .change_stream import ChangeBroker
+from .cohort import CohortTails
+from .event_store import (
+    SymptomSeries,
+    VitalSeries,
+    delta_micros,
+    from_micros,
+    to_micros,
+)
+from .metrics import dashboard_build_seconds, ingested_events, window_events
+from .persistence import EngineStorage, SnapshotPatient
+from .ranking import (
+    DashboardPage,
+    DashboardRow,
+    DashboardStream,
+    RankKey,
+    RiskRanking,
+    decode_cursor,
+    overview_from_page,
+)
+from .rollups import PatientRollups, Rollup
+from .rules import (
+    CONCERNING_SYMPTOMS,
+    CONCERNING_WEIGHT,
+    ELEVATED_BP_WEIGHT,
+    LOW_MOOD_WEIGHT,
+    MODERATE_SYMPTOMS,
+    MODERATE_WEIGHT,
+    NO_EVENTS_SCORE,
+    RISK_HORIZON,
+    SEVERE_BP_WEIGHT,
+    SYMPTOM_TAIL,
+    VITAL_TAIL,
+    RiskFeatures,
+    RiskUpdate,
+    band_for_score,
+    bp_tier_of,
+    is_elevated_bp,
+    is_low_mood,
+    is_severe_bp,
+    score_tails,
+)
 from .schemas import (
     SymptomLog,
     VitalLog,
     RiskAssessment,
     GuidanceResponse,
     GuidanceCard,
-    PatientSummary,
     DashboardOverview,
+    RiskBand,
+    RiskChange,
+    StatSummary,
+    TrendPoint,
+    TrendResolution,
+    TrendResponse,
 )
+from .vocabulary import vocabulary
+
+logger = logging.getLogger(__name__)
+
+# Highest score a band can hold, used to bisect straight to the band start
+_BAND_CEILING = {"high": None, "medium": 0.66, "low": 0.33}
+_BAND_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# Rule sets as vocabulary bitmasks; the names are known symptoms, so their
+# bits are fixed and never the shared overflow bit
+CONCERNING_MASK = vocabulary.mask(CONCERNING_SYMPTOMS)
+MODERATE_MASK = vocabulary.mask(MODERATE_SYMPTOMS)
+_HEADACHE_OR_VISION = vocabulary.mask(("severe_headache", "vision_changes"))
+_HEAVY_BLEEDING = vocabulary.mask(("heavy_bleeding",))
+_NO_FETAL_MOVEMENT = vocabulary.mask(("no_fetal_movement",))
+
+# Patients are spread over this many locks so unrelated ingests never wait
+LOCK_STRIPES = 64
+
+# Raw events older than this are evicted; rollups keep the long-range view
+DEFAULT_RETENTION = timedelta(days=7)
+DEFAULT_HOURLY_RETENTION = timedelta(days=14)
+
+# Metric series used on every ingest, resolved once
+_SYMPTOMS_INGESTED = ingested_events.labels("symptom")
+_VITALS_INGESTED = ingested_events.labels("vital")
+_SYMPTOM_WINDOW = window_events.labels("symptom")
+_VITAL_WINDOW = window_events.labels("vital")
+# Rough per-object costs behind approx_memory_bytes
+_ROLLUP_BYTES = 280
+_PATIENT_BYTES = 600
+
+THIRD_TRIMESTER_WEEK = 28
+# Explanations and card lists only depend on a handful of discrete features,
+# so the caches stay small; the bound just guards against surprises.
+TEXT_CACHE_SIZE = 1024
+# Ranking entries copied per hold of the index lock while building a dashboard page
+DASHBOARD_SCAN_CHUNK = 1024
+
+
+@dataclass(frozen=True)
+class CachedRisk:
+    # Readers take this whole record from PatientState.risk without locking,
+    # so it also carries the patient fields a response needs.
+    score: float
+    band: str
+    explanation: str
+    features: RiskFeatures
+    as_of: datetime | None = None
+    gestational_week: int | None = None
+
+
+class RiskSignature(NamedTuple):
+    """The discrete features patient facing text is built from."""
+
+    has_events: bool
+    # Tier of the latest in-window reading: 0 normal, 1 elevated, 2 severe
+    bp_tier: Optional[int]
+    # Concerning symptom bits of the latest in-window symptom log
+    flagged_symptoms: int
+    low_mood: bool
+    third_trimester: bool
+
+
+class _Assessment(NamedTuple):
+    score: float
+    features: RiskFeatures
+    signature: RiskSignature
+    tail: Dict[str, object]
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _explanation(signature: RiskSignature) -> str:
+    if not signature.has_events:
+        return "There is not enough recent information to estimate risk yet. Continue logging symptoms and vitals."
+
+    parts: List[str] = []
+    if signature.bp_tier == 2:
+        parts.append("Your recent blood pressure has been in a higher range that can sometimes be concerning in pregnancy.")
+    elif signature.bp_tier == 1:
+        parts.append("Your recent blood pressure readings have been somewhat elevated.")
+
+    flagged = signature.flagged_symptoms
+    if flagged & _HEADACHE_OR_VISION:
+        parts.append("You reported headache or vision changes, which can sometimes be warning signs when combined with higher blood pressure.")
+    if flagged & _HEAVY_BLEEDING:
+        parts.append("You logged heavier bleeding, which should be discussed with a provider as soon as possible.")
+    if flagged & _NO_FETAL_MOVEMENT:
+        parts.append("You noted very little or no fetal movement compared to usual. This can be important to check quickly.")
+    if signature.low_mood:
+        parts.append("Your mood scores have been on the lower side, which matters for your well being.")
+
+    if not parts:
+        parts.append("Recent logs look mostly within expected ranges for pregnancy, but the system will keep watching for changes.")
+
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _guidance_cards(band: str, third_trimester: bool) -> Tuple[GuidanceCard, ...]:
+    # Shared between responses, so the cards must never be mutated
+    cards: List[GuidanceCard] = []
+    if band == "low":
+        cards.append(
+            GuidanceCard(
+                title="Things seem stable right now",
+                body=(
+                    "Based on what you logged, things look mostly within expected ranges. "
+                    "Keep paying attention to your body, drink water, and continue your checkins. "
+                    "If anything feels suddenly wrong, always trust your instincts and contact your provider."
+                ),
+            )
+        )
+    elif band == "medium":
+        cards.append(
+            GuidanceCard(
+                title="Monitor and plan a check in",
+                body=(
+                    "Some of your recent symptoms or blood pressure readings are a bit higher than usual. "
+                    "Consider writing down what you are noticing and contact your provider to ask if they want an earlier visit or extra checks."
+                ),
+            )
+        )
+        if third_trimester:
+            cards.append(
+                GuidanceCard(
+                    title="Pay extra attention to fetal movement",
+                    body=(
+                        "In the third trimester, changes in fetal movement can matter. "
+                        "If you notice fewer movements than usual, follow your clinic instructions for counting kicks "
+                        "and call if the pattern feels very different."
+                    ),
+                )
+            )
+    else:
+        cards.append(
+            GuidanceCard(
+                title="High concern items present",
+                body=(
+                    "Some of your recent entries suggest symptoms that can be urgent in pregnancy. "
+                    "If you have severe pain, heavy bleeding, trouble breathing, chest pain, or a sense that something is very wrong, "
+                    "do not wait for the app. Contact emergency services or your hospital now."
+                ),
+            )
+        )
+        cards.append(
+            GuidanceCard(
+                title="Call your provider soon",
+                body=(
+                    "Even if you are not in immediate danger, this is a good time to call your provider, describe what you logged, "
+                    "and ask if they want you to be seen today."
+                ),
+            )
+        )
+    return tuple(cards)
+
+
+def _stat(low: float, high: float, total: float, count: int) -> StatSummary:
+    return StatSummary(min=low, max=high, mean=total / count)
 
 
-@dataclass
+def _trend_point(bucket_start: datetime, rollup: Rollup, previous_weight: Optional[float]) -> TrendPoint:
+    has_vitals = rollup.vitals > 0
+    weight = rollup.weight_sum / rollup.vitals if has_vitals else None
+    return TrendPoint(
+        bucket_start=bucket_start,
+        vital_count=rollup.vitals,
+        systolic_bp=_stat(rollup.sys_min, rollup.sys_max, rollup.sys_sum, rollup.vitals) if has_vitals else None,
+        diastolic_bp=_stat(rollup.dia_min, rollup.dia_max, rollup.dia_sum, rollup.vitals) if has_vitals else None,
+        heart_rate=_stat(rollup.hr_min, rollup.hr_max, rollup.hr_sum, rollup.vitals) if has_vitals else None,
+        weight_kg=_stat(rollup.weight_min, rollup.weight_max, rollup.weight_sum, rollup.vitals) if has_vitals else None,
+        weight_change_kg=weight - previous_weight if weight is not None and previous_weight is not None else None,
+        symptom_logs=rollup.symptom_logs,
+        mean_mood=rollup.mood_sum / rollup.symptom_logs if rollup.symptom_logs else None,
+        symptom_counts=dict(rollup.symptom_counts),
+    )
+
+
+@dataclass(slots=True)
 class PatientState:
+    # Events live in columnar typed arrays; pydantic models are only rebuilt
+    # through to_model/to_models when a response needs them.
     patient_id: str
-    symptoms: List[SymptomLog] = field(default_factory=list)
-    vitals: List[VitalLog] = field(default_factory=list)
+    symptoms: SymptomSeries = field(default_factory=SymptomSeries)
+    vitals: VitalSeries = field(default_factory=VitalSeries)
+    rollups: PatientRollups = field(default_factory=PatientRollups)
     last_seen: datetime | None = None
     last_gestational_week: int | None = None
+    # Refreshed on every ingest. The 48h window is anchored on last_seen,
+    # which only moves on ingest, so events can only slide out of the
+    # horizon at that point and the cache never goes stale between writes.
+    risk: CachedRisk | None = None
+    # The update behind risk when it came from apply_risk_updates. Such a
+    # patient may have no raw events to rescore from, so snapshots keep it.
+    risk_update: RiskUpdate | None = None
 
 
 class MaternalRiskEngine:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        snapshot_every: int = 100_000,
+        retention: Optional[timedelta] = DEFAULT_RETENTION,
+        hourly_retention: timedelta = DEFAULT_HOURLY_RETENTION,
+    ) -> None:
+        """Create an engine, optionally durable under data_dir.
+
+        With a data_dir every ingested log is appended to a write-ahead log
+        before it is applied, and a snapshot is written on a background
+        thread after snapshot_every logged events. Startup restores the latest snapshot and replays
+        only the log tail written after it.
+
+        Raw events older than retention, measured from a patient's latest
+        event, are evicted after being folded into hourly and daily
+        rollups. Pass retention=None to keep raw history forever.
+        """
+        if retention is not None and retention < RISK_HORIZON:
+            raise ValueError("retention must cover the 48h risk horizon")
+        self.retention = retention
+        self.hourly_retention = hourly_retention
         self.patients: Dict[str, PatientState] = {}
+        self.ranking = RiskRanking()
+        self.tails = CohortTails(VITAL_TAIL, SYMPTOM_TAIL)
+        self.changes = ChangeBroker()
+        self.snapshot_every = snapshot_every
+        self.storage: Optional[EngineStorage] = None
+        # Lock order: patient stripe, then index lock. Writers hold their
+        # patient's stripe while logging and applying events; the index lock
+        # only guards the shared ranking and cohort tails and is held briefly.
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._index_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        if data_dir:
+            self._recover(EngineStorage(data_dir))
+
+    def _recover(self, storage: EngineStorage) -> None:
+        snapshot, tail = storage.recover()
+        for patient in snapshot:
+            state = PatientState(
+                patient_id=patient.patient_id,
+                symptoms=patient.symptoms,
+                vitals=patient.vitals,
+                rollups=patient.rollups,
+                last_seen=patient.last_seen,
+                last_gestational_week=patient.last_gestational_week,
+            )
+            self.patients[state.patient_id] = state
+            self._refresh_risk(state)
+            if patient.risk is not None:
+                self._apply_update(state, patient.risk)
+        # Storage is attached afterwards so replayed records are not logged
+        # again. Runs of logs and of risk updates are replayed in log order.
+        for is_update, records in itertools.groupby(tail, key=lambda record: isinstance(record, RiskUpdate)):
+            if is_update:
+                self.apply_risk_updates(records)
+            else:
+                self.ingest_many(records)
+        self.storage = storage
+
+    def _lock_for(self, patient_id: str) -> threading.Lock:
+        return self._stripes[hash(patient_id) % LOCK_STRIPES]
+
+    def snapshot(self) -> None:
+        """Write a snapshot on the calling thread."""
+        if self.storage is None:
+            raise RuntimeError("Engine was created without a data_dir")
+        with self._snapshot_lock:
+            self._take_snapshot(self.storage)
+
+    def _take_snapshot(self, storage: EngineStorage) -> None:
+        # Every stripe is held only while the log moves to a new segment and
+        # the state is copied, so the copy holds exactly the events logged
+        # before the rotation. Encoding and writing run unlocked.
+        with ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            seq = storage.rotate()
+            patients = [
+                SnapshotPatient(
+                    patient_id=state.patient_id,
+                    last_seen=state.last_seen,
+                    last_gestational_week=state.last_gestational_week,
+                    symptoms=copy.deepcopy(state.symptoms),
+                    vitals=copy.deepcopy(state.vitals),
+                    rollups=copy.deepcopy(state.rollups),
+                    risk=state.risk_update,
+                )
+                for state in list(self.patients.values())
+            ]
+        storage.snapshot(seq, patients)
+
+    def _write_ahead(self, logs: List[SymptomLog | VitalLog | RiskUpdate]) -> None:
+        if self.storage is not None:
+            self.storage.append(logs)
+
+    def _maybe_snapshot(self) -> None:
+        # Runs after the logged events were applied, so the snapshot holds them.
+        # The snapshot is written on a background thread so the ingest that
+        # crosses the threshold does not wait for it.
+        storage = self.storage
+        if storage is None or storage.events_since_snapshot < self.snapshot_every:
+            return
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        if storage.events_since_snapshot < self.snapshot_every:
+            self._snapshot_lock.release()
+            return
+        self._snapshot_thread = threading.Thread(
+            target=self._background_snapshot, args=(storage,), name="engine-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _background_snapshot(self, storage: EngineStorage) -> None:
+        try:
+            self._take_snapshot(storage)
+        except Exception:
+            # The log still holds every event, so a later snapshot catches up
+            logger.exception("Writing an engine snapshot failed")
+        finally:
+            self._snapshot_lock.release()
+
+    def wait_for_snapshot(self) -> None:
+        """Block until a background snapshot in progress has been written."""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
 
     def _get_state(self, patient_id: str) -> PatientState:
-        if patient_id not in self.patients:
-            self.patients[patient_id] = PatientState(patient_id=patient_id)
-        return self.patients[patient_id]
+        state = self.patients.get(patient_id)
+        if state is None:
+            state = self.patients.setdefault(patient_id, PatientState(patient_id=patient_id))
+        return state
+
+    def _touch(self, state: PatientState, timestamp: datetime, gestational_week: int) -> None:
+        # Late uploads must not move the patient back in time
+        # Compared in micros so naive (UTC) and aware timestamps from the
+        # HTTP and Pathway paths can be mixed for one patient
+        if state.last_seen is None or to_micros(timestamp) >= to_micros(state.last_seen):
+            state.last_seen = timestamp
+            state.last_gestational_week = gestational_week
+
+    def _apply(self, state: PatientState, log: SymptomLog | VitalLog) -> None:
+        if isinstance(log, VitalLog):
+            micros = state.vitals.add(log)
+            state.rollups.add_vital(micros, log.systolic_bp, log.diastolic_bp, log.heart_rate, log.weight_kg)
+        else:
+            set_id = vocabulary.intern(log.symptoms)
+            micros = state.symptoms.add(log, set_id)
+            state.rollups.add_symptoms(micros, vocabulary.sets[set_id], log.mood)
+        self._touch(state, log.timestamp, log.gestational_week)
+
+    def _evict(self, state: PatientState) -> None:
+        # Raw events were already folded into rollups when they were applied
+        if self.retention is None or state.last_seen is None:
+            return
+        latest = to_micros(state.last_seen)
+        cutoff = latest - delta_micros(self.retention)
+        state.symptoms.evict_before(cutoff)
+        state.vitals.evict_before(cutoff)
+        state.rollups.prune_hourly(latest - delta_micros(self.hourly_retention))
 
     def ingest_symptom(self, log: SymptomLog) -> None:
-        state = self._get_state(log.patient_id)
-        state.symptoms.append(log)
-        state.last_seen = log.timestamp
-        state.last_gestational_week = log.gestational_week
+        with self._lock_for(log.patient_id):
+            self._write_ahead([log])
+            state = self._get_state(log.patient_id)
+            self._apply(state, log)
+            self._evict(state)
+            self._refresh_risk(state)
+        _SYMPTOMS_INGESTED.inc()
+        self._maybe_snapshot()
 
     def ingest_vital(self, log: VitalLog) -> None:
-        state = self._get_state(log.patient_id)
-        state.vitals.append(log)
-        state.last_seen = log.timestamp
-        state.last_gestational_week = log.gestational_week
+        with self._lock_for(log.patient_id):
+            self._write_ahead([log])
+            state = self._get_state(log.patient_id)
+            self._apply(state, log)
+            self._evict(state)
+            self._refresh_risk(state)
+        _VITALS_INGESTED.inc()
+        self._maybe_snapshot()
+
+    def ingest_many(self, logs: Iterable[SymptomLog | VitalLog]) -> int:
+        """Apply a batch of mixed logs, rescoring each patient only once."""
+        by_patient: Dict[str, List[SymptomLog | VitalLog]] = {}
+        for log in logs:
+            by_patient.setdefault(log.patient_id, []).append(log)
+
+        count = vitals = 0
+        for patient_id, patient_logs in by_patient.items():
+            with self._lock_for(patient_id):
+                self._write_ahead(patient_logs)
+                state = self._get_state(patient_id)
+                for log in patient_logs:
+                    self._apply(state, log)
+                    vitals += isinstance(log, VitalLog)
+                self._evict(state)
+                self._refresh_risk(state)
+            count += len(patient_logs)
+        _VITALS_INGESTED.inc(vitals)
+        _SYMPTOMS_INGESTED.inc(count - vitals)
+        self._maybe_snapshot()
+        return count
+
+    def approx_memory_bytes(self) -> int:
+        """Rough size of engine state, for metrics rather than accounting."""
+        total = self.tails.nbytes()
+        for state in list(self.patients.values()):
+            total += _PATIENT_BYTES
+            for series in (state.symptoms, state.vitals):
+                for name in series._columns:
+                    column = getattr(series, name)
+                    # Lists hold one pointer per event
+                    total += len(column) * getattr(column, "itemsize", 8)
+            total += _ROLLUP_BYTES * (len(state.rollups.hourly) + len(state.rollups.daily))
+        return total
+
+    def unknown_symptoms(self) -> Dict[str, int]:
+        """How often each symptom outside the known vocabulary was logged."""
+        return vocabulary.unknown_counts()
 
     def _windowed_events(
         self,
         state: PatientState,
-        horizon: timedelta = timedelta(hours=48),
-    ) -> Tuple[List[SymptomLog], List[VitalLog]]:
+        horizon: timedelta = RISK_HORIZON,
+    ) -> Tuple[int, int]:
+        """Return the first symptom and vital index inside the horizon."""
         if not state.last_seen:
-            return [], []
-        cutoff = state.last_seen - horizon
-        symptoms = [s for s in state.symptoms if s.timestamp >= cutoff]
-        vitals = [v for v in state.vitals if v.timestamp >= cutoff]
-        return symptoms, vitals
+            return len(state.symptoms), len(state.vitals)
+        cutoff = to_micros(state.last_seen - horizon)
+        symptom_start = state.symptoms.index_since(cutoff)
+        vital_start = state.vitals.index_since(cutoff)
+        _SYMPTOM_WINDOW.observe(len(state.symptoms) - symptom_start)
+        _VITAL_WINDOW.observe(len(state.vitals) - vital_start)
+        return symptom_start, vital_start
 
     def _compute_risk_score(self, state: PatientState) -> float:
-        symptoms, vitals = self._windowed_events(state)
-        if not symptoms and not vitals:
-            return 0.1
-
-        score = 0.0
-
-        # Vital based risk
-        for v in vitals[-3:]:
-            if v.systolic_bp >= 160 or v.diastolic_bp >= 110:
-                score += 0.4
-            elif v.systolic_bp >= 140 or v.diastolic_bp >= 90:
-                score += 0.25
-
-        # Symptom based risk
-        concerning_symptoms = {"severe_headache", "vision_changes", "heavy_bleeding", "no_fetal_movement"}
-        moderate_symptoms = {"swelling", "dizziness", "shortness_of_breath", "pain"}
-
-        for s in symptoms[-5:]:
-            if any(sym in concerning_symptoms for sym in s.symptoms):
-                score += 0.3
-            if any(sym in moderate_symptoms for sym in s.symptoms):
-                score += 0.15
-            if s.mood <= 2:
-                score += 0.1
-
-        # Normalize roughly into 0 to 1
-        return max(0.0, min(1.0, score))
+        return self._assess(state).score
 
-    def _band_for_score(self, score: float) -> str:
-        if score < 0.33:
-            return "low"
-        elif score < 0.66:
-            return "medium"
-        return "high"
-
-    def _build_explanation(self, state: PatientState, score: float) -> str:
-        symptoms, vitals = self._windowed_events(state)
-        parts: List[str] = []
-
-        if not symptoms and not vitals:
-            return "There is not enough recent information to estimate risk yet. Continue logging symptoms and vitals."
-
-        if vitals:
-            latest_bp = vitals[-1]
-            if latest_bp.systolic_bp >= 160 or latest_bp.diastolic_bp >= 110:
-                parts.append("Your recent blood pressure has been in a higher range that can sometimes be concerning in pregnancy.")
-            elif latest_bp.systolic_bp >= 140 or latest_bp.diastolic_bp >= 90:
-                parts.append("Your recent blood pressure readings have been somewhat elevated.")
-
-        if symptoms:
-            recent = symptoms[-1]
-            if "severe_headache" in recent.symptoms or "vision_changes" in recent.symptoms:
-                parts.append("You reported headache or vision changes, which can sometimes be warning signs when combined with higher blood pressure.")
-            if "heavy_bleeding" in recent.symptoms:
-                parts.append("You logged heavier bleeding, which should be discussed with a provider as soon as possible.")
-            if "no_fetal_movement" in recent.symptoms:
-                parts.append("You noted very little or no fetal movement compared to usual. This can be important to check quickly.")
-            if recent.mood <= 2:
-                parts.append("Your mood scores have been on the lower side, which matters for your well being.")
-
-        if not parts:
-            parts.append("Recent logs look mostly within expected ranges for pregnancy, but the system will keep watching for changes.")
-
-        return " ".join(parts)
+    def _assess(self, state: PatientState) -> _Assessment:
+        """Score a patient and extract everything derived from the window in one pass."""
+        symptom_start, vital_start = self._windowed_events(state)
+        symptoms, vitals = state.symptoms, state.vitals
+        v_from = max(vital_start, len(vitals) - VITAL_TAIL)
+        s_from = max(symptom_start, len(symptoms) - SYMPTOM_TAIL)
+        has_vitals = vital_start < len(vitals)
+        has_symptoms = symptom_start < len(symptoms)
 
-    def current_assessment(self, patient_id: str) -> RiskAssessment:
-        state = self._get_state(patient_id)
-        as_of = state.last_seen or datetime.utcnow()
-        score = self._compute_risk_score(state)
-        band = self._band_for_score(score)
-        explanation = self._build_explanation(state, score)
-        return RiskAssessment(
-            patient_id=patient_id,
-            as_of=as_of,
-            gestational_week=state.last_gestational_week,
-            risk_band=band,
-            risk_score=score,
-            explanation=explanation,
+        systolic = vitals.systolic[v_from:]
+        diastolic = vitals.diastolic[v_from:]
+        masks = vocabulary.masks
+        tail_masks = [masks[set_id] for set_id in symptoms.set_ids[s_from:]]
+        concerning = [bool(mask & CONCERNING_MASK) for mask in tail_masks]
+        moderate = [bool(mask & MODERATE_MASK) for mask in tail_masks]
+        moods = symptoms.moods[s_from:]
+        score, features = score_tails(list(zip(systolic, diastolic)), list(zip(concerning, moderate, moods)))
+
+        week = state.last_gestational_week
+        signature = RiskSignature(
+            has_events=has_symptoms or has_vitals,
+            bp_tier=bp_tier_of(systolic[-1], diastolic[-1]) if systolic else None,
+            flagged_symptoms=symptoms.mask(-1) & CONCERNING_MASK if has_symptoms else 0,
+            low_mood=has_symptoms and is_low_mood(symptoms.moods[-1]),
+            third_trimester=week is not None and week >= THIRD_TRIMESTER_WEEK,
         )
+        tail = dict(
+            systolic=systolic,
+            diastolic=diastolic,
+            concerning=concerning,
+            moderate=moderate,
+            moods=moods,
+            has_events=signature.has_events,
+        )
+        return _Assessment(score, features, signature, tail)
 
-    def guidance(self, patient_id: str) -> GuidanceResponse:
-        assessment = self.current_assessment(patient_id)
-        cards: List[GuidanceCard] = []
+    def score_batch(self, patient_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Score many patients at once with the rules of _compute_risk_score.
 
-        week = assessment.gestational_week or 0
+        The blood pressure, symptom and mood rules run as array operations
+        over the cohort tails kept up to date on ingest. Contributions are
+        added column by column in the same order as the scalar path, so the
+        floats match it exactly. Unknown patients score like patients
+        without recent events.
+        """
+        tails = self.tails
+        ids = None if patient_ids is None else list(patient_ids)
+        # Fancy indexing copies the rows, so the lock is only held to gather
+        with self._index_lock:
+            if ids is None:
+                ids = list(tails.rows)
+                rows = np.arange(len(ids))
+                known = np.ones(len(ids), dtype=bool)
+            else:
+                rows = tails.row_indices(ids)
+                known = rows >= 0
+                rows = np.where(known, rows, 0)
+            sys_bp = tails.systolic[rows]
+            dia_bp = tails.diastolic[rows]
+            concerning = tails.concerning[rows]
+            moderate = tails.moderate[rows]
+            moods = tails.moods[rows]
+            has_events = known & tails.has_events[rows]
 
-        if assessment.risk_band == "low":
-            cards.append(
-                GuidanceCard(
-                    title="Things seem stable right now",
-                    body=(
-                        "Based on what you logged, things look mostly within expected ranges. "
-                        "Keep paying attention to your body, drink water, and continue your checkins. "
-                        "If anything feels suddenly wrong, always trust your instincts and contact your provider."
-                    ),
-                )
-            )
-        elif assessment.risk_band == "medium":
-            cards.append(
-                GuidanceCard(
-                    title="Monitor and plan a check in",
-                    body=(
-                        "Some of your recent symptoms or blood pressure readings are a bit higher than usual. "
-                        "Consider writing down what you are noticing and contact your provider to ask if they want an earlier visit or extra checks."
-                    ),
-                )
-            )
-            if week >= 28:
-                cards.append(
-                    GuidanceCard(
-                        title="Pay extra attention to fetal movement",
-                        body=(
-                            "In the third trimester, changes in fetal movement can matter. "
-                            "If you notice fewer movements than usual, follow your clinic instructions for counting kicks "
-                            "and call if the pattern feels very different."
-                        ),
-                    )
-                )
-        else:
-            cards.append(
-                GuidanceCard(
-                    title="High concern items present",
-                    body=(
-                        "Some of your recent entries suggest symptoms that can be urgent in pregnancy. "
-                        "If you have severe pain, heavy bleeding, trouble breathing, chest pain, or a sense that something is very wrong, "
-                        "do not wait for the app. Contact emergency services or your hospital now."
-                    ),
-                )
-            )
-            cards.append(
-                GuidanceCard(
-                    title="Call your provider soon",
-                    body=(
-                        "Even if you are not in immediate danger, this is a good time to call your provider, describe what you logged, "
-                        "and ask if they want you to be seen today."
-                    ),
+        severe = is_severe_bp(sys_bp, dia_bp)
+        elevated = ~severe & is_elevated_bp(sys_bp, dia_bp)
+        low_mood = is_low_mood(moods)
+
+        # Padding sits before the real readings and adds 0.0 to a running
+        # sum that starts at 0.0, so it never changes the result.
+        scores = np.zeros(len(ids), dtype=np.float64)
+        for j in range(VITAL_TAIL):
+            scores += np.where(severe[:, j], SEVERE_BP_WEIGHT, np.where(elevated[:, j], ELEVATED_BP_WEIGHT, 0.0))
+        for j in range(SYMPTOM_TAIL):
+            scores += np.where(concerning[:, j], CONCERNING_WEIGHT, 0.0)
+            scores += np.where(moderate[:, j], MODERATE_WEIGHT, 0.0)
+            scores += np.where(low_mood[:, j], LOW_MOOD_WEIGHT, 0.0)
+        scores = np.where(has_events, np.clip(scores, 0.0, 1.0), NO_EVENTS_SCORE)
+        return dict(zip(ids, scores.tolist()))
+
+    def _refresh_risk(self, state: PatientState) -> CachedRisk:
+        """Rescore a patient. Callers hold the patient's stripe lock."""
+        score, features, signature, tail = self._assess(state)
+        risk = CachedRisk(
+            score=score,
+            band=self._band_for_score(score),
+            explanation=_explanation(signature),
+            features=features,
+            as_of=state.last_seen,
+            gestational_week=state.last_gestational_week,
+        )
+        state.risk_update = None
+        if not state.last_seen:
+            state.risk = risk
+            return risk
+        self._publish(state, risk, tail)
+        return risk
+
+    def _publish(self, state: PatientState, risk: CachedRisk, tail: Optional[Dict[str, object]]) -> None:
+        score = risk.score
+        previous = state.risk
+        # Published together with the ranking so dashboard pages see a
+        # patient's score, week and last_seen from the same refresh
+        with self._index_lock:
+            state.risk = risk
+            self.ranking.update(state.patient_id, score)
+            if tail is not None:
+                self.tails.store(state.patient_id, **tail)
+        if self.changes.active and (previous is None or previous.score != score or previous.band != risk.band):
+            self.changes.publish(
+                RiskChange(
+                    patient_id=state.patient_id,
+                    as_of=risk.as_of,
+                    gestational_week=risk.gestational_week,
+                    previous_band=previous.band if previous else None,
+                    risk_band=risk.band,
+                    previous_score=previous.score if previous else None,
+                    risk_score=score,
                 )
             )
 
+    def apply_risk_updates(self, updates: Iterable[RiskUpdate]) -> int:
+        """Serve risk computed elsewhere, such as by the Pathway pipeline.
+
+        Each update replaces the patient's cached risk and ranking entry as
+        if the engine had scored it, so /risk, /guidance and the dashboard
+        read it with no work at request time. Updates older than what the
+        engine already holds for a patient are ignored.
+
+        A patient can also receive HTTP ingests. Both paths write the same
+        cached risk, and the later event time wins. An HTTP ingest rescores
+        from the raw events the engine holds, which exclude events seen only
+        by the pipeline. An update replaces that score without touching the
+        raw events. Feed each patient through one path to keep scores
+        consistent.
+
+        With a data_dir each applied update is written to the log and kept
+        in snapshots, so a restart serves it again without the pipeline.
+        """
+        applied = 0
+        for update in updates:
+            with self._lock_for(update.patient_id):
+                state = self._get_state(update.patient_id)
+                if state.last_seen is not None and to_micros(update.as_of) < to_micros(state.last_seen):
+                    continue
+                self._write_ahead([update])
+                self._apply_update(state, update)
+            applied += 1
+        self._maybe_snapshot()
+        return applied
+
+    def _apply_update(self, state: PatientState, update: RiskUpdate) -> None:
+        """Publish an update as the patient's risk. Callers hold its stripe lock."""
+        self._touch(state, update.as_of, update.gestational_week)
+        signature = RiskSignature(
+            has_events=update.has_events,
+            bp_tier=update.bp_tier,
+            flagged_symptoms=update.flagged_symptoms,
+            low_mood=update.low_mood,
+            third_trimester=update.gestational_week >= THIRD_TRIMESTER_WEEK,
+        )
+        risk = CachedRisk(
+            score=update.score,
+            band=self._band_for_score(update.score),
+            explanation=_explanation(signature),
+            features=update.features,
+            as_of=update.as_of,
+            gestational_week=update.gestational_week,
+        )
+        self._publish(state, risk, None)
+        state.risk_update = update
+
+    def _risk(self, state: PatientState) -> CachedRisk:
+        risk = state.risk
+        if risk is None:
+            with self._lock_for(state.patient_id):
+                risk = state.risk or self._refresh_risk(state)
+        return risk
+
+    def _band_for_score(self, score: float) -> str:
+        return band_for_score(score)
+
+    def current_assessment(self, patient_id: str) -> RiskAssessment:
+        risk = self._risk(self._get_state(patient_id))
+        return RiskAssessment(
+            patient_id=patient_id,
+            as_of=risk.as_of or datetime.utcnow(),
+            gestational_week=risk.gestational_week,
+            risk_band=risk.band,
+            risk_score=risk.score,
+            explanation=risk.explanation,
+        )
+
+    def guidance(self, patient_id: str) -> GuidanceResponse:
+        risk = self._risk(self._get_state(patient_id))
+        week = risk.gestational_week or 0
         return GuidanceResponse(
             patient_id=patient_id,
-            as_of=assessment.as_of,
-            gestational_week=assessment.gestational_week,
-            risk_band=assessment.risk_band,
-            cards=cards,
+            as_of=risk.as_of or datetime.utcnow(),
+            gestational_week=risk.gestational_week,
+            risk_band=risk.band,
+            cards=list(_guidance_cards(risk.band, week >= THIRD_TRIMESTER_WEEK)),
         )
 
-    def dashboard(self) -> DashboardOverview:
-        summaries: List[PatientSummary] = []
-        for state in self.patients.values():
-            if not state.last_seen:
-                continue
-            score = self._compute_risk_score(state)
-            band = self._band_for_score(score)
-            summaries.append(
-                PatientSummary(
-                    patient_id=state.patient_id,
-                    last_seen=state.last_seen,
-                    gestational_week=state.last_gestational_week,
-                    risk_band=band,
-                    risk_score=score,
+    def trends(
+        self,
+        patient_id: str,
+        resolution: TrendResolution = "daily",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> TrendResponse:
+        """Long-range vitals and symptom trends from the patient's rollups."""
+        points: List[TrendPoint] = []
+        state = self.patients.get(patient_id)
+        if state is not None:
+            with self._lock_for(patient_id):
+                aware = state.vitals.aware or state.symptoms.aware
+                buckets = state.rollups.series(
+                    resolution,
+                    to_micros(start) if start else None,
+                    to_micros(end) if end else None,
                 )
-            )
-        generated_at = datetime.utcnow()
-        summaries.sort(key=lambda s: s.risk_score, reverse=True)
-        return DashboardOverview(generated_at=generated_at, patients=summaries)
+                previous_weight: Optional[float] = None
+                for bucket_start, rollup in buckets:
+                    points.append(_trend_point(from_micros(bucket_start, aware), rollup, previous_weight))
+                    if rollup.vitals:
+                        previous_weight = rollup.weight_sum / rollup.vitals
+        return TrendResponse(patient_id=patient_id, resolution=resolution, points=points)
+
+    def _ranking_slice(
+        self, after: Optional[RankKey], max_score: Optional[float], count: int
+    ) -> List[Tuple[RankKey, CachedRisk]]:
+        # Ranking keys and cached risk are published together under this
+        # lock, so each copied pair is consistent
+        with self._index_lock:
+            return [
+                (key, self.patients[key[1]].risk)
+                for key in itertools.islice(self.ranking.iter_from(after, max_score), count)
+            ]
+
+    def _dashboard_scan(
+        self,
+        after: Optional[RankKey],
+        band: Optional[RiskBand],
+        min_week: Optional[int],
+        max_week: Optional[int],
+    ) -> Iterator[Tuple[RankKey, DashboardRow]]:
+        max_score = _BAND_CEILING[band] if band else None
+        scan_after = after
+        while True:
+            chunk = self._ranking_slice(scan_after, max_score, DASHBOARD_SCAN_CHUNK)
+            # Filtering runs without the index lock, so ingests are only held
+            # up while each slice is copied
+            for key, risk in chunk:
+                scan_after = key
+                neg_score, patient_id = key
+                if band is not None:
+                    entry_band = self._band_for_score(-neg_score)
+                    if entry_band != band:
+                        if _BAND_RANK[entry_band] < _BAND_RANK[band]:
+                            continue
+                        return
+                week = risk.gestational_week
+                if min_week is not None and (week is None or week < min_week):
+                    continue
+                if max_week is not None and (week is None or week > max_week):
+                    continue
+                yield key, (patient_id, risk.as_of, week, risk.band, risk.score)
+            if len(chunk) < DASHBOARD_SCAN_CHUNK:
+                return
+
+    def dashboard_stream(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardStream:
+        """dashboard_page with rows produced while the caller consumes them.
+
+        The ranking is read a slice at a time as the rows are iterated, so
+        a large page is never held in memory. Raises InvalidCursor at once
+        when the cursor was not issued by this engine.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be positive")
+        after = decode_cursor(cursor) if cursor else None
+        scan = _timed_scan(self._dashboard_scan(after, band, min_week, max_week))
+        return DashboardStream(datetime.utcnow(), scan, limit)
+
+    def dashboard_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardPage:
+        """Page through patients by descending risk using the ranking index.
+
+        Rows are plain tuples so large pages can be encoded or streamed
+        without building a model per patient. Raises InvalidCursor when the
+        cursor was not issued by this engine.
+        """
+        stream = self.dashboard_stream(limit, cursor, band, min_week, max_week)
+        rows = list(stream.rows)
+        return DashboardPage(stream.generated_at, rows, stream.next_cursor)
+
+    def dashboard(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardOverview:
+        """dashboard_page as response models."""
+        page = self.dashboard_page(limit, cursor, band, min_week, max_week)
+        return overview_from_page(page)
+
+
+def _timed_scan(scan: Iterator[Tuple[RankKey, DashboardRow]]) -> Iterator[Tuple[RankKey, DashboardRow]]:
+    # A streamed page is walked while it is encoded and sent, so only the
+    # time spent inside the walk is observed, once the walk is dropped
+    spent = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            item = next(scan, None)
+            spent += time.perf_counter() - started
+            if item is None:
+                return
+            yield item
+    finally:
+        dashboard_build_seconds.observe(spent)
+
+
+def _default_engine():
+    # With shard addresses configured every API worker talks to the same
+    # owner processes instead of keeping a private in-process engine.
+    addresses = os.environ.get("BLOOMGUARD_SHARD_ADDRESSES")
+    if addresses:
+        from .sharding import ShardedEngine
+
+        return ShardedEngine.from_env(addresses)
+    return MaternalRiskEngine(data_dir=os.environ.get("BLOOMGUARD_DATA_DIR"))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
 
+def get_engine():
+    """The API's engine, created on first use.
 
-engine = MaternalRiskEngine()
+    Creating it opens the log under BLOOMGUARD_DATA_DIR or connects to the
+    shards, so importing this module, as shard processes do, touches neither.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _default_engine()
+    return _engine
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from bisect import bisect_right, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HOUR_US = 3_600_000_000
+DAY_US = 24 * HOUR_US
+
+
+class Rollup:
+    """Aggregates for one patient over one hour or day bucket."""
+
+    __slots__ = (
+        "vitals",
+        "sys_min", "sys_max", "sys_sum",
+        "dia_min", "dia_max", "dia_sum",
+        "hr_min", "hr_max", "hr_sum",
+        "weight_min", "weight_max", "weight_sum",
+        "symptom_logs",
+        "mood_sum",
+        "symptom_counts",
+    )
+
+    def __init__(self) -> None:
+        self.vitals = 0
+        self.sys_min = self.sys_max = self.sys_sum = 0
+        self.dia_min = self.dia_max = self.dia_sum = 0
+        self.hr_min = self.hr_max = self.hr_sum = 0
+        self.weight_min = self.weight_max = self.weight_sum = 0.0
+        self.symptom_logs = 0
+        self.mood_sum = 0
+        self.symptom_counts: Dict[str, int] = {}
+
+    def add_vital(self, systolic: int, diastolic: int, heart_rate: int, weight: float) -> None:
+        if self.vitals == 0:
+            self.sys_min = self.sys_max = systolic
+            self.dia_min = self.dia_max = diastolic
+            self.hr_min = self.hr_max = heart_rate
+            self.weight_min = self.weight_max = weight
+        else:
+            self.sys_min = min(self.sys_min, systolic)
+            self.sys_max = max(self.sys_max, systolic)
+            self.dia_min = min(self.dia_min, diastolic)
+            self.dia_max = max(self.dia_max, diastolic)
+            self.hr_min = min(self.hr_min, heart_rate)
+            self.hr_max = max(self.hr_max, heart_rate)
+            self.weight_min = min(self.weight_min, weight)
+            self.weight_max = max(self.weight_max, weight)
+        self.vitals += 1
+        self.sys_sum += systolic
+        self.dia_sum += diastolic
+        self.hr_sum += heart_rate
+        self.weight_sum += weight
+
+    def add_symptoms(self, names: Tuple[str, ...], mood: int) -> None:
+        self.symptom_logs += 1
+        self.mood_sum += mood
+        counts = self.symptom_counts
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+
+
+class PatientRollups:
+    """Hourly and daily rollups for one patient.
+
+    Every event is folded in at ingest, so raw events can be evicted once
+    they leave the retention window without losing long-range trends.
+    Hourly buckets older than hourly_retention_us are dropped; daily
+    buckets are kept for the whole pregnancy.
+    """
+
+    __slots__ = ("hourly", "daily", "_hourly_starts")
+
+    def __init__(self) -> None:
+        self.hourly: Dict[int, Rollup] = {}
+        self.daily: Dict[int, Rollup] = {}
+        # Hourly bucket starts in ascending order, so pruning pops from the front
+        self._hourly_starts: List[int] = []
+
+    def restore(self, hourly: Dict[int, Rollup], daily: Dict[int, Rollup]) -> None:
+        self.hourly = hourly
+        self.daily = daily
+        self._hourly_starts = sorted(hourly)
+
+    def _buckets(self, micros: int) -> Iterator[Rollup]:
+        start = micros - micros % HOUR_US
+        bucket = self.hourly.get(start)
+        if bucket is None:
+            bucket = self.hourly[start] = Rollup()
+            # Events mostly arrive in time order, where this is an append
+            insort(self._hourly_starts, start)
+        yield bucket
+        start = micros - micros % DAY_US
+        bucket = self.daily.get(start)
+        if bucket is None:
+            bucket = self.daily[start] = Rollup()
+        yield bucket
+
+    def add_vital(self, micros: int, systolic: int, diastolic: int, heart_rate: int, weight: float) -> None:
+        for bucket in self._buckets(micros):
+            bucket.add_vital(systolic, diastolic, heart_rate, weight)
+
+    def add_symptoms(self, micros: int, names: Tuple[str, ...], mood: int) -> None:
+        for bucket in self._buckets(micros):
+            bucket.add_symptoms(names, mood)
+
+    def prune_hourly(self, cutoff_us: int) -> None:
+        stale = bisect_right(self._hourly_starts, cutoff_us - HOUR_US)
+        if not stale:
+            return
+        for start in self._hourly_starts[:stale]:
+            del self.hourly[start]
+        del self._hourly_starts[:stale]
+
+    def series(
+        self,
+        resolution: str,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+    ) -> List[Tuple[int, Rollup]]:
+        buckets = self.hourly if resolution == "hourly" else self.daily
+        return sorted(
+            (start, bucket)
+            for start, bucket in buckets.items()
+            if (start_us is None or start >= start_us) and (end_us is None or start < end_us)
+        )
@@ -1,10 +1,114 @@
-from fastapi import APIRouter
-from ..schemas import DashboardOverview
-from ..risk_engine import engine
+import asyncio
+from typing import List, Optional
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from ..change_stream import ChangeBroker, ChangeSubscription
+from ..encoding import encode_dashboard, stream_dashboard
+from ..schemas import DashboardOverview, RiskBand
+from ..ranking import InvalidCursor
+from ..risk_engine import get_engine
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Idle streams get a comment line this often so proxies keep them open
+KEEPALIVE_SECONDS = 15.0
+# Pages that may hold more rows than this are streamed as they are built
+STREAM_THRESHOLD = 2000
+
 
 @router.get("/overview", response_model=DashboardOverview)
-async def overview() -> DashboardOverview:
-    return engine.dashboard()
+async def overview(
+    limit: int = Query(100, ge=1, le=50_000),
+    cursor: Optional[str] = None,
+    band: Optional[RiskBand] = None,
+    min_week: Optional[int] = Query(None, ge=0),
+    max_week: Optional[int] = Query(None, ge=0),
+) -> Response:
+    # Building a page walks the ranking index, so keep it off the event loop.
+    # A streamed page walks it in the threadpool as the response is sent.
+    engine = get_engine()
+    build = engine.dashboard_stream if limit > STREAM_THRESHOLD else engine.dashboard_page
+    try:
+        page = await run_in_threadpool(
+            build,
+            limit=limit,
+            cursor=cursor,
+            band=band,
+            min_week=min_week,
+            max_week=max_week,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    # Rows come from the engine's own cache, so they are encoded directly
+    # instead of being revalidated against the response model
+    if limit > STREAM_THRESHOLD:
+        return StreamingResponse(stream_dashboard(page), media_type="application/json")
+    return Response(await run_in_threadpool(encode_dashboard, page), media_type="application/json")
+
+
+class SubscriptionResponse(StreamingResponse):
+    """Streaming response that unsubscribes from the broker when it ends.
+
+    The generator's own cleanup never runs if the client leaves before the
+    first event, so the subscription is dropped here instead.
+    """
+
+    def __init__(self, content, broker: ChangeBroker, subscription: ChangeSubscription, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.broker = broker
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.broker.unsubscribe(self.subscription)
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+@router.get("/stream")
+async def stream_changes(
+    band: Optional[List[RiskBand]] = Query(None),
+    patient_id: Optional[List[str]] = Query(None),
+    min_delta: float = Query(0.0, ge=0.0, le=1.0),
+    coalesce_ms: int = Query(250, ge=0, le=10_000),
+) -> StreamingResponse:
+    """Server-Sent Events with risk band transitions and score changes.
+
+    Each "risk" event carries a JSON list of changes gathered over the
+    coalescing window, filtered by band, patient and minimum score delta.
+    Nothing is sent while nothing changes, apart from keepalive comments.
+    """
+    broker = getattr(get_engine(), "changes", None)
+    if broker is None:
+        raise HTTPException(status_code=501, detail="Change stream is not available for a sharded engine")
+    subscription = broker.subscribe(
+        ChangeSubscription(
+            asyncio.get_running_loop(),
+            bands=frozenset(band) if band else None,
+            patient_ids=frozenset(patient_id) if patient_id else None,
+            min_delta=min_delta,
+            coalesce_seconds=coalesce_ms / 1000,
+        )
+    )
+
+    async def events():
+        yield ": connected\n\n"
+        async for batch in subscription.batches(idle_timeout=KEEPALIVE_SECONDS):
+            if not batch:
+                yield ": keepalive\n\n"
+                continue
+            data = "[" + ",".join(change.model_dump_json() for change in batch) + "]"
+            yield f"event: risk\ndata: {data}\n\n"
+
+    return SubscriptionResponse(
+        events(),
+        broker,
+        subscription,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from ..schemas import GuidanceResponse
-from ..risk_engine import engine
+from ..risk_engine import get_engine
 
 router = APIRouter(prefix="/guidance", tags=["guidance"])
 
 
 @router.get("/{patient_id}", response_model=GuidanceResponse)
 async def get_guidance(patient_id: str) -> GuidanceResponse:
-    return engine.guidance(patient_id)
+    return await run_in_threadpool(get_engine().guidance, patient_id)
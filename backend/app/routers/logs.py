@@ -1,17 +1,94 @@
-from fastapi import APIRouter
-from ..schemas import SymptomLog, VitalLog
-from ..risk_engine import engine
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from ..schemas import (
+    BatchIngestResult,
+    BatchItem,
+    BatchLineError,
+    SymptomLog,
+    UnknownSymptomReport,
+    VitalLog,
+)
+from ..risk_engine import get_engine
+from ..stream_bridge import sink
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
+_batch_item = TypeAdapter(BatchItem)
+
+# Valid events are applied in chunks so huge uploads never sit in memory whole
+BATCH_APPLY_SIZE = 5000
+# Only the first errors are echoed back, the rest are counted
+MAX_REPORTED_ERRORS = 100
+
 
 @router.post("/symptoms")
 async def log_symptom(payload: SymptomLog):
-    engine.ingest_symptom(payload)
+    await run_in_threadpool(get_engine().ingest_symptom, payload)
     return {"status": "ok"}
 
 
+@router.get("/symptoms/unknown", response_model=UnknownSymptomReport)
+async def unknown_symptoms() -> UnknownSymptomReport:
+    return UnknownSymptomReport(counts=await run_in_threadpool(get_engine().unknown_symptoms))
+
+
 @router.post("/vitals")
 async def log_vitals(payload: VitalLog):
-    engine.ingest_vital(payload)
+    await run_in_threadpool(get_engine().ingest_vital, payload)
     return {"status": "ok"}
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'line'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+
+@router.post("/batch", response_model=BatchIngestResult)
+async def log_batch(request: Request) -> BatchIngestResult:
+    """Ingest newline delimited JSON with one symptom or vital log per line.
+
+    Each line needs a "type" of "symptom" or "vital". Invalid lines are
+    reported by line number and do not stop the rest of the upload. When
+    the Pathway pipeline is enabled, valid lines are handed to it and their
+    risk shows up once the pipeline has scored them.
+    """
+    apply = sink.write if sink is not None else get_engine().ingest_many
+    pending: List[SymptomLog | VitalLog] = []
+    errors: List[BatchLineError] = []
+    accepted = rejected = 0
+    line_no = 0
+
+    async for line in _ndjson_lines(request):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            pending.append(_batch_item.validate_json(line))
+        except ValidationError as exc:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(BatchLineError(line=line_no, error=_describe(exc)))
+            continue
+        if len(pending) >= BATCH_APPLY_SIZE:
+            accepted += await run_in_threadpool(apply, pending)
+            pending = []
+
+    if pending:
+        accepted += await run_in_threadpool(apply, pending)
+    return BatchIngestResult(accepted=accepted, rejected=rejected, errors=errors)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from ..schemas import RiskAssessment
-from ..risk_engine import engine
+from ..risk_engine import get_engine
 
 router = APIRouter(prefix="/risk", tags=["risk"])
 
 
 @router.get("/{patient_id}", response_model=RiskAssessment)
 async def get_risk(patient_id: str) -> RiskAssessment:
-    return engine.current_assessment(patient_id)
+    return await run_in_threadpool(get_engine().current_assessment, patient_id)
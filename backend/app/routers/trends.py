@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from ..schemas import TrendResolution, TrendResponse
+from ..risk_engine import get_engine
+
+router = APIRouter(prefix="/trends", tags=["trends"])
+
+
+@router.get("/{patient_id}", response_model=TrendResponse)
+async def get_trends(
+    patient_id: str,
+    resolution: TrendResolution = "daily",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> TrendResponse:
+    return await run_in_threadpool(get_engine().trends, patient_id, resolution=resolution, start=start, end=end)
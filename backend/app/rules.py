@@ -0,0 +1,222 @@
+"""Risk rules shared by the in-process engine and the Pathway pipeline.
+
+This module has no dependencies beyond the standard library, so streaming
+jobs can import it without constructing the API's engine.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+CONCERNING_SYMPTOMS = frozenset({"severe_headache", "vision_changes", "heavy_bleeding", "no_fetal_movement"})
+MODERATE_SYMPTOMS = frozenset({"swelling", "dizziness", "shortness_of_breath", "pain"})
+
+# How many of the latest in-window readings each rule looks at
+VITAL_TAIL = 3
+SYMPTOM_TAIL = 5
+
+RISK_HORIZON = timedelta(hours=48)
+
+# The rule table. score_tails and the engine's cohort batch scoring both
+# read it, and each in-window reading adds the weight of every rule it hits.
+SEVERE_BP_WEIGHT = 0.4
+ELEVATED_BP_WEIGHT = 0.25
+CONCERNING_WEIGHT = 0.3
+MODERATE_WEIGHT = 0.15
+LOW_MOOD_WEIGHT = 0.1
+# Score of a patient without in-window readings
+NO_EVENTS_SCORE = 0.1
+
+
+@dataclass(frozen=True)
+class RiskFeatures:
+    """Counts of the rule hits that contributed to a risk score."""
+
+    severe_bp_readings: int = 0
+    elevated_bp_readings: int = 0
+    concerning_symptom_logs: int = 0
+    moderate_symptom_logs: int = 0
+    low_mood_logs: int = 0
+
+
+class RiskUpdate(NamedTuple):
+    """A patient's risk as computed outside the engine."""
+
+    patient_id: str
+    as_of: datetime
+    gestational_week: int
+    score: float
+    features: RiskFeatures
+    has_events: bool
+    bp_tier: Optional[int]
+    flagged_symptoms: int
+    low_mood: bool
+
+
+def band_for_score(score: float) -> str:
+    if score < 0.33:
+        return "low"
+    elif score < 0.66:
+        return "medium"
+    return "high"
+
+
+# The threshold rules use | rather than or, so they also apply elementwise
+# to numpy arrays
+def is_severe_bp(systolic, diastolic):
+    return (systolic >= 160) | (diastolic >= 110)
+
+
+def is_elevated_bp(systolic, diastolic):
+    """Elevated or worse."""
+    return (systolic >= 140) | (diastolic >= 90)
+
+
+def is_low_mood(mood):
+    return mood <= 2
+
+
+def bp_tier_of(systolic: int, diastolic: int) -> int:
+    """0 normal, 1 elevated, 2 severe."""
+    if is_severe_bp(systolic, diastolic):
+        return 2
+    if is_elevated_bp(systolic, diastolic):
+        return 1
+    return 0
+
+
+def score_tails(
+    vitals: Sequence[Tuple[int, int]],
+    symptoms: Sequence[Tuple[bool, bool, int]],
+) -> Tuple[float, RiskFeatures]:
+    """Score the latest in-window readings, oldest first.
+
+    vitals holds (systolic, diastolic) pairs and symptoms holds (concerning,
+    moderate, mood) triples, already cut to VITAL_TAIL and SYMPTOM_TAIL.
+    Contributions are added in the engine's order so the floats match.
+    """
+    if not vitals and not symptoms:
+        return NO_EVENTS_SCORE, RiskFeatures()
+
+    score = 0.0
+    severe_bp = elevated_bp = concerning = moderate = low_mood = 0
+    for systolic, diastolic in vitals:
+        if is_severe_bp(systolic, diastolic):
+            score += SEVERE_BP_WEIGHT
+            severe_bp += 1
+        elif is_elevated_bp(systolic, diastolic):
+            score += ELEVATED_BP_WEIGHT
+            elevated_bp += 1
+    for is_concerning, is_moderate, mood in symptoms:
+        if is_concerning:
+            score += CONCERNING_WEIGHT
+            concerning += 1
+        if is_moderate:
+            score += MODERATE_WEIGHT
+            moderate += 1
+        if is_low_mood(mood):
+            score += LOW_MOOD_WEIGHT
+            low_mood += 1
+
+    features = RiskFeatures(
+        severe_bp_readings=severe_bp,
+        elevated_bp_readings=elevated_bp,
+        concerning_symptom_logs=concerning,
+        moderate_symptom_logs=moderate,
+        low_mood_logs=low_mood,
+    )
+    # Normalize roughly into 0 to 1
+    return max(0.0, min(1.0, score)), features
+
+
+_HORIZON_US = int(RISK_HORIZON.total_seconds()) * 1_000_000
+
+
+class WindowTails:
+    """The only per-patient state the risk rules need, with bounded size.
+
+    The engine scores the latest VITAL_TAIL vitals and SYMPTOM_TAIL symptom
+    logs that fall inside the horizon before the patient's latest event.
+    Those are always among the latest readings overall, so keeping just the
+    latest few of each plus the latest timestamp reproduces the engine's
+    score no matter how much history streams past. Merging is associative,
+    as streaming reducers require.
+    """
+
+    __slots__ = ("last_us", "week", "vitals", "symptoms")
+
+    def __init__(self) -> None:
+        self.last_us: int | None = None
+        self.week: int | None = None
+        # (micros, systolic, diastolic) and (micros, flagged, moderate, mood),
+        # oldest first; flagged is the log's concerning symptom bitmask
+        # and is non-zero exactly when the concerning rule fires
+        self.vitals: list = []
+        self.symptoms: list = []
+
+    def _touch(self, micros: int, week: int) -> None:
+        # Ties go to the later arrival, like the engine's last_seen
+        if self.last_us is None or micros >= self.last_us:
+            self.last_us = micros
+            self.week = week
+
+    def add_vital(self, micros: int, week: int, systolic: int, diastolic: int) -> None:
+        self._touch(micros, week)
+        self.vitals = _latest(self.vitals, [(micros, systolic, diastolic)], VITAL_TAIL)
+
+    def add_symptom(self, micros: int, week: int, flagged: int, moderate: bool, mood: int) -> None:
+        self._touch(micros, week)
+        self.symptoms = _latest(self.symptoms, [(micros, flagged, moderate, mood)], SYMPTOM_TAIL)
+
+    def merge(self, other: "WindowTails") -> None:
+        if other.last_us is not None:
+            self._touch(other.last_us, other.week)
+        self.vitals = _latest(self.vitals, other.vitals, VITAL_TAIL)
+        self.symptoms = _latest(self.symptoms, other.symptoms, SYMPTOM_TAIL)
+
+    def retract(self, other: "WindowTails") -> None:
+        """Remove readings that a stream retracted.
+
+        last_us stays where it is, since the engine's last_seen never moves
+        back either. A retracted reading that was among the kept ones leaves
+        its slot empty: older readings were already dropped and do not come
+        back, so the score uses fewer readings until newer ones arrive.
+        """
+        for entry in other.vitals:
+            if entry in self.vitals:
+                self.vitals.remove(entry)
+        for entry in other.symptoms:
+            if entry in self.symptoms:
+                self.symptoms.remove(entry)
+
+    def _in_window(self) -> Tuple[list, list]:
+        if self.last_us is None:
+            return [], []
+        cutoff = self.last_us - _HORIZON_US
+        return (
+            [entry for entry in self.vitals if entry[0] >= cutoff],
+            [entry for entry in self.symptoms if entry[0] >= cutoff],
+        )
+
+    def score(self) -> Tuple[float, RiskFeatures]:
+        vitals, symptoms = self._in_window()
+        return score_tails(
+            [(systolic, diastolic) for _, systolic, diastolic in vitals],
+            [(bool(flagged), moderate, mood) for _, flagged, moderate, mood in symptoms],
+        )
+
+    def latest(self) -> Tuple[bool, int | None, int, bool]:
+        """has_events, BP tier, flagged mask and low mood of the latest in-window logs.
+
+        These are the inputs of the engine's explanation text.
+        """
+        vitals, symptoms = self._in_window()
+        bp_tier = bp_tier_of(*vitals[-1][1:]) if vitals else None
+        flagged, low_mood = (symptoms[-1][1], is_low_mood(symptoms[-1][3])) if symptoms else (0, False)
+        return bool(vitals or symptoms), bp_tier, flagged, low_mood
+
+
+def _latest(current: list, incoming: list, keep: int) -> list:
+    # Stable sort on time keeps arrival order for equal timestamps
+    return sorted(current + incoming, key=lambda entry: entry[0])[-keep:]
@@ -1,28 +1,63 @@
 from datetime import datetime
-from typing import List, Literal, Optional
-from pydantic import BaseModel
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, Field
 
 
 RiskBand = Literal["low", "medium", "high"]
+TrendResolution = Literal["hourly", "daily"]
+
+
+# Bounds keep values inside the compact typed arrays used by the event store,
+# and strings inside the 16-bit length prefixes of the WAL and snapshots.
+PatientId = Annotated[str, Field(max_length=128)]
+SymptomName = Annotated[str, Field(max_length=128)]
 
 
 class SymptomLog(BaseModel):
-    patient_id: str
+    patient_id: PatientId
     timestamp: datetime
-    gestational_week: int
-    symptoms: List[str]
-    mood: int  # 1 to 5
+    gestational_week: int = Field(ge=0, le=50)
+    symptoms: List[SymptomName] = Field(max_length=64)
+    mood: int = Field(ge=1, le=5)
     notes: Optional[str] = None
 
 
 class VitalLog(BaseModel):
-    patient_id: str
+    patient_id: PatientId
     timestamp: datetime
-    gestational_week: int
-    systolic_bp: int
-    diastolic_bp: int
-    heart_rate: int
-    weight_kg: float
+    gestational_week: int = Field(ge=0, le=50)
+    systolic_bp: int = Field(ge=0, le=400)
+    diastolic_bp: int = Field(ge=0, le=400)
+    heart_rate: int = Field(ge=0, le=400)
+    weight_kg: float = Field(ge=0, le=500)
+
+
+class SymptomBatchItem(SymptomLog):
+    type: Literal["symptom"]
+
+
+class VitalBatchItem(VitalLog):
+    type: Literal["vital"]
+
+
+# One NDJSON line of a /logs/batch upload
+BatchItem = Annotated[Union[SymptomBatchItem, VitalBatchItem], Field(discriminator="type")]
+
+
+class BatchLineError(BaseModel):
+    line: int
+    error: str
+
+
+class BatchIngestResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[BatchLineError]
+
+
+class UnknownSymptomReport(BaseModel):
+    # Logs per symptom name outside the app's vocabulary, since startup
+    counts: Dict[str, int]
 
 
 class RiskAssessment(BaseModel):
@@ -58,3 +93,40 @@ class PatientSummary(BaseModel):
 class DashboardOverview(BaseModel):
     generated_at: datetime
     patients: List[PatientSummary]
+    next_cursor: Optional[str] = None
+
+
+class RiskChange(BaseModel):
+    patient_id: str
+    as_of: Optional[datetime]
+    gestational_week: Optional[int]
+    previous_band: Optional[RiskBand]
+    risk_band: RiskBand
+    previous_score: Optional[float]
+    risk_score: float
+
+
+class StatSummary(BaseModel):
+    min: float
+    max: float
+    mean: float
+
+
+class TrendPoint(BaseModel):
+    bucket_start: datetime
+    vital_count: int
+    systolic_bp: Optional[StatSummary]
+    diastolic_bp: Optional[StatSummary]
+    heart_rate: Optional[StatSummary]
+    weight_kg: Optional[StatSummary]
+    # Change in mean weight since the previous bucket with vitals
+    weight_change_kg: Optional[float]
+    symptom_logs: int
+    mean_mood: Optional[float]
+    symptom_counts: Dict[str, int]
+
+
+class TrendResponse(BaseModel):
+    patient_id: str
+    resolution: TrendResolution
+    points: List[TrendPoint]
@@ -0,0 +1,386 @@
+"""Run the risk engine as several owner processes behind consistent hashing.
+
+Every patient is owned by exactly one shard process, chosen by hashing the
+patient id onto a ring. API workers talk to the shards over local sockets, so
+any number of uvicorn workers see the same state and scoring spreads across
+cores. Start the shards with
+
+    python -m backend.app.sharding --shards 4 --socket-dir /tmp/bloomguard
+
+and point the API at them with BLOOMGUARD_SHARD_ADDRESSES, a comma separated
+list of the printed socket paths in shard order, and BLOOMGUARD_SHARD_AUTHKEY,
+the printed connection key.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .ranking import DashboardPage, encode_cursor, overview_from_page
+from .rules import RiskUpdate
+from .schemas import (
+    DashboardOverview,
+    GuidanceResponse,
+    RiskAssessment,
+    RiskBand,
+    SymptomLog,
+    TrendResolution,
+    TrendResponse,
+    VitalLog,
+)
+
+AUTHKEY_ENV = "BLOOMGUARD_SHARD_AUTHKEY"
+
+# Engine methods a shard answers; anything else is rejected
+_SHARD_METHODS = frozenset(
+    {
+        "ingest_symptom",
+        "ingest_vital",
+        "ingest_many",
+        "current_assessment",
+        "guidance",
+        "dashboard",
+        "dashboard_page",
+        "score_batch",
+        "trends",
+        "unknown_symptoms",
+        "apply_risk_updates",
+    }
+)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes per shard."""
+
+    def __init__(self, shard_count: int, vnodes: int = 64) -> None:
+        points = sorted(
+            (_hash(f"shard-{shard}-{v}"), shard)
+            for shard in range(shard_count)
+            for v in range(vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def owner(self, patient_id: str) -> int:
+        idx = bisect_right(self._points, _hash(patient_id)) % len(self._points)
+        return self._owners[idx]
+
+
+def _serve_connection(conn: Connection, engine) -> None:
+    with conn:
+        while True:
+            try:
+                method, args, kwargs = conn.recv()
+            except EOFError:
+                return
+            if method not in _SHARD_METHODS:
+                conn.send(("err", ValueError(f"Unknown shard method {method!r}")))
+                continue
+            try:
+                result = getattr(engine, method)(*args, **kwargs)
+                conn.send(("ok", result))
+            except Exception as exc:
+                conn.send(("err", exc))
+
+
+def authkey_from_env() -> bytes:
+    """The shared secret for shard connections.
+
+    Requests are unpickled before their method is checked, so anyone
+    holding the key can run code in a shard. There is no built-in default.
+    """
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        raise RuntimeError(f"{AUTHKEY_ENV} must be set to the key printed when the shards were started")
+    return authkey.encode()
+
+
+def serve_shard(address: str, authkey: bytes, data_dir: Optional[str] = None) -> None:
+    """Own one engine and answer requests on a unix socket until killed."""
+    from .risk_engine import MaternalRiskEngine
+
+    # The engine does its own per-patient locking, so connections run freely
+    engine = MaternalRiskEngine(data_dir=data_dir)
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_connection, args=(conn, engine), daemon=True).start()
+
+
+def spawn_shards(
+    count: int,
+    socket_dir: str | os.PathLike,
+    authkey: bytes,
+    data_dir: Optional[str] = None,
+) -> Tuple[List[multiprocessing.Process], List[str]]:
+    """Start shard processes and return them with their socket addresses."""
+    socket_dir = Path(socket_dir)
+    socket_dir.mkdir(parents=True, exist_ok=True)
+    ctx = multiprocessing.get_context("spawn")
+    processes, addresses = [], []
+    for shard in range(count):
+        address = str(socket_dir / f"shard-{shard}.sock")
+        shard_data = os.path.join(data_dir, f"shard-{shard}") if data_dir else None
+        proc = ctx.Process(
+            target=serve_shard,
+            args=(address, authkey, shard_data),
+            name=f"bloomguard-shard-{shard}",
+            daemon=True,
+        )
+        proc.start()
+        processes.append(proc)
+        addresses.append(address)
+    return processes, addresses
+
+
+class ShardedEngine:
+    """Client with the MaternalRiskEngine API that routes to shard processes.
+
+    Per-patient calls go to the owning shard. The dashboard and batch
+    scoring scatter to every shard and merge the replies.
+    """
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        authkey: bytes,
+        connect_timeout: float = 10.0,
+    ) -> None:
+        self.addresses = list(addresses)
+        self.authkey = authkey
+        self.connect_timeout = connect_timeout
+        self.ring = HashRing(len(self.addresses))
+        # Connections are opened lazily so forked API workers get their own
+        self._conns: List[Optional[Connection]] = [None] * len(self.addresses)
+        self._locks = [threading.Lock() for _ in self.addresses]
+
+    @classmethod
+    def from_env(cls, addresses: str) -> "ShardedEngine":
+        return cls([a.strip() for a in addresses.split(",") if a.strip()], authkey=authkey_from_env())
+
+    def _conn(self, shard: int) -> Connection:
+        conn = self._conns[shard]
+        if conn is None:
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                try:
+                    conn = Client(self.addresses[shard], family="AF_UNIX", authkey=self.authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+            self._conns[shard] = conn
+        return conn
+
+    @staticmethod
+    def _unwrap(reply: Tuple[str, Any]) -> Any:
+        status, value = reply
+        if status == "err":
+            raise value
+        return value
+
+    def _drop(self, shard: int) -> None:
+        # A connection that failed mid-call may still hold an unread reply,
+        # which a later call would take as its own; the next call reconnects
+        conn, self._conns[shard] = self._conns[shard], None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, shard: int, method: str, *args: Any, **kwargs: Any) -> Any:
+        with self._locks[shard]:
+            try:
+                conn = self._conn(shard)
+                conn.send((method, args, kwargs))
+                reply = conn.recv()
+            except BaseException:
+                self._drop(shard)
+                raise
+        return self._unwrap(reply)
+
+    def _scatter(self, calls: Dict[int, Tuple[str, tuple, dict]]) -> Dict[int, Any]:
+        """Send one call per shard before reading any reply, so shards work in parallel."""
+        shards = sorted(calls)
+        replies: Dict[int, Tuple[str, Any]] = {}
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._conn(shard).send(calls[shard])
+            for shard in shards:
+                replies[shard] = self._conns[shard].recv()
+        except BaseException:
+            # Every shard whose reply was not read is reset, not just the one
+            # that failed
+            for shard in shards:
+                if shard not in replies:
+                    self._drop(shard)
+            raise
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+        return {shard: self._unwrap(reply) for shard, reply in replies.items()}
+
+    def owner(self, patient_id: str) -> int:
+        return self.ring.owner(patient_id)
+
+    def ingest_symptom(self, log: SymptomLog) -> None:
+        self._call(self.owner(log.patient_id), "ingest_symptom", log)
+
+    def ingest_vital(self, log: VitalLog) -> None:
+        self._call(self.owner(log.patient_id), "ingest_vital", log)
+
+    def ingest_many(self, logs: Iterable[SymptomLog | VitalLog]) -> int:
+        by_shard: Dict[int, List[SymptomLog | VitalLog]] = {}
+        for log in logs:
+            by_shard.setdefault(self.owner(log.patient_id), []).append(log)
+        if not by_shard:
+            return 0
+        results = self._scatter({shard: ("ingest_many", (batch,), {}) for shard, batch in by_shard.items()})
+        return sum(results.values())
+
+    def apply_risk_updates(self, updates: Iterable[RiskUpdate]) -> int:
+        by_shard: Dict[int, List[RiskUpdate]] = {}
+        for update in updates:
+            by_shard.setdefault(self.owner(update.patient_id), []).append(update)
+        if not by_shard:
+            return 0
+        results = self._scatter({shard: ("apply_risk_updates", (batch,), {}) for shard, batch in by_shard.items()})
+        return sum(results.values())
+
+    def current_assessment(self, patient_id: str) -> RiskAssessment:
+        return self._call(self.owner(patient_id), "current_assessment", patient_id)
+
+    def guidance(self, patient_id: str) -> GuidanceResponse:
+        return self._call(self.owner(patient_id), "guidance", patient_id)
+
+    def trends(
+        self,
+        patient_id: str,
+        resolution: TrendResolution = "daily",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> TrendResponse:
+        return self._call(
+            self.owner(patient_id), "trends", patient_id, resolution=resolution, start=start, end=end
+        )
+
+    def score_batch(self, patient_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        if patient_ids is None:
+            calls = {shard: ("score_batch", (), {}) for shard in range(len(self.addresses))}
+        else:
+            by_shard: Dict[int, List[str]] = {}
+            for patient_id in patient_ids:
+                by_shard.setdefault(self.owner(patient_id), []).append(patient_id)
+            calls = {shard: ("score_batch", (ids,), {}) for shard, ids in by_shard.items()}
+        merged: Dict[str, float] = {}
+        for scores in self._scatter(calls).values():
+            merged.update(scores)
+        return merged
+
+    def unknown_symptoms(self) -> Dict[str, int]:
+        merged: Dict[str, int] = {}
+        calls = {shard: ("unknown_symptoms", (), {}) for shard in range(len(self.addresses))}
+        for counts in self._scatter(calls).values():
+            for name, count in counts.items():
+                merged[name] = merged.get(name, 0) + count
+        return merged
+
+    def dashboard_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardPage:
+        """Merge per-shard pages; every shard orders by the same global key."""
+        kwargs = dict(limit=limit, cursor=cursor, band=band, min_week=min_week, max_week=max_week)
+        pages = self._scatter(
+            {shard: ("dashboard_page", (), kwargs) for shard in range(len(self.addresses))}
+        ).values()
+        merged = heapq.merge(*(page.rows for page in pages), key=lambda row: (-row[4], row[0]))
+        if limit is None:
+            rows = list(merged)
+            more = False
+        else:
+            rows = list(itertools.islice(merged, limit + 1))
+            more = len(rows) > limit or any(page.next_cursor for page in pages)
+            rows = rows[:limit]
+        next_cursor = None
+        if more and rows:
+            last = rows[-1]
+            next_cursor = encode_cursor((-last[4], last[0]))
+        return DashboardPage(max(page.generated_at for page in pages), rows, next_cursor)
+
+    def dashboard_stream(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardPage:
+        # Shard replies arrive whole, so the merged page is built up front;
+        # the encoder streams it the same way
+        return self.dashboard_page(limit, cursor, band, min_week, max_week)
+
+    def dashboard(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        band: Optional[RiskBand] = None,
+        min_week: Optional[int] = None,
+        max_week: Optional[int] = None,
+    ) -> DashboardOverview:
+        return overview_from_page(self.dashboard_page(limit, cursor, band, min_week, max_week))
+
+    def close(self) -> None:
+        for shard, conn in enumerate(self._conns):
+            if conn is not None:
+                conn.close()
+                self._conns[shard] = None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run BloomGuard engine shards")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--socket-dir", default="/tmp/bloomguard-shards")
+    parser.add_argument("--data-dir", default=os.environ.get("BLOOMGUARD_DATA_DIR"))
+    args = parser.parse_args(argv)
+
+    # Without a key configured, each deployment gets a fresh random one
+    authkey = os.environ.get(AUTHKEY_ENV) or secrets.token_hex(32)
+    processes, addresses = spawn_shards(args.shards, args.socket_dir, authkey.encode(), args.data_dir)
+    print("BLOOMGUARD_SHARD_ADDRESSES=" + ",".join(addresses), flush=True)
+    print(f"{AUTHKEY_ENV}={authkey}", flush=True)
+    try:
+        for proc in processes:
+            proc.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Materialize the Pathway risk table into the API's engine.
+
+The pipeline runs in a background thread of the API process. Its output
+subscription hands each changed row to RiskTableBridge, which queues it in a
+bounded buffer. When the applier falls behind, a full buffer blocks the
+Pathway callback, and that stalls the dataflow rather than growing memory.
+A separate thread drains the buffer in batches. It keeps only the newest row
+per patient and applies them with engine.apply_risk_updates.
+
+StreamSink is the other direction. It writes bulk uploads as JSONL files
+into the folders the pipeline watches, so they are scored by Pathway
+instead of by per-request engine calls.
+
+Set BLOOMGUARD_STREAM_DIR to run the API this way, and
+BLOOMGUARD_PATHWAY_STATE_DIR to checkpoint the pipeline so a restart resumes
+where it stopped. The checkpoint only covers the pipeline. The applied risk
+is kept by the engine, which logs each update and snapshots it when
+BLOOMGUARD_DATA_DIR is set. Without a data dir a restarted API serves no
+risk for a patient until the pipeline emits that patient's row again.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from .rules import RiskFeatures, RiskUpdate
+from .schemas import SymptomLog, VitalLog
+
+logger = logging.getLogger(__name__)
+
+# Pathway rows buffered before the subscription callback blocks
+MAX_PENDING = 10_000
+APPLY_BATCH_SIZE = 1000
+FLUSH_INTERVAL = 0.05
+
+_STOP = object()
+
+
+def risk_update_from_row(row: Mapping[str, Any]) -> RiskUpdate:
+    """Turn a row of pathway_pipeline.build_risk_table into a RiskUpdate."""
+    return RiskUpdate(
+        patient_id=row["patient_id"],
+        as_of=datetime.fromisoformat(row["last_seen"]),
+        gestational_week=row["gestational_week"],
+        score=row["risk_score"],
+        features=RiskFeatures(
+            severe_bp_readings=row["severe_bp_readings"],
+            elevated_bp_readings=row["elevated_bp_readings"],
+            concerning_symptom_logs=row["concerning_symptom_logs"],
+            moderate_symptom_logs=row["moderate_symptom_logs"],
+            low_mood_logs=row["low_mood_logs"],
+        ),
+        has_events=row["has_events"],
+        bp_tier=row["bp_tier"],
+        flagged_symptoms=row["flagged_symptoms"],
+        low_mood=row["low_mood"],
+    )
+
+
+class RiskTableBridge:
+    """Bounded, batching hand-off from Pathway's output to the engine."""
+
+    def __init__(
+        self,
+        engine,
+        max_pending: int = MAX_PENDING,
+        batch_size: int = APPLY_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.applied = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+
+    def on_change(self, key: Any, row: Dict[str, Any], time: int, is_addition: bool) -> None:
+        # An update arrives as a retraction of the old row and an addition of
+        # the new one; only additions carry anything to serve
+        if is_addition:
+            self._queue.put(row)
+
+    def on_end(self) -> None:
+        self._queue.put(_STOP)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _drain(self) -> bool:
+        """Apply one batch. Returns False once the stream has ended."""
+        latest: Dict[str, Dict[str, Any]] = {}
+        running = True
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is _STOP:
+                running = False
+                break
+            # Rows for the same patient supersede each other within a batch
+            latest[item["patient_id"]] = item
+            if len(latest) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        if latest:
+            self.applied += self.engine.apply_risk_updates(risk_update_from_row(row) for row in latest.values())
+        return running
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if not self._drain():
+                    return
+            except Exception:
+                logger.exception("Applying Pathway risk updates failed")
+
+    def start(self) -> "RiskTableBridge":
+        self._thread = threading.Thread(target=self._run, name="bloomguard-risk-bridge", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class StreamSink:
+    """Writes uploaded logs as JSONL files into the pipeline's input folders."""
+
+    def __init__(self, stream_dir: str | os.PathLike) -> None:
+        self.stream_dir = Path(stream_dir)
+        for kind in ("symptoms", "vitals"):
+            (self.stream_dir / kind).mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["StreamSink"]:
+        stream_dir = os.environ.get("BLOOMGUARD_STREAM_DIR")
+        return cls(stream_dir) if stream_dir else None
+
+    def _write(self, kind: str, lines: List[str]) -> None:
+        if not lines:
+            return
+        folder = self.stream_dir / kind
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex}.jsonl"
+        # Written under a dot name and renamed, so the reader never sees a partial file
+        tmp = folder / f".{name}.tmp"
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, folder / name)
+
+    def write(self, logs: Iterable[SymptomLog | VitalLog]) -> int:
+        symptoms: List[str] = []
+        vitals: List[str] = []
+        for log in logs:
+            (vitals if isinstance(log, VitalLog) else symptoms).append(
+                json.dumps(log.model_dump(mode="json", exclude={"type"}))
+            )
+        self._write("symptoms", symptoms)
+        self._write("vitals", vitals)
+        return len(symptoms) + len(vitals)
+
+
+def start_embedded_pipeline(
+    engine,
+    stream_dir: str | os.PathLike,
+    state_dir: Optional[str] = None,
+) -> RiskTableBridge:
+    """Run the Pathway risk pipeline in this process and feed engine from it."""
+    import pathway as pw
+
+    from .pathway_pipeline import build_demo_pipeline, build_risk_table, persistence_config
+
+    symptoms, vitals = build_demo_pipeline(str(stream_dir))
+    bridge = RiskTableBridge(engine).start()
+    pw.io.subscribe(build_risk_table(symptoms, vitals), on_change=bridge.on_change, on_end=bridge.on_end)
+    threading.Thread(
+        target=pw.run,
+        kwargs={"persistence_config": persistence_config(state_dir)},
+        name="bloomguard-pathway",
+        daemon=True,
+    ).start()
+    return bridge
+
+
+sink = StreamSink.from_env()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Symptoms the app offers; they get the low bits in this order so masks for
+# the rule sets are the same in every process.
+KNOWN_SYMPTOMS: Tuple[str, ...] = (
+    "severe_headache",
+    "vision_changes",
+    "heavy_bleeding",
+    "no_fetal_movement",
+    "swelling",
+    "dizziness",
+    "shortness_of_breath",
+    "pain",
+    "headache",
+    "nausea",
+    "vomiting",
+    "fatigue",
+    "back_pain",
+    "cramping",
+    "contractions",
+    "heartburn",
+    "insomnia",
+    "fever",
+    "spotting",
+    "anxiety",
+)
+
+MASK_BITS = 64
+# Free-form names that arrive after the other bits are taken share this one
+OVERFLOW_BIT = MASK_BITS - 1
+# Clients can send any names, so the unknown names tracked and the distinct
+# lists interned are capped. Unknown names past the cap are stored as
+# OVERFLOW_NAME, and once the list table is full a new list keeps only its
+# known names plus OVERFLOW_NAME.
+MAX_UNKNOWN_NAMES = 1_000
+MAX_SYMPTOM_SETS = 100_000
+OVERFLOW_NAME = "(other)"
+
+
+class SymptomVocabulary:
+    """Interns symptom names to bit positions and symptom lists to small ids.
+
+    Each distinct symptom list is stored once with its bitmask, and events
+    only keep the id, so rules are a mask lookup and an AND rather than
+    string hashing. Names outside KNOWN_SYMPTOMS still get a bit while
+    there is room and are counted so they can be reported.
+    """
+
+    def __init__(
+        self,
+        known: Iterable[str] = KNOWN_SYMPTOMS,
+        max_unknown: int = MAX_UNKNOWN_NAMES,
+        max_sets: int = MAX_SYMPTOM_SETS,
+    ) -> None:
+        self.known = frozenset(known)
+        self.max_unknown = max_unknown
+        self.max_sets = max_sets
+        self.bits: Dict[str, int] = {}
+        self.sets: List[Tuple[str, ...]] = []
+        self.masks: List[int] = []
+        self.unknown: Dict[str, int] = {}
+        self._ids: Dict[Tuple[str, ...], int] = {}
+        self._unknown_in: List[Tuple[str, ...]] = []
+        self._admitted: Set[str] = set()
+        self._lock = threading.Lock()
+        for name in known:
+            self._bit(name)
+
+    def _bit(self, name: str) -> int:
+        bit = self.bits.get(name)
+        if bit is None:
+            # Names past the last free bit are not stored, they all share it
+            if len(self.bits) >= OVERFLOW_BIT:
+                return OVERFLOW_BIT
+            bit = self.bits[name] = len(self.bits)
+        return bit
+
+    def _admit(self, name: str) -> str:
+        if name in self.known or name in self._admitted:
+            return name
+        if len(self._admitted) < self.max_unknown:
+            self._admitted.add(name)
+            return name
+        return OVERFLOW_NAME
+
+    def mask(self, names: Iterable[str]) -> int:
+        """Bitmask for names, registering any that are new."""
+        with self._lock:
+            return self._mask(names)
+
+    def _mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= 1 << self._bit(name)
+        return mask
+
+    def intern(self, names: Iterable[str], count: bool = True) -> int:
+        """Id of the symptom list, counting its unknown names when count is set.
+
+        A list over the caps gets the id of its overflow form, whose names
+        are what sets and rollups see for it.
+        """
+        key = tuple(names)
+        set_id = self._ids.get(key)
+        if set_id is None:
+            with self._lock:
+                set_id = self._ids.get(key)
+                if set_id is None:
+                    set_id = self._intern_new(key)
+        if count and self._unknown_in[set_id]:
+            with self._lock:
+                for name in self._unknown_in[set_id]:
+                    self.unknown[name] = self.unknown.get(name, 0) + 1
+        return set_id
+
+    def _intern_new(self, key: Tuple[str, ...]) -> int:
+        stored = tuple(self._admit(name) for name in key)
+        set_id = self._ids.get(stored)
+        if set_id is None and len(self.sets) >= self.max_sets:
+            # Overflow forms are drawn from the known names, so they are few
+            # and are interned past the cap
+            known = tuple(sorted({name for name in stored if name in self.known}))
+            stored = known if all(name in self.known for name in stored) else known + (OVERFLOW_NAME,)
+            set_id = self._ids.get(stored)
+        if set_id is None:
+            # Readers index sets and masks by id without the lock,
+            # so both are appended before the id is published
+            self.sets.append(stored)
+            self.masks.append(self._mask(stored))
+            self._unknown_in.append(tuple(name for name in stored if name not in self.known))
+            set_id = self._ids[stored] = len(self.sets) - 1
+        return set_id
+
+    def unknown_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.unknown)
+
+
+vocabulary = SymptomVocabulary()
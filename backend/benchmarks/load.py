@@ -0,0 +1,123 @@
+"""HTTP throughput and latency runs against the FastAPI app.
+
+Without a base URL the app is driven in-process through httpx's ASGI
+transport, which measures the routers, validation and encoding without
+network noise. With a base URL the same scenarios run against a deployed
+server.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import replace
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from ..app.schemas import SymptomLog, VitalLog
+from .micro import Result, percentile
+from .synthetic import CohortConfig, CohortGenerator
+
+# (method, path, json body) for one request
+Request = Tuple[str, str, Optional[dict]]
+
+
+def _log_body(log: SymptomLog | VitalLog) -> dict:
+    return json.loads(log.model_dump_json())
+
+
+def _scenarios(patient_ids: Sequence[str], extra_logs: Sequence[SymptomLog | VitalLog], seed: int) -> Dict[str, Callable[[int], Request]]:
+    rng = random.Random(seed)
+    vitals = [log for log in extra_logs if isinstance(log, VitalLog)]
+    symptoms = [log for log in extra_logs if isinstance(log, SymptomLog)]
+    return {
+        "post_vital": lambda i: ("POST", "/logs/vitals", _log_body(vitals[i % len(vitals)])),
+        "post_symptom": lambda i: ("POST", "/logs/symptoms", _log_body(symptoms[i % len(symptoms)])),
+        "get_risk": lambda i: ("GET", f"/risk/{rng.choice(patient_ids)}", None),
+        "get_guidance": lambda i: ("GET", f"/guidance/{rng.choice(patient_ids)}", None),
+        "get_dashboard": lambda i: ("GET", "/dashboard/overview?limit=100", None),
+    }
+
+
+async def _drive(client: httpx.AsyncClient, make: Callable[[int], Request], requests: int, concurrency: int) -> Result:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    clock = time.perf_counter
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            method, path, body = make(i)
+            started = clock()
+            resp = await client.request(method, path, json=body)
+            latencies.append(clock() - started)
+            if resp.status_code >= 400:
+                errors += 1
+
+    started = clock()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = clock() - started
+    latencies.sort()
+    return {
+        "requests_per_sec": len(latencies) / elapsed if elapsed else float("inf"),
+        "p50_ms": percentile(latencies, 0.5) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "error_rate": errors / len(latencies),
+    }
+
+
+async def _seed(client: httpx.AsyncClient, logs: Sequence[SymptomLog | VitalLog]) -> None:
+    lines = []
+    for log in logs:
+        body = _log_body(log)
+        body["type"] = "vital" if isinstance(log, VitalLog) else "symptom"
+        lines.append(json.dumps(body))
+    resp = await client.post(
+        "/logs/batch",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    resp.raise_for_status()
+
+
+async def run_load_async(
+    config: CohortConfig,
+    requests: int = 2000,
+    concurrency: int = 16,
+    base_url: Optional[str] = None,
+) -> Dict[str, Result]:
+    generator = CohortGenerator(config)
+    logs = generator.cohort()
+    # A second day of logs for the write scenarios, after the seeded history
+    follow_up = CohortGenerator(
+        replace(config, days=1, start=config.start + timedelta(days=config.days), seed=config.seed + 1)
+    ).cohort()
+
+    if base_url is None:
+        from ..app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+    else:
+        client = httpx.AsyncClient(base_url=base_url, timeout=30.0)
+
+    results: Dict[str, Result] = {}
+    async with client:
+        await _seed(client, logs)
+        for name, make in _scenarios(generator.patient_ids, follow_up, config.seed).items():
+            results[name] = await _drive(client, make, requests, concurrency)
+    return results
+
+
+def run_load(
+    config: CohortConfig,
+    requests: int = 2000,
+    concurrency: int = 16,
+    base_url: Optional[str] = None,
+) -> Dict[str, Result]:
+    return asyncio.run(run_load_async(config, requests, concurrency, base_url))
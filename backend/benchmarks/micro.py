@@ -0,0 +1,93 @@
+"""In-process micro-benchmarks of the engine's hot paths."""
+from __future__ import annotations
+
+import gc
+import time
+from typing import Callable, Dict, List, Sequence
+
+from ..app.metrics import Histogram
+from ..app.risk_engine import MaternalRiskEngine
+from ..app.schemas import SymptomLog, VitalLog
+from .synthetic import CohortConfig, CohortGenerator
+
+Result = Dict[str, float]
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summarize(samples: Sequence[float]) -> Result:
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "ops_per_sec": len(ordered) / total if total else float("inf"),
+        "p50_us": percentile(ordered, 0.5) * 1e6,
+        "p99_us": percentile(ordered, 0.99) * 1e6,
+    }
+
+
+def _time_calls(fn: Callable[[], object], repeat: int) -> Result:
+    samples: List[float] = []
+    clock = time.perf_counter
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = clock()
+            fn()
+            samples.append(clock() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return _summarize(samples)
+
+
+def _time_each(fn: Callable[[object], object], items: Sequence[object]) -> Result:
+    samples: List[float] = []
+    clock = time.perf_counter
+    for item in items:
+        started = clock()
+        fn(item)
+        samples.append(clock() - started)
+    return _summarize(samples)
+
+
+def run_micro(config: CohortConfig, reads: int = 2000) -> Dict[str, Result]:
+    """Benchmark ingest on a fresh engine, then reads against the loaded cohort."""
+    logs = CohortGenerator(config).cohort()
+    vitals = [log for log in logs if isinstance(log, VitalLog)]
+    symptoms = [log for log in logs if isinstance(log, SymptomLog)]
+
+    engine = MaternalRiskEngine(retention=None)
+    results: Dict[str, Result] = {
+        "ingest_vital": _time_each(engine.ingest_vital, vitals),
+        "ingest_symptom": _time_each(engine.ingest_symptom, symptoms),
+    }
+
+    batch_engine = MaternalRiskEngine(retention=None)
+    started = time.perf_counter()
+    batch_engine.ingest_many(logs)
+    elapsed = time.perf_counter() - started
+    results["ingest_many"] = {"ops_per_sec": len(logs) / elapsed if elapsed else float("inf")}
+
+    patient_ids = list(engine.patients)
+    sample = [patient_ids[i % len(patient_ids)] for i in range(reads)]
+    results["current_assessment"] = _time_each(engine.current_assessment, sample)
+    results["guidance"] = _time_each(engine.guidance, sample)
+    results["dashboard_page_100"] = _time_calls(lambda: engine.dashboard(limit=100), repeat=1000)
+    results["dashboard_all"] = _time_calls(lambda: engine.dashboard(), repeat=10)
+    results["score_batch"] = _time_calls(engine.score_batch, repeat=20)
+    results["histogram_observe"] = _observe_cost()
+    return results
+
+
+def _observe_cost(calls: int = 100_000) -> Result:
+    # The per-call cost every instrumented hot path pays
+    child = Histogram("bench_seconds", "benchmark only", labels=("route",)).labels("/bench")
+    values = [(i % 997) / 1000 for i in range(calls)]
+    started = time.perf_counter()
+    for value in values:
+        child.observe(value)
+    elapsed = time.perf_counter() - started
+    return {"ops_per_sec": calls / elapsed, "mean_us": elapsed / calls * 1e6}
@@ -0,0 +1,164 @@
+"""Run the benchmark suite and check it against stored baselines.
+
+    python -m backend.benchmarks.run                      # compare to baselines.json
+    python -m backend.benchmarks.run --update             # record new baselines
+    python -m backend.benchmarks.run --url http://host:8020 --skip-micro
+
+Exits with status 1 when any metric regresses past its threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .load import run_load
+from .micro import run_micro
+from .synthetic import CohortConfig
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+# Allowed relative slowdown before a metric counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+Metrics = Dict[str, float]
+
+
+def flatten(results: Dict[str, Dict[str, Dict[str, float]]]) -> Metrics:
+    """{"micro": {"guidance": {"p50_us": 3.1}}} -> {"micro.guidance.p50_us": 3.1}"""
+    return {
+        f"{suite}.{bench}.{metric}": value
+        for suite, benches in results.items()
+        for bench, metrics in benches.items()
+        for metric, value in metrics.items()
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def _threshold_for(name: str, thresholds: Dict[str, float], default: float) -> float:
+    parts = name.split(".")
+    if name in thresholds:
+        return thresholds[name]
+    if parts[-1] in thresholds:
+        return thresholds[parts[-1]]
+    for end in range(len(parts) - 1, 0, -1):
+        prefix = ".".join(parts[:end])
+        if prefix in thresholds:
+            return thresholds[prefix]
+    return default
+
+
+def compare(
+    current: Metrics,
+    baseline: Metrics,
+    thresholds: Dict[str, float],
+    default_threshold: float = DEFAULT_THRESHOLD,
+) -> List[str]:
+    """Describe every metric that got worse than its baseline allows.
+
+    A threshold is looked up by full metric name, then by the bare metric
+    such as "p99_us" (tail latencies are noisy), then by the longest dotted
+    prefix. Metrics missing from either side are skipped.
+    """
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        value = current.get(name)
+        if value is None:
+            continue
+        limit = _threshold_for(name, thresholds, default_threshold)
+        if higher_is_better(name):
+            worse = value < base * (1 - limit)
+        else:
+            # Absolute slack so near-zero baselines such as error rates work
+            worse = value > base * (1 + limit) + (0.01 if name.endswith("error_rate") else 0)
+        if worse:
+            regressions.append(f"{name}: {value:.4g} vs baseline {base:.4g} (threshold {limit:.0%})")
+    return regressions
+
+
+def load_baselines(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="BloomGuard backend benchmarks")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--events-per-day", type=float, default=6.0)
+    parser.add_argument("--abnormal-bp-rate", type=float, default=0.1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Load test a running server instead of the in-process app")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--baselines", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="Write results as the new baselines")
+    parser.add_argument("--output", type=Path, help="Also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    config = CohortConfig(
+        patients=args.patients,
+        days=args.days,
+        events_per_day=args.events_per_day,
+        abnormal_bp_rate=args.abnormal_bp_rate,
+    )
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    if not args.skip_micro:
+        results["micro"] = run_micro(config)
+    if not args.skip_http:
+        results["http"] = run_load(config, args.requests, args.concurrency, args.url)
+    metrics = flatten(results)
+
+    for name, value in sorted(metrics.items()):
+        print(f"{name:<48} {value:>14.4g}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    stored = load_baselines(args.baselines)
+    if args.update:
+        document = {
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "config": {
+                "patients": config.patients,
+                "days": config.days,
+                "events_per_day": config.events_per_day,
+                "abnormal_bp_rate": config.abnormal_bp_rate,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+            },
+            "default_threshold": stored.get("default_threshold", DEFAULT_THRESHOLD) if stored else DEFAULT_THRESHOLD,
+            "thresholds": stored.get("thresholds", {}) if stored else {},
+            "metrics": {name: round(value, 4) for name, value in sorted(metrics.items())},
+        }
+        args.baselines.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    if stored is None:
+        print(f"No baselines at {args.baselines}; run with --update to record them")
+        return 0
+    regressions = compare(
+        metrics,
+        stored["metrics"],
+        stored.get("thresholds", {}),
+        stored.get("default_threshold", DEFAULT_THRESHOLD),
+    )
+    for line in regressions:
+        print("REGRESSION " + line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
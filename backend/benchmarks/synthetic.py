@@ -0,0 +1,123 @@
+"""Synthetic patient cohorts for benchmarks and load tests."""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from ..app.schemas import SymptomLog, VitalLog
+
+# Relative weights of the symptoms a synthetic log draws from
+DEFAULT_SYMPTOM_MIX: Dict[str, float] = {
+    "nausea": 6.0,
+    "fatigue": 6.0,
+    "back_pain": 4.0,
+    "heartburn": 3.0,
+    "swelling": 3.0,
+    "insomnia": 2.0,
+    "dizziness": 1.5,
+    "pain": 1.5,
+    "shortness_of_breath": 1.0,
+    "severe_headache": 0.5,
+    "vision_changes": 0.3,
+    "heavy_bleeding": 0.1,
+    "no_fetal_movement": 0.1,
+}
+# Long runs stop advancing pregnancies here, inside the schema's 0 to 50 range
+LAST_WEEK = 42
+
+
+@dataclass
+class CohortConfig:
+    patients: int = 1000
+    days: int = 3
+    # Each day gets this many logs on average, split between vitals and symptoms
+    events_per_day: float = 6.0
+    vital_share: float = 0.5
+    # Share of vitals in the elevated or severe blood pressure range
+    abnormal_bp_rate: float = 0.1
+    severe_bp_share: float = 0.3
+    symptoms_per_log: float = 1.2
+    symptom_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_SYMPTOM_MIX))
+    start: datetime = datetime(2025, 1, 1)
+    seed: int = 7
+    id_prefix: str = "bench"
+
+
+class CohortGenerator:
+    """Reproducible stream of vitals and symptom logs for a cohort.
+
+    Patients get a stable gestational age, weight and blood pressure
+    baseline, so series look like real pregnancies rather than noise.
+    Events come out in time order across the whole cohort.
+    """
+
+    def __init__(self, config: CohortConfig) -> None:
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._names = list(config.symptom_mix)
+        self._weights = list(config.symptom_mix.values())
+        self.patient_ids = [f"{config.id_prefix}-{i:06d}" for i in range(config.patients)]
+        rng = self._rng
+        self._week = {pid: rng.randint(8, 38) for pid in self.patient_ids}
+        self._weight = {pid: rng.uniform(55.0, 95.0) for pid in self.patient_ids}
+        self._systolic = {pid: rng.gauss(115, 8) for pid in self.patient_ids}
+
+    def _vital(self, patient_id: str, ts: datetime, week: int) -> VitalLog:
+        rng, config = self._rng, self.config
+        systolic = self._systolic[patient_id] + rng.gauss(0, 5)
+        diastolic = systolic * 0.65 + rng.gauss(0, 4)
+        if rng.random() < config.abnormal_bp_rate:
+            severe = rng.random() < config.severe_bp_share
+            systolic = rng.uniform(160, 185) if severe else rng.uniform(140, 159)
+            diastolic = rng.uniform(100, 120) if severe else rng.uniform(90, 105)
+        return VitalLog(
+            patient_id=patient_id,
+            timestamp=ts,
+            gestational_week=week,
+            systolic_bp=int(systolic),
+            diastolic_bp=int(diastolic),
+            heart_rate=int(rng.gauss(82, 8)),
+            weight_kg=round(self._weight[patient_id] + rng.gauss(0, 0.4), 1),
+        )
+
+    def _symptom(self, patient_id: str, ts: datetime, week: int) -> SymptomLog:
+        rng, config = self._rng, self.config
+        count = min(len(self._names), int(rng.expovariate(1 / config.symptoms_per_log)) if config.symptoms_per_log else 0)
+        names = sorted(set(rng.choices(self._names, self._weights, k=count))) if count else []
+        return SymptomLog(
+            patient_id=patient_id,
+            timestamp=ts,
+            gestational_week=week,
+            symptoms=names,
+            mood=rng.choices((1, 2, 3, 4, 5), (1, 2, 4, 6, 4))[0],
+            notes="synthetic" if rng.random() < 0.05 else None,
+        )
+
+    def events(self) -> Iterator[SymptomLog | VitalLog]:
+        rng, config = self._rng, self.config
+        per_patient_day = config.events_per_day
+        for day in range(config.days):
+            day_start = config.start + timedelta(days=day)
+            batch: List[SymptomLog | VitalLog] = []
+            for patient_id in self.patient_ids:
+                week = min(self._week[patient_id] + day // 7, LAST_WEEK)
+                # Poisson-ish count via exponential gaps across the day
+                offset = rng.expovariate(per_patient_day)
+                while offset < 1.0:
+                    ts = day_start + timedelta(seconds=int(offset * 86_400))
+                    if rng.random() < config.vital_share:
+                        batch.append(self._vital(patient_id, ts, week))
+                    else:
+                        batch.append(self._symptom(patient_id, ts, week))
+                    offset += rng.expovariate(per_patient_day)
+            batch.sort(key=lambda log: log.timestamp)
+            yield from batch
+
+    def cohort(self) -> List[SymptomLog | VitalLog]:
+        return list(self.events())
+
+
+def generate_cohort(config: CohortConfig | None = None) -> List[SymptomLog | VitalLog]:
+    return CohortGenerator(config or CohortConfig()).cohort()
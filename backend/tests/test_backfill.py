@@ -0,0 +1,34 @@
+import gzip
+import json
+
+from backend.app.backfill import SeenFiles, read_parallel
+
+
+def write_export(path, rows):
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "wt") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+
+
+def test_packed_files_are_read_in_order_and_not_resent(tmp_path):
+    folder = tmp_path / "vitals"
+    folder.mkdir()
+    for day in range(12):
+        rows = [{"patient_id": f"p{i}", "day": day} for i in range(50)]
+        write_export(folder / f"export-{day:03d}.jsonl.gz", rows)
+    # Plain JSONL is left to Pathway's own reader
+    write_export(folder / "live.jsonl", [{"patient_id": "p0", "day": -1}])
+
+    seen = SeenFiles()
+    read = []
+    for path, records in read_parallel(seen.pending(folder), workers=3):
+        assert [r["day"] for r in records] == [int(path.name[7:10])] * 50
+        read.append(path.name)
+        if len(read) == 5:
+            break
+        seen.mark(path)
+
+    assert read == [f"export-{day:03d}.jsonl.gz" for day in range(5)]
+    # The next poll picks up the unmarked fifth file and the rest
+    assert [p.name for p in seen.pending(folder)] == [f"export-{day:03d}.jsonl.gz" for day in range(4, 12)]
@@ -0,0 +1,33 @@
+from backend.benchmarks.run import compare, flatten
+from backend.benchmarks.synthetic import CohortConfig, generate_cohort
+from backend.app.schemas import VitalLog
+
+
+def test_cohort_generator_is_reproducible_and_honours_rates():
+    config = CohortConfig(patients=200, days=2, events_per_day=8, abnormal_bp_rate=0.5, severe_bp_share=1.0)
+    logs = generate_cohort(config)
+    assert logs == generate_cohort(config)
+    assert [log.timestamp for log in logs] == sorted(log.timestamp for log in logs)
+    assert 200 * 2 * 8 * 0.8 < len(logs) < 200 * 2 * 8 * 1.2
+
+    vitals = [log for log in logs if isinstance(log, VitalLog)]
+    severe = sum(1 for v in vitals if v.systolic_bp >= 160)
+    assert 0.4 < severe / len(vitals) < 0.6
+
+
+def test_long_cohorts_stay_inside_the_gestational_week_range():
+    logs = generate_cohort(CohortConfig(patients=20, days=120, events_per_day=0.5))
+    assert max(log.gestational_week for log in logs) == 42
+
+
+def test_compare_flags_regressions_past_threshold():
+    baseline = flatten({"micro": {"guidance": {"ops_per_sec": 1000.0, "p50_us": 10.0}},
+                        "http": {"get_risk": {"p99_ms": 2.0, "error_rate": 0.0}}})
+    current = {
+        "micro.guidance.ops_per_sec": 800.0,
+        "micro.guidance.p50_us": 14.0,
+        "http.get_risk.p99_ms": 2.9,
+        "http.get_risk.error_rate": 0.0,
+    }
+    regressions = compare(current, baseline, thresholds={"http": 0.5}, default_threshold=0.25)
+    assert [line.split(":")[0] for line in regressions] == ["micro.guidance.p50_us"]
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from backend.app.change_stream import ChangeSubscription
+from backend.app.risk_engine import MaternalRiskEngine
+from backend.app.schemas import VitalLog
+
+T0 = datetime(2025, 5, 1, 9, 0)
+
+
+def vital(patient_id, systolic, hours):
+    return VitalLog(patient_id=patient_id, timestamp=T0 + timedelta(hours=hours), gestational_week=32,
+                    systolic_bp=systolic, diastolic_bp=80, heart_rate=80, weight_kg=70.0)
+
+
+async def collect(engine, feed, **filters):
+    subscription = engine.changes.subscribe(
+        ChangeSubscription(asyncio.get_running_loop(), coalesce_seconds=0.05, **filters)
+    )
+    batches = subscription.batches()
+    feed()
+    try:
+        return await asyncio.wait_for(batches.__anext__(), timeout=1)
+    finally:
+        engine.changes.unsubscribe(subscription)
+
+
+def test_burst_is_coalesced_into_one_change_per_patient():
+    engine = MaternalRiskEngine()
+    engine.ingest_vital(vital("p1", 120, 0))
+
+    def feed():
+        for h, systolic in enumerate((150, 165, 170), start=1):
+            engine.ingest_vital(vital("p1", systolic, h))
+        engine.ingest_vital(vital("p2", 118, 0))
+
+    batch = asyncio.run(collect(engine, feed))
+    by_patient = {change.patient_id: change for change in batch}
+    assert set(by_patient) == {"p1", "p2"}
+    assert (by_patient["p1"].previous_band, by_patient["p1"].risk_band) == ("low", "high")
+    assert by_patient["p1"].previous_score == 0.0
+    assert by_patient["p2"].previous_band is None
+
+
+def test_subscription_filters_by_band_and_delta():
+    engine = MaternalRiskEngine()
+    engine.ingest_vital(vital("low", 118, 0))
+    engine.ingest_vital(vital("mid", 145, 0))
+
+    def feed():
+        engine.ingest_vital(vital("low", 119, 1))
+        engine.ingest_vital(vital("mid", 146, 1))
+        engine.ingest_vital(vital("new-high", 170, 0))
+        engine.ingest_vital(vital("new-high", 170, 1))
+
+    batch = asyncio.run(collect(engine, feed, bands=frozenset({"medium", "high"}), min_delta=0.05))
+    assert [(c.patient_id, c.risk_band) for c in batch] == [("mid", "medium"), ("new-high", "high")]
+
+
+def test_no_subscribers_means_no_change_objects():
+    engine = MaternalRiskEngine()
+    assert not engine.changes.active
+    engine.ingest_vital(vital("p1", 150, 0))
+
+
+def test_stream_unsubscribes_when_the_client_leaves_before_the_first_event():
+    import pytest
+    from fastapi import FastAPI
+
+    from backend.app.risk_engine import get_engine
+    from backend.app.routers import dashboard
+
+    # Without the request middleware, which reads the first chunk itself
+    app = FastAPI()
+    app.include_router(dashboard.router)
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("client went away")
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "path": "/dashboard/stream", "raw_path": b"/dashboard/stream", "query_string": b"",
+        "headers": [], "scheme": "http", "root_path": "", "server": ("test", 80), "client": ("test", 1),
+    }
+    with pytest.raises(Exception):
+        asyncio.run(app(scope, receive, send))
+    assert not get_engine().changes.active
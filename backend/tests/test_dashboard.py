@@ -0,0 +1,143 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.app.encoding import encode_dashboard, stream_dashboard
+from backend.app.main import app
+from backend.app.ranking import overview_from_page
+from backend.app.risk_engine import MaternalRiskEngine, get_engine
+from backend.app.schemas import DashboardOverview, VitalLog
+
+T0 = datetime(2025, 1, 1, 8, 0)
+
+
+def vital(patient_id, systolic, week=30, hours=0):
+    return VitalLog(
+        patient_id=patient_id,
+        timestamp=T0 + timedelta(hours=hours),
+        gestational_week=week,
+        systolic_bp=systolic,
+        diastolic_bp=70,
+        heart_rate=80,
+        weight_kg=70.0,
+    )
+
+
+def build_engine():
+    engine = MaternalRiskEngine()
+    # p0..p2 high (0.8), p3..p5 medium (0.5), p6..p8 low (0.0)
+    for i in range(9):
+        systolic = 165 if i < 3 else 145 if i < 6 else 115
+        for h in range(2):
+            engine.ingest_vital(vital(f"p{i}", systolic, week=20 + i, hours=h))
+    return engine
+
+
+def test_dashboard_pages_follow_risk_order():
+    engine = build_engine()
+    seen = []
+    cursor = None
+    while True:
+        page = engine.dashboard(limit=4, cursor=cursor)
+        seen.extend(p.patient_id for p in page.patients)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [f"p{i}" for i in range(9)]
+
+
+def test_dashboard_filters_by_band_and_week():
+    engine = build_engine()
+    medium = engine.dashboard(band="medium")
+    assert [p.patient_id for p in medium.patients] == ["p3", "p4", "p5"]
+
+    late = engine.dashboard(min_week=24, max_week=27)
+    assert [p.patient_id for p in late.patients] == ["p4", "p5", "p6", "p7"]
+
+
+def test_pages_span_several_ranking_slices():
+    from backend.app import risk_engine
+
+    engine = MaternalRiskEngine()
+    for i in range(3 * risk_engine.DASHBOARD_SCAN_CHUNK + 17):
+        for h in range(2):
+            engine.ingest_vital(vital(f"s{i}", (115, 145, 165)[i % 3], week=20 + i % 15, hours=h))
+
+    seen, cursor = [], None
+    while True:
+        page = engine.dashboard_page(limit=700, cursor=cursor, band="medium", min_week=25)
+        seen += [row[0] for row in page.rows]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    expected = sorted(
+        patient_id
+        for patient_id, state in engine.patients.items()
+        if state.risk.band == "medium" and state.risk.gestational_week >= 25
+    )
+    assert expected and sorted(seen) == expected and len(seen) == len(set(seen))
+
+
+def test_ranking_moves_patient_when_score_changes():
+    engine = build_engine()
+    for h in (3, 4, 5):
+        engine.ingest_vital(vital("p8", 170, week=28, hours=h))
+    top = engine.dashboard(limit=1)
+    assert top.patients[0].patient_id == "p8"
+    assert len(engine.ranking) == 9
+
+
+def test_overview_endpoint_rejects_bad_cursor():
+    get_engine().ingest_vital(vital("dash-api-1", 120))
+    client = TestClient(app)
+    resp = client.get("/dashboard/overview", params={"limit": 1})
+    assert resp.status_code == 200
+    assert len(resp.json()["patients"]) == 1
+
+    resp = client.get("/dashboard/overview", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_fast_encoding_matches_response_model_json():
+    engine = build_engine()
+    page = engine.dashboard_page(limit=5)
+    overview = DashboardOverview.model_validate(overview_from_page(page).model_dump())
+    expected = json.loads(overview.model_dump_json())
+
+    assert json.loads(encode_dashboard(page)) == expected
+    assert json.loads(b"".join(stream_dashboard(page, chunk_rows=2))) == expected
+    empty = engine.dashboard_page(band="high", min_week=40)
+    assert json.loads(b"".join(stream_dashboard(empty)))["patients"] == []
+
+
+
+def test_streamed_page_produces_rows_while_encoding():
+    engine = build_engine()
+    stream = engine.dashboard_stream(limit=2, min_week=21)
+    chunks = stream_dashboard(stream, chunk_rows=1)
+    next(chunks)
+    assert json.loads(next(chunks))["patient_id"] == "p1"
+    # The cursor is only known once the rows have been read
+    assert stream.next_cursor is None
+    rest = b"".join(chunks)
+    assert stream.next_cursor is not None
+    assert rest.endswith(json.dumps(stream.next_cursor).encode() + b"}")
+
+    page = engine.dashboard_page(limit=2, min_week=21)
+    streamed = json.loads(b"".join(stream_dashboard(engine.dashboard_stream(limit=2, min_week=21))))
+    assert [row["patient_id"] for row in streamed["patients"]] == [row[0] for row in page.rows]
+    assert streamed["next_cursor"] == page.next_cursor
+
+
+def test_large_limit_is_streamed_over_http(monkeypatch):
+    from backend.app.routers import dashboard
+
+    monkeypatch.setattr(dashboard, "STREAM_THRESHOLD", 1)
+    client = TestClient(app)
+    streamed = client.get("/dashboard/overview", params={"limit": 3})
+    monkeypatch.setattr(dashboard, "STREAM_THRESHOLD", 1000)
+    built = client.get("/dashboard/overview", params={"limit": 3})
+    assert streamed.status_code == built.status_code == 200
+    assert streamed.json()["patients"] == built.json()["patients"]
+    assert streamed.json()["next_cursor"] == built.json()["next_cursor"]
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+from backend.app.event_store import SymptomSeries, VitalSeries, to_micros
+from backend.app.schemas import SymptomLog, VitalLog
+from backend.app.vocabulary import OVERFLOW_BIT, OVERFLOW_NAME, SymptomVocabulary
+
+
+def test_vital_round_trip_through_columns():
+    log = VitalLog(
+        patient_id="p1",
+        timestamp=datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        gestational_week=31,
+        systolic_bp=142,
+        diastolic_bp=91,
+        heart_rate=88,
+        weight_kg=72.3,
+    )
+    series = VitalSeries()
+    series.add(log)
+    assert series.to_model("p1", 0) == log
+
+
+def test_symptom_lists_are_interned_and_round_trip():
+    series = SymptomSeries()
+    logs = [
+        SymptomLog(
+            patient_id="p1",
+            timestamp=datetime(2025, 3, 1, hour),
+            gestational_week=20,
+            symptoms=["swelling", "pain"],
+            mood=3,
+            notes="after walk" if hour == 2 else None,
+        )
+        for hour in (2, 1)
+    ]
+    for log in logs:
+        series.add(log)
+
+    assert series.set_ids[0] == series.set_ids[1]
+    assert series.names(0) == ("swelling", "pain")
+    assert series.to_models("p1") == list(reversed(logs))
+
+
+def test_naive_timestamps_are_treated_as_utc():
+    naive = datetime(2025, 3, 1, 12)
+    aware = naive.replace(tzinfo=timezone.utc)
+    assert to_micros(naive) == to_micros(aware)
+
+
+def test_vocabulary_masks_count_unknown_names_and_overflow():
+    vocab = SymptomVocabulary(known=("swelling", "pain"))
+    assert vocab.mask(["pain"]) == 0b10
+
+    first = vocab.intern(["pain", "glow"])
+    assert vocab.intern(["pain", "glow"]) == first
+    assert vocab.masks[first] == 0b110
+    vocab.intern(["swelling"])
+    assert vocab.unknown_counts() == {"glow": 2}
+
+    vocab.mask(f"extra_{i}" for i in range(80))
+    assert vocab.mask(["extra_79"]) == vocab.mask(["extra_70"]) == 1 << OVERFLOW_BIT
+    assert "extra_79" not in vocab.bits
+    assert vocab.bits["pain"] == 1
+
+
+def test_vocabulary_caps_unknown_names_and_distinct_lists():
+    vocab = SymptomVocabulary(known=("swelling", "pain"), max_unknown=2, max_sets=4)
+    for name in ("glow", "itch", "ache", "sting"):
+        vocab.intern(["pain", name])
+    assert vocab.unknown_counts() == {"glow": 1, "itch": 1, OVERFLOW_NAME: 2}
+    assert vocab.sets == [("pain", "glow"), ("pain", "itch"), ("pain", OVERFLOW_NAME)]
+
+    vocab.intern(["swelling"])
+    # The table is full, so new lists share their overflow form
+    late = vocab.intern(["pain", "swelling", "glow"])
+    assert vocab.sets[late] == ("pain", "swelling", OVERFLOW_NAME)
+    assert vocab.intern(["swelling", "pain", "itch"]) == late
+    assert vocab.sets[vocab.intern(["swelling", "pain"])] == ("pain", "swelling")
+    assert vocab.masks[late] & vocab.mask(["pain", "swelling"]) == 0b11
+    assert len(vocab.sets) == 6
@@ -0,0 +1,75 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.risk_engine import MaternalRiskEngine, get_engine
+from backend.app.schemas import SymptomLog, VitalLog
+
+
+def test_batch_endpoint_applies_valid_lines_and_reports_bad_ones():
+    lines = [
+        {"type": "vital", "patient_id": "batch-1", "timestamp": "2025-01-02T08:00:00",
+         "gestational_week": 30, "systolic_bp": 165, "diastolic_bp": 100, "heart_rate": 90, "weight_kg": 71.0},
+        {"type": "symptom", "patient_id": "batch-1", "timestamp": "2025-01-02T07:00:00",
+         "gestational_week": 30, "symptoms": ["vision_changes"], "mood": 3},
+        {"type": "vital", "patient_id": "batch-1", "timestamp": "2025-01-02T09:00:00"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n\nnot json\n"
+
+    client = TestClient(app)
+    resp = client.post("/logs/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert resp.status_code == 200
+    result = resp.json()
+    assert result["accepted"] == 2
+    assert result["rejected"] == 2
+    assert [err["line"] for err in result["errors"]] == [3, 5]
+    assert "systolic_bp" in result["errors"][0]["error"]
+
+    assessment = get_engine().current_assessment("batch-1")
+    assert assessment.risk_score == 0.7
+
+
+def test_ingest_many_matches_one_by_one_ingest():
+    logs = [
+        VitalLog(patient_id=f"p{i % 3}", timestamp=f"2025-01-0{1 + i % 4}T10:00:00", gestational_week=25,
+                 systolic_bp=130 + 5 * i, diastolic_bp=85, heart_rate=80, weight_kg=70.0)
+        for i in range(8)
+    ] + [
+        SymptomLog(patient_id="p1", timestamp="2025-01-03T11:00:00", gestational_week=25,
+                   symptoms=["swelling"], mood=2),
+    ]
+    single = MaternalRiskEngine()
+    for log in logs:
+        if isinstance(log, VitalLog):
+            single.ingest_vital(log)
+        else:
+            single.ingest_symptom(log)
+    batched = MaternalRiskEngine()
+    assert batched.ingest_many(logs) == len(logs)
+
+    for patient_id in single.patients:
+        assert batched.current_assessment(patient_id) == single.current_assessment(patient_id)
+
+
+def test_unknown_symptoms_are_reported():
+    client = TestClient(app)
+    for hour in (8, 9):
+        resp = client.post("/logs/symptoms", json={
+            "patient_id": "vocab-1", "timestamp": f"2025-01-03T0{hour}:00:00", "gestational_week": 22,
+            "symptoms": ["swelling", "itchy_palms_report_test"], "mood": 4,
+        })
+        assert resp.status_code == 200
+
+    counts = client.get("/logs/symptoms/unknown").json()["counts"]
+    assert counts["itchy_palms_report_test"] == 2
+    assert "swelling" not in counts
+
+
+def test_oversized_strings_are_rejected_before_the_wal():
+    client = TestClient(app)
+    log = {"patient_id": "long-1", "timestamp": "2025-01-03T08:00:00", "gestational_week": 22,
+           "symptoms": ["swelling"], "mood": 4}
+    for override in ({"patient_id": "p" * 70_000}, {"symptoms": ["x" * 70_000]}, {"symptoms": ["nausea"] * 100}):
+        resp = client.post("/logs/symptoms", json={**log, **override})
+        assert resp.status_code == 422
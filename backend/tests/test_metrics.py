@@ -0,0 +1,79 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.metrics import Counter, Histogram
+from backend.app.profiling import RequestProfiler
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    hist = Histogram("demo_seconds", "Demo latency", labels=("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 3.0):
+        hist.labels("/a").observe(value)
+    counter = Counter("demo_total", "Demo count", labels=("type",))
+    counter.labels("vital").inc(3)
+
+    text = hist.render() + "\n" + counter.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+    assert 'demo_total{type="vital"} 3.0' in text
+
+
+def test_metrics_endpoint_reports_routes_and_engine():
+    client = TestClient(app)
+    client.post("/logs/vitals", json={
+        "patient_id": "metrics-1", "timestamp": "2025-01-04T08:00:00", "gestational_week": 25,
+        "systolic_bp": 120, "diastolic_bp": 80, "heart_rate": 80, "weight_kg": 66.0,
+    })
+    client.get("/risk/metrics-1")
+
+    text = client.get("/metrics").text
+    assert 'bloomguard_http_request_duration_seconds_count{method="GET",route="/risk/{patient_id}",status="200"}' in text
+    assert 'bloomguard_ingested_events_total{type="vital"}' in text
+    assert 'bloomguard_window_events_bucket{type="vital"' in text
+    assert "bloomguard_patients " in text
+    assert "bloomguard_engine_memory_bytes " in text
+
+
+def test_request_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = RequestProfiler(rate=1.0, directory=tmp_path, interval=0.0005)
+    sampled = profiler.maybe_start()
+
+    def busy_helper():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    busy_helper()
+    path = profiler.finish(sampled, "/risk/{patient_id}")
+    assert path.name.endswith(".folded") and "risk_patient_id" in path.name
+    assert "busy_helper" in path.read_text()
+
+
+def test_failed_and_streamed_requests_are_still_measured(monkeypatch, tmp_path):
+    import backend.app.main as main
+    from backend.app.metrics import dashboard_build_seconds
+    from backend.app.risk_engine import get_engine
+
+    def builds():
+        counts = [line for line in dashboard_build_seconds.render().splitlines() if "_count" in line]
+        return int(counts[0].split()[-1]) if counts else 0
+
+    def boom(patient_id):
+        raise RuntimeError("engine failure")
+
+    monkeypatch.setattr(main, "profiler", RequestProfiler(rate=1.0, directory=tmp_path))
+    monkeypatch.setattr(get_engine(), "current_assessment", boom)
+    client = TestClient(app, raise_server_exceptions=False)
+    assert client.get("/risk/metrics-2").status_code == 500
+    text = client.get("/metrics").text
+    assert 'route="/risk/{patient_id}",status="500"' in text
+    assert any("risk_patient_id" in path.name for path in tmp_path.iterdir())
+
+    before = builds()
+    assert client.get("/dashboard/overview", params={"limit": 5000}).status_code == 200
+    assert builds() == before + 1
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+from backend.app.persistence import decode_log, encode_log
+from backend.app.risk_engine import MaternalRiskEngine
+from backend.app.rules import RiskFeatures, RiskUpdate
+from backend.app.schemas import SymptomLog, VitalLog
+
+T0 = datetime(2025, 2, 1, 6, 0, tzinfo=timezone.utc)
+
+
+def feed(engine, patients=5, hours=6):
+    for p in range(patients):
+        for h in range(hours):
+            engine.ingest_vital(
+                VitalLog(patient_id=f"p{p}", timestamp=T0 + timedelta(hours=h), gestational_week=28,
+                         systolic_bp=120 + 8 * p + h, diastolic_bp=80, heart_rate=85, weight_kg=68.4)
+            )
+            engine.ingest_symptom(
+                SymptomLog(patient_id=f"p{p}", timestamp=T0 + timedelta(hours=h, minutes=30), gestational_week=28,
+                           symptoms=["swelling"] if h % 2 else ["dizziness", "pain"], mood=1 + h % 5,
+                           notes="felt faint" if h == 3 else None)
+            )
+
+
+def risk_update(patient_id, hours, score):
+    return RiskUpdate(
+        patient_id=patient_id, as_of=T0 + timedelta(hours=hours), gestational_week=30, score=score,
+        features=RiskFeatures(severe_bp_readings=1, concerning_symptom_logs=1), has_events=True, bp_tier=2,
+        flagged_symptoms=1 << 40, low_mood=False,
+    )
+
+
+def assessments(engine):
+    return {pid: engine.current_assessment(pid) for pid in sorted(engine.patients)}
+
+
+def test_wal_records_round_trip():
+    log = SymptomLog(patient_id="p1", timestamp=T0, gestational_week=12, symptoms=["nausea"], mood=4, notes="ok")
+    assert decode_log(encode_log(log)) == log
+    vital = VitalLog(patient_id="p1", timestamp=T0.replace(tzinfo=None), gestational_week=12,
+                     systolic_bp=121, diastolic_bp=79, heart_rate=70, weight_kg=60.25)
+    assert decode_log(encode_log(vital)) == vital
+    update = risk_update("p1", hours=2, score=0.65)
+    assert decode_log(encode_log(update)) == update
+    assert decode_log(encode_log(update._replace(bp_tier=None, as_of=T0.replace(tzinfo=None)))).bp_tier is None
+
+
+def test_restart_replays_wal_without_snapshot(tmp_path):
+    engine = MaternalRiskEngine(data_dir=str(tmp_path))
+    feed(engine)
+    expected = assessments(engine)
+    engine.storage.close()
+
+    restored = MaternalRiskEngine(data_dir=str(tmp_path))
+    assert assessments(restored) == expected
+
+
+def test_restart_loads_snapshot_and_wal_tail(tmp_path):
+    engine = MaternalRiskEngine(data_dir=str(tmp_path), snapshot_every=25)
+    feed(engine, patients=4)
+    feed(engine, patients=2, hours=3)
+    expected = assessments(engine)
+    expected_notes = engine.patients["p1"].symptoms.notes
+    engine.wait_for_snapshot()
+    engine.storage.close()
+
+    assert len(list(tmp_path.glob("snapshot-*.bin"))) == 1
+    restored = MaternalRiskEngine(data_dir=str(tmp_path), snapshot_every=25)
+    assert assessments(restored) == expected
+    assert restored.patients["p1"].symptoms.notes == expected_notes
+    assert restored.dashboard().patients == engine.dashboard().patients
+    assert restored.trends("p1", resolution="hourly") == engine.trends("p1", resolution="hourly")
+
+
+def test_torn_wal_tail_is_ignored(tmp_path):
+    engine = MaternalRiskEngine(data_dir=str(tmp_path))
+    feed(engine, patients=1, hours=2)
+    expected = assessments(engine)
+    engine.storage.close()
+    wal = sorted(tmp_path.glob("wal-*.log"))[-1]
+    with open(wal, "ab") as fh:
+        fh.write(b"\x40\x00\x00\x00garbage")
+
+    restored = MaternalRiskEngine(data_dir=str(tmp_path))
+    assert assessments(restored) == expected
+
+
+def test_snapshot_runs_in_background_and_misses_no_event(tmp_path):
+    engine = MaternalRiskEngine(data_dir=str(tmp_path), snapshot_every=10)
+    feed(engine, patients=2, hours=3)
+    engine.wait_for_snapshot()
+    # Events logged while the snapshot was written land in the next segment
+    feed(engine, patients=3, hours=5)
+    engine.wait_for_snapshot()
+    expected = assessments(engine)
+    engine.storage.close()
+
+    restored = MaternalRiskEngine(data_dir=str(tmp_path))
+    assert assessments(restored) == expected
+    assert restored.trends("p0", resolution="hourly") == engine.trends("p0", resolution="hourly")
+
+
+def test_applied_risk_updates_survive_a_restart(tmp_path):
+    engine = MaternalRiskEngine(data_dir=str(tmp_path), snapshot_every=4)
+    engine.apply_risk_updates([risk_update("s1", hours=1, score=0.4), risk_update("s2", hours=1, score=0.65)])
+    # An HTTP ingest after an update rescores from the engine's own events
+    engine.apply_risk_updates([risk_update("p0", hours=0, score=0.9)])
+    feed(engine, patients=1, hours=2)
+    engine.wait_for_snapshot()
+    # Logged after the snapshot, so only the log tail holds it
+    engine.apply_risk_updates([risk_update("s1", hours=2, score=0.9)])
+    expected = assessments(engine)
+    engine.storage.close()
+
+    assert len(list(tmp_path.glob("snapshot-*.bin"))) == 1
+    restored = MaternalRiskEngine(data_dir=str(tmp_path))
+    assert assessments(restored) == expected
+    assert restored.current_assessment("s1").risk_score == 0.9
+    assert restored.current_assessment("s2").risk_score == 0.65
+    assert restored.dashboard().patients == engine.dashboard().patients
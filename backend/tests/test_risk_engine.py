@@ -0,0 +1,247 @@
+from datetime import datetime, timedelta
+
+from backend.app.event_store import to_micros
+from backend.app.risk_engine import MaternalRiskEngine
+from backend.app.rules import CONCERNING_SYMPTOMS, MODERATE_SYMPTOMS, WindowTails
+from backend.app.schemas import SymptomLog, VitalLog
+
+T0 = datetime(2025, 1, 1, 8, 0)
+
+
+def vital(patient_id, hours, systolic=118, diastolic=76, week=30):
+    return VitalLog(
+        patient_id=patient_id,
+        timestamp=T0 + timedelta(hours=hours),
+        gestational_week=week,
+        systolic_bp=systolic,
+        diastolic_bp=diastolic,
+        heart_rate=80,
+        weight_kg=70.0,
+    )
+
+
+def symptom(patient_id, hours, symptoms=(), mood=4, week=30):
+    return SymptomLog(
+        patient_id=patient_id,
+        timestamp=T0 + timedelta(hours=hours),
+        gestational_week=week,
+        symptoms=list(symptoms),
+        mood=mood,
+    )
+
+
+def test_out_of_order_events_are_windowed_in_time_order():
+    engine = MaternalRiskEngine()
+    for hours in (50, 0, 10, 49, 30):
+        engine.ingest_vital(vital("p1", hours, systolic=100 + hours))
+
+    state = engine.patients["p1"]
+    assert state.last_seen == T0 + timedelta(hours=50)
+    _, vital_start = engine._windowed_events(state)
+    vitals = state.vitals.to_models("p1", vital_start)
+    assert [v.systolic_bp for v in vitals] == [110, 130, 149, 150]
+    assert [v.timestamp for v in vitals] == sorted(v.timestamp for v in vitals)
+
+
+def test_late_upload_does_not_rewind_last_seen():
+    engine = MaternalRiskEngine()
+    engine.ingest_symptom(symptom("p1", 10, week=31))
+    engine.ingest_symptom(symptom("p1", 2, week=30))
+
+    state = engine.patients["p1"]
+    assert state.last_seen == T0 + timedelta(hours=10)
+    assert state.last_gestational_week == 31
+
+
+def test_window_uses_latest_readings_after_late_upload():
+    engine = MaternalRiskEngine()
+    engine.ingest_vital(vital("p1", 10, systolic=120))
+    engine.ingest_vital(vital("p1", 0, systolic=165))
+
+    assessment = engine.current_assessment("p1")
+    assert assessment.risk_score == 0.4
+    assert "somewhat elevated" not in assessment.explanation
+    assert "higher range" not in assessment.explanation
+
+
+def test_cached_risk_is_refreshed_on_ingest():
+    engine = MaternalRiskEngine()
+    engine.ingest_vital(vital("p1", 0, systolic=150))
+    engine.ingest_symptom(symptom("p1", 1, symptoms=["severe_headache", "swelling"], mood=2))
+
+    risk = engine.patients["p1"].risk
+    assert risk.score == engine._compute_risk_score(engine.patients["p1"])
+    assert risk.features.elevated_bp_readings == 1
+    assert risk.features.concerning_symptom_logs == 1
+    assert risk.features.moderate_symptom_logs == 1
+    assert risk.features.low_mood_logs == 1
+    assert engine.current_assessment("p1").risk_band == "high"
+
+
+def test_cached_risk_drops_events_that_leave_the_horizon():
+    engine = MaternalRiskEngine()
+    engine.ingest_vital(vital("p1", 0, systolic=170))
+    assert engine.current_assessment("p1").risk_score == 0.4
+
+    engine.ingest_vital(vital("p1", 49, systolic=120))
+    assessment = engine.current_assessment("p1")
+    assert assessment.risk_score == 0.0
+    assert assessment.risk_band == "low"
+    assert engine.patients["p1"].risk.features.severe_bp_readings == 0
+
+
+def test_explanations_and_cards_are_shared_between_matching_patients():
+    engine = MaternalRiskEngine()
+    for patient_id, week in (("p1", 30), ("p2", 33)):
+        engine.ingest_vital(vital(patient_id, 0, systolic=150, week=week))
+        engine.ingest_symptom(symptom(patient_id, 1, ["vision_changes"], week=week))
+
+    first, second = engine.current_assessment("p1"), engine.current_assessment("p2")
+    assert first.explanation is second.explanation
+    assert "somewhat elevated" in first.explanation and "vision changes" in first.explanation
+    assert engine.guidance("p1").cards[0] is engine.guidance("p2").cards[0]
+    # Early pregnancy with the same band gets the list without the movement card
+    engine.ingest_vital(vital("p3", 0, systolic=150, week=20))
+    engine.ingest_symptom(symptom("p3", 1, ["vision_changes"], week=20))
+    assert engine.guidance("p3").risk_band == engine.guidance("p1").risk_band
+    assert len(engine.guidance("p3").cards) == len(engine.guidance("p1").cards) - 1
+
+
+def test_score_batch_matches_scalar_path():
+    import random
+
+    rng = random.Random(7)
+    names = ["severe_headache", "swelling", "nausea", "pain", "heavy_bleeding", "fatigue"]
+    engine = MaternalRiskEngine()
+    for p in range(200):
+        patient_id = f"p{p}"
+        for _ in range(rng.randint(0, 12)):
+            hours = rng.uniform(0, 120)
+            if rng.random() < 0.5:
+                engine.ingest_vital(
+                    vital(patient_id, hours, systolic=rng.randint(100, 175), diastolic=rng.randint(60, 115))
+                )
+            else:
+                engine.ingest_symptom(
+                    symptom(patient_id, hours, symptoms=rng.sample(names, rng.randint(0, 3)), mood=rng.randint(1, 5))
+                )
+
+    ids = list(engine.patients) + ["unknown"]
+    batch = engine.score_batch(ids)
+    for patient_id in engine.patients:
+        assert batch[patient_id] == engine._compute_risk_score(engine.patients[patient_id])
+    assert batch["unknown"] == 0.1
+
+
+def test_concurrent_ingest_and_reads_stay_consistent():
+    import threading
+
+    engine = MaternalRiskEngine(retention=None)
+    errors = []
+
+    def writer(worker):
+        for i in range(300):
+            engine.ingest_vital(vital(f"w{worker}-{i % 10}", i, systolic=110 + i % 60))
+
+    def reader():
+        try:
+            for _ in range(200):
+                page = engine.dashboard(limit=20)
+                scores = [p.risk_score for p in page.patients]
+                assert scores == sorted(scores, reverse=True)
+                engine.current_assessment("w0-1")
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(engine.ranking) == 40
+    for patient_id, state in engine.patients.items():
+        assert len(state.vitals) == 30
+        assert state.risk.score == engine._compute_risk_score(state)
+
+
+def test_retention_evicts_raw_events_but_keeps_rollups():
+    engine = MaternalRiskEngine(retention=timedelta(days=3))
+    for day in range(10):
+        engine.ingest_vital(vital("p1", 24 * day, systolic=120 + day))
+        engine.ingest_vital(vital("p1", 24 * day + 1, systolic=130 + day))
+        engine.ingest_symptom(symptom("p1", 24 * day + 2, symptoms=["swelling"], mood=2 + day % 2))
+
+    state = engine.patients["p1"]
+    assert len(state.vitals) == 6
+    assert state.vitals.times[0] >= state.vitals.times[-1] - 3 * 24 * 3600 * 1_000_000
+
+    trend = engine.trends("p1", resolution="daily")
+    assert len(trend.points) == 10
+    first = trend.points[0]
+    assert first.vital_count == 2
+    assert (first.systolic_bp.min, first.systolic_bp.max, first.systolic_bp.mean) == (120, 130, 125)
+    assert first.symptom_counts == {"swelling": 1}
+    assert trend.points[1].weight_change_kg == 0.0
+
+    hourly = engine.trends("p1", resolution="hourly", start=T0 + timedelta(days=9))
+    assert [p.bucket_start for p in hourly.points] == [T0 + timedelta(days=9, hours=h) for h in range(3)]
+
+
+def test_prune_hourly_drops_late_buckets_in_time_order():
+    from backend.app.rollups import HOUR_US, PatientRollups
+
+    rollups = PatientRollups()
+    for hour in (5, 2, 9, 0, 7, 3):
+        rollups.add_vital(hour * HOUR_US + 10, 120, 80, 70, 60.0)
+    rollups.prune_hourly(4 * HOUR_US)
+    assert sorted(rollups.hourly) == [h * HOUR_US for h in (5, 7, 9)]
+    rollups.add_vital(HOUR_US, 120, 80, 70, 60.0)
+    rollups.prune_hourly(8 * HOUR_US)
+    assert sorted(rollups.hourly) == [9 * HOUR_US]
+    assert len(rollups.daily) == 1
+
+
+def test_retention_must_cover_risk_horizon():
+    import pytest
+
+    with pytest.raises(ValueError):
+        MaternalRiskEngine(retention=timedelta(hours=12))
+
+
+def test_bounded_window_tails_match_engine_scores():
+    import random
+
+    rng = random.Random(11)
+    names = ["severe_headache", "swelling", "nausea", "pain", "heavy_bleeding", "fatigue"]
+    engine = MaternalRiskEngine(retention=None)
+    merged_tails = {}
+    for p in range(30):
+        patient_id = f"w{p}"
+        parts = [WindowTails(), WindowTails()]
+        for n in range(rng.randint(1, 25)):
+            hours = rng.uniform(0, 120)
+            part = parts[n % 2]
+            if rng.random() < 0.5:
+                log = vital(patient_id, hours, systolic=rng.choice([115, 145, 165]), week=20 + n)
+                engine.ingest_vital(log)
+                part.add_vital(to_micros(log.timestamp), log.gestational_week, log.systolic_bp, log.diastolic_bp)
+            else:
+                log = symptom(patient_id, hours, rng.sample(names, rng.randint(0, 2)), mood=rng.randint(1, 5), week=20 + n)
+                engine.ingest_symptom(log)
+                part.add_symptom(
+                    to_micros(log.timestamp),
+                    log.gestational_week,
+                    int(any(s in CONCERNING_SYMPTOMS for s in log.symptoms)),
+                    any(s in MODERATE_SYMPTOMS for s in log.symptoms),
+                    log.mood,
+                )
+        # Partial states from two workers merge into the same answer
+        parts[0].merge(parts[1])
+        merged_tails[patient_id] = parts[0]
+
+    for patient_id, tails in merged_tails.items():
+        risk = engine.patients[patient_id].risk
+        assert tails.score() == (risk.score, risk.features)
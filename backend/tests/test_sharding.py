@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.risk_engine import MaternalRiskEngine
+from backend.app.schemas import SymptomLog, VitalLog
+from backend.app.sharding import HashRing, ShardedEngine, spawn_shards
+
+T0 = datetime(2025, 4, 1, 7, 0)
+AUTHKEY = b"test-shard-key"
+
+
+def cohort():
+    logs = []
+    for p in range(30):
+        for h in range(4):
+            logs.append(
+                VitalLog(patient_id=f"p{p}", timestamp=T0 + timedelta(hours=h), gestational_week=10 + p,
+                         systolic_bp=110 + 2 * p, diastolic_bp=70 + p, heart_rate=80, weight_kg=65.0)
+            )
+        logs.append(
+            SymptomLog(patient_id=f"p{p}", timestamp=T0, gestational_week=10 + p,
+                       symptoms=["swelling"] if p % 3 else ["heavy_bleeding"], mood=1 + p % 5)
+        )
+    return logs
+
+
+def test_hash_ring_is_stable_and_spreads_patients():
+    ring = HashRing(4)
+    owners = [ring.owner(f"patient-{i}") for i in range(2000)]
+    assert owners == [HashRing(4).owner(f"patient-{i}") for i in range(2000)]
+    assert all(owners.count(shard) > 300 for shard in range(4))
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    processes, addresses = spawn_shards(3, tmp_path, AUTHKEY)
+    engine = ShardedEngine(addresses, AUTHKEY)
+    yield engine
+    engine.close()
+    for proc in processes:
+        proc.terminate()
+        proc.join()
+
+
+def test_sharded_engine_matches_single_engine(sharded):
+    single = MaternalRiskEngine()
+    logs = cohort()
+    single.ingest_many(logs)
+    assert sharded.ingest_many(logs) == len(logs)
+    sharded.ingest_vital(logs[0])
+    single.ingest_vital(logs[0])
+
+    for patient_id in ("p0", "p7", "p29"):
+        assert sharded.current_assessment(patient_id) == single.current_assessment(patient_id)
+        assert sharded.guidance(patient_id) == single.guidance(patient_id)
+    assert sharded.score_batch() == single.score_batch()
+
+    pages, cursor = [], None
+    while True:
+        page = sharded.dashboard(limit=7, cursor=cursor, min_week=12)
+        pages.extend(page.patients)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert pages == single.dashboard(min_week=12).patients
+
+
+def test_failed_scatter_resets_unread_connections(tmp_path):
+    processes, addresses = spawn_shards(3, tmp_path, AUTHKEY)
+    engine = ShardedEngine(addresses, AUTHKEY)
+    try:
+        logs = cohort()
+        engine.ingest_many(logs)
+        processes[1].terminate()
+        processes[1].join()
+        with pytest.raises((EOFError, OSError)):
+            engine.score_batch()
+        # Shard 2's reply was never read; its next call must not pick it up
+        assert engine._conns[1] is None and engine._conns[2] is None
+        patient_id = next(f"p{p}" for p in range(30) if engine.owner(f"p{p}") == 2)
+        single = MaternalRiskEngine()
+        single.ingest_many(logs)
+        assert engine.current_assessment(patient_id) == single.current_assessment(patient_id)
+    finally:
+        engine.close()
+        for proc in processes:
+            proc.terminate()
+            proc.join()
+
+
+def test_shard_client_refuses_to_start_without_a_key(monkeypatch):
+    monkeypatch.delenv("BLOOMGUARD_SHARD_AUTHKEY", raising=False)
+    with pytest.raises(RuntimeError):
+        ShardedEngine.from_env("/tmp/shard-0.sock")
+
+
+def test_importing_the_engine_module_leaves_the_data_dir_alone(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    # Shard processes import risk_engine, and must not open the API's log there
+    env = dict(os.environ, BLOOMGUARD_DATA_DIR=str(tmp_path / "api"))
+    env.pop("BLOOMGUARD_SHARD_ADDRESSES", None)
+    subprocess.run([sys.executable, "-c", "import backend.app.risk_engine, backend.app.sharding"], env=env, check=True)
+    assert not (tmp_path / "api").exists()
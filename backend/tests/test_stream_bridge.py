@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from backend.app.event_store import to_micros
+from backend.app.risk_engine import MaternalRiskEngine
+from backend.app.rules import CONCERNING_SYMPTOMS, MODERATE_SYMPTOMS, WindowTails
+from backend.app.schemas import SymptomLog, VitalLog
+from backend.app.stream_bridge import RiskTableBridge, StreamSink, risk_update_from_row
+from backend.app.vocabulary import vocabulary
+
+T0 = datetime(2025, 1, 1, 8, 0)
+
+
+def risk_row(patient_id, tails, last_seen):
+    # The row build_risk_table emits for a patient's accumulator
+    score, features = tails.score()
+    has_events, bp_tier, flagged, low_mood = tails.latest()
+    return {
+        "patient_id": patient_id,
+        "risk_score": score,
+        "last_seen": last_seen.isoformat(),
+        "gestational_week": tails.week,
+        "severe_bp_readings": features.severe_bp_readings,
+        "elevated_bp_readings": features.elevated_bp_readings,
+        "concerning_symptom_logs": features.concerning_symptom_logs,
+        "moderate_symptom_logs": features.moderate_symptom_logs,
+        "low_mood_logs": features.low_mood_logs,
+        "has_events": has_events,
+        "bp_tier": bp_tier,
+        "flagged_symptoms": flagged,
+        "low_mood": low_mood,
+    }
+
+
+def test_streamed_rows_are_served_like_ingested_events():
+    ingested = MaternalRiskEngine()
+    streamed = MaternalRiskEngine()
+    bridge = RiskTableBridge(streamed, flush_interval=0.01).start()
+    events = {
+        "p1": [(0, 150, None), (1, None, ["severe_headache", "swelling"])],
+        "p2": [(0, 118, None), (3, None, ["nausea"])],
+        "p3": [(0, 165, None), (2, 120, None), (5, None, ["vision_changes"])],
+    }
+    for patient_id, logs in events.items():
+        tails = WindowTails()
+        for hours, systolic, symptoms in logs:
+            timestamp = T0 + timedelta(hours=hours)
+            if systolic is not None:
+                log = VitalLog(
+                    patient_id=patient_id, timestamp=timestamp, gestational_week=31,
+                    systolic_bp=systolic, diastolic_bp=80, heart_rate=80, weight_kg=70.0,
+                )
+                ingested.ingest_vital(log)
+                tails.add_vital(to_micros(timestamp), 31, systolic, 80)
+            else:
+                log = SymptomLog(patient_id=patient_id, timestamp=timestamp, gestational_week=31, symptoms=symptoms, mood=2)
+                ingested.ingest_symptom(log)
+                flagged = vocabulary.mask(s for s in symptoms if s in CONCERNING_SYMPTOMS)
+                tails.add_symptom(to_micros(timestamp), 31, flagged, any(s in MODERATE_SYMPTOMS for s in symptoms), 2)
+            # Each event produces a retraction and a new row, as a subscription sees them
+            bridge.on_change(patient_id, risk_row(patient_id, tails, timestamp), 0, True)
+            bridge.on_change(patient_id, {"patient_id": patient_id}, 0, False)
+    bridge.on_end()
+    bridge.join(timeout=5)
+
+    assert bridge.pending == 0
+    for patient_id in events:
+        assert streamed.current_assessment(patient_id) == ingested.current_assessment(patient_id)
+        assert streamed.guidance(patient_id) == ingested.guidance(patient_id)
+    assert streamed.dashboard(limit=10).patients == ingested.dashboard(limit=10).patients
+
+
+def test_stale_updates_are_ignored_and_batches_coalesce():
+    class RecordingEngine(MaternalRiskEngine):
+        batches = []
+
+        def apply_risk_updates(self, updates):
+            updates = list(updates)
+            self.batches.append(updates)
+            return super().apply_risk_updates(updates)
+
+    engine = RecordingEngine()
+    bridge = RiskTableBridge(engine)
+    tails = WindowTails()
+    tails.add_vital(to_micros(T0 + timedelta(hours=5)), 30, 165, 90)
+    newer = risk_row("p1", tails, T0 + timedelta(hours=5))
+    older = dict(newer, risk_score=0.0, last_seen=T0.isoformat())
+    for row in (dict(newer, risk_score=0.1), newer):
+        bridge.on_change("p1", row, 0, True)
+    bridge.on_end()
+    bridge._run()
+
+    assert [len(batch) for batch in engine.batches] == [1]
+    assert engine.current_assessment("p1").risk_score == 0.4
+    assert engine.apply_risk_updates([risk_update_from_row(older)]) == 0
+    assert engine.current_assessment("p1").risk_score == 0.4
+
+
+def test_stream_sink_writes_complete_jsonl_files(tmp_path):
+    sink = StreamSink(tmp_path)
+    vital = VitalLog(
+        patient_id="p1", timestamp=T0, gestational_week=30,
+        systolic_bp=120, diastolic_bp=80, heart_rate=80, weight_kg=70.0,
+    )
+    symptom = SymptomLog(patient_id="p1", timestamp=T0, gestational_week=30, symptoms=["nausea"], mood=3)
+    assert sink.write([vital, symptom, symptom]) == 3
+
+    (vitals_file,) = (tmp_path / "vitals").iterdir()
+    (symptoms_file,) = (tmp_path / "symptoms").iterdir()
+    assert vitals_file.suffix == ".jsonl"
+    assert len(symptoms_file.read_text().splitlines()) == 2
+    assert VitalLog.model_validate_json(vitals_file.read_text().strip()) == vital
+
+
+def test_pathway_updates_and_http_ingest_mix_naive_and_aware_times():
+    from datetime import timezone
+
+    engine = MaternalRiskEngine()
+    vital = VitalLog(
+        patient_id="p1", timestamp=T0, gestational_week=30,
+        systolic_bp=120, diastolic_bp=80, heart_rate=80, weight_kg=70.0,
+    )
+    engine.ingest_vital(vital)
+    tails = WindowTails()
+    tails.add_vital(to_micros(T0 + timedelta(hours=1)), 30, 165, 90)
+    row = risk_row("p1", tails, (T0 + timedelta(hours=1)).replace(tzinfo=timezone.utc))
+    assert row["last_seen"] == "2025-01-01T09:00:00+00:00"
+
+    assert engine.apply_risk_updates([risk_update_from_row(row)]) == 1
+    assert engine.current_assessment("p1").risk_score == 0.4
+    # An aware update older than the naive state is ignored
+    stale = dict(row, risk_score=0.0, last_seen="2025-01-01T07:30:00+00:00")
+    assert engine.apply_risk_updates([risk_update_from_row(stale)]) == 0
+    # A later naive HTTP ingest still compares against the aware last_seen
+    engine.ingest_vital(vital.model_copy(update={"timestamp": T0 + timedelta(hours=2)}))
+    assert engine.patients["p1"].last_seen == T0 + timedelta(hours=2)
+
+
+def test_window_tails_retract_a_corrected_reading():
+    tails = WindowTails()
+    for hour, systolic in ((1, 165), (2, 150), (3, 120)):
+        tails.add_vital(to_micros(T0 + timedelta(hours=hour)), 30, systolic, 80)
+    corrected = WindowTails()
+    corrected.add_vital(to_micros(T0 + timedelta(hours=2)), 30, 150, 80)
+    tails.retract(corrected)
+    tails.add_vital(to_micros(T0 + timedelta(hours=2)), 30, 118, 80)
+
+    score, features = tails.score()
+    assert (features.severe_bp_readings, features.elevated_bp_readings) == (1, 0)
+    assert score == 0.4
+    assert tails.last_us == to_micros(T0 + timedelta(hours=3))